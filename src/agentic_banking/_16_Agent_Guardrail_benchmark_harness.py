@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from agents import Agent, Model, RunContextWrapper, Runner, Usage, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._07_1_Agents_with_input_Guardrails import BankingQuestion, banking_guardrails, guardrail_agent
+from agentic_banking.fake_model import FakeModel
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+CORPUS_PATH = Path(__file__).parent / "data" / "guardrail_corpus.jsonl"
+
+BANKING_WORDS = {
+    "account", "accounts", "apr", "apy", "apri", "atm", "balance", "bank", "banking", "card",
+    "charge", "charged", "charges", "cheque", "credit", "debit", "deposit", "dispute", "exchange",
+    "fee", "finance", "interest", "loan", "mortgage", "payment", "pkr", "refund", "salary",
+    "savings", "statement", "transaction", "transfer", "usd", "wire", "withdrawal",
+}
+
+
+@dataclass
+class LabeledQuery:
+    text: str
+    is_banking: bool
+
+
+@dataclass
+class Verdict:
+    """
+    The decision of a guardrail for a single input.
+    Attributes:
+        is_banking (bool): True if the guardrail lets the input through as a banking query.
+        input_tokens (int): LLM input tokens spent on this decision (0 for local checks).
+        output_tokens (int): LLM output tokens spent on this decision.
+    """
+    is_banking: bool
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class Guardrail(Protocol):
+    name: str
+
+    async def check(self, text: str) -> Verdict: ...
+
+
+def load_corpus(path: str | Path = CORPUS_PATH) -> list[LabeledQuery]:
+    """Loads a JSONL file with one {"text": ..., "is_banking": ...} object per line."""
+    with open(path, encoding="utf-8") as f:
+        return [LabeledQuery(**json.loads(line)) for line in f if line.strip()]
+
+
+def keyword_score(text: str) -> float:
+    """Share of the banking signal in `text`, 0.0 means no banking word at all."""
+    hits = sum(1 for word in re.findall(r"[a-z]+", text.lower()) if word in BANKING_WORDS)
+    return min(1.0, hits / 2)
+
+
+def fake_guardrail_reply(text: str, input: Any) -> str:
+    is_banking = keyword_score(text) > 0
+    return BankingQuestion(is_banking_question=is_banking, reason="keyword match" if is_banking else "no banking terms").model_dump_json()
+
+
+class LLMGuardrail:
+    """Runs the `Input Guardrail Agent` from _07_1 with the given model, one LLM call per input."""
+    name = "llm"
+
+    def __init__(self, model):
+        self.agent = guardrail_agent.clone(model=model)
+
+    async def check(self, text: str) -> Verdict:
+        result = await Runner.run(self.agent, text)
+        usage = result.context_wrapper.usage
+        return Verdict(result.final_output.is_banking_question, usage.input_tokens, usage.output_tokens)
+
+
+class LocalGuardrail:
+    """Keyword classifier that runs in-process, no model call and no token cost."""
+    name = "local"
+
+    async def check(self, text: str) -> Verdict:
+        return Verdict(keyword_score(text) > 0)
+
+
+class TieredGuardrail:
+    """Uses the local classifier when it is confident and falls back to the LLM otherwise."""
+    name = "tiered"
+
+    def __init__(self, model, threshold: float = 1.0):
+        self.llm = LLMGuardrail(model)
+        self.threshold = threshold
+        self.escalations = 0
+
+    async def check(self, text: str) -> Verdict:
+        if keyword_score(text) >= self.threshold:
+            return Verdict(True)
+        self.escalations += 1
+        return await self.llm.check(text)
+
+
+_check_usage: contextvars.ContextVar[Usage | None] = contextvars.ContextVar("guardrail_check_usage", default=None)
+
+
+class _UsageTap(Model):
+    """Passes every call to `model` and adds its usage to the check in progress."""
+
+    def __init__(self, model: Model):
+        self.model = model
+
+    async def get_response(self, *args, **kwargs):
+        response = await self.model.get_response(*args, **kwargs)
+        usage = _check_usage.get()
+        if usage is not None:
+            usage.add(response.usage)
+        return response
+
+    def stream_response(self, *args, **kwargs):
+        return self.model.stream_response(*args, **kwargs)
+
+
+class InputGuardrailAdapter:
+    """
+    Benchmarks the real `banking_guardrails` from _07_1 through the InputGuardrail machinery. That guardrail runs
+    the module-level guardrail agent of _07_1, so the adapter points that agent at the harness's fake or --real
+    model, and reads the tokens each check spent from the model calls it made.
+    """
+
+    def __init__(self, model: Model, agent: Agent):
+        self.agent = agent
+        self.name = banking_guardrails.get_name()
+        self.guardrail = banking_guardrails
+        guardrail_agent.model = _UsageTap(model)
+
+    async def check(self, text: str) -> Verdict:
+        usage = Usage()
+        token = _check_usage.set(usage)
+        try:
+            result = await self.guardrail.run(self.agent, text, RunContextWrapper(context=None))
+        finally:
+            _check_usage.reset(token)
+        return Verdict(not result.output.tripwire_triggered, usage.input_tokens, usage.output_tokens)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class BenchmarkReport:
+    """
+    Machine-readable result of one benchmark run, written as JSON for regression comparison.
+    Precision and recall are measured on the tripwire, so a "positive" is a blocked non-banking input.
+    """
+    guardrail: str
+    model: str
+    inputs: int
+    concurrency: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_per_s: float
+    precision: float
+    recall: float
+    accuracy: float
+    cost_per_1k_inputs: float
+    input_tokens: int
+    output_tokens: int
+    errors: int
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+async def run_benchmark(guardrail: Guardrail, corpus: list[LabeledQuery], concurrency: int = 8, model_name: str = "fake",
+                        input_price_per_1m: float = 0.10, output_price_per_1m: float = 0.40) -> BenchmarkReport:
+    """Runs `guardrail` over the whole corpus with at most `concurrency` checks in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    # Failed checks often return fast (or time out), keep them out of the percentiles.
+    error_latencies: list[float] = []
+    verdicts: list[Verdict | None] = [None] * len(corpus)
+
+    async def one(i: int, query: LabeledQuery):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                verdicts[i] = await guardrail.check(query.text)
+            except Exception as e:
+                print(f"Guardrail failed on {query.text!r}: {e}")
+                error_latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i, q) for i, q in enumerate(corpus)))
+    wall = time.perf_counter() - wall_start
+
+    tp = fp = fn = correct = 0
+    input_tokens = output_tokens = 0
+    for query, verdict in zip(corpus, verdicts):
+        if verdict is None:
+            continue
+        input_tokens += verdict.input_tokens
+        output_tokens += verdict.output_tokens
+        blocked, should_block = not verdict.is_banking, not query.is_banking
+        correct += blocked == should_block
+        tp += blocked and should_block
+        fp += blocked and not should_block
+        fn += should_block and not blocked
+    cost = (input_tokens * input_price_per_1m + output_tokens * output_price_per_1m) / 1_000_000
+    latencies.sort()
+    error_latencies.sort()
+    errors = verdicts.count(None)
+    extra: dict[str, Any] = {"escalations": guardrail.escalations} if isinstance(guardrail, TieredGuardrail) else {}
+    if error_latencies:
+        extra["error_p50_ms"] = round(percentile(error_latencies, 50), 3)
+    return BenchmarkReport(
+        guardrail=guardrail.name,
+        model=model_name,
+        inputs=len(corpus),
+        concurrency=concurrency,
+        p50_ms=round(percentile(latencies, 50), 3),
+        p95_ms=round(percentile(latencies, 95), 3),
+        p99_ms=round(percentile(latencies, 99), 3),
+        throughput_per_s=round(len(corpus) / wall, 2) if wall else 0.0,
+        precision=round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        recall=round(tp / (tp + fn), 4) if tp + fn else 0.0,
+        accuracy=round(correct / (len(corpus) - errors), 4) if len(corpus) > errors else 0.0,
+        cost_per_1k_inputs=round(cost / len(corpus) * 1000, 6) if corpus else 0.0,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        errors=errors,
+        extra=extra,
+    )
+
+
+def compare_reports(baseline: dict[str, Any], current: dict[str, Any], tolerance: float = 0.10) -> list[str]:
+    """Returns a message for every metric in `current` that is worse than `baseline` by more than `tolerance`."""
+    regressions = []
+    for metric in ("p50_ms", "p95_ms", "p99_ms", "cost_per_1k_inputs"):
+        if current[metric] > baseline[metric] * (1 + tolerance) and current[metric] - baseline[metric] > 1e-9:
+            regressions.append(f"{metric}: {baseline[metric]} -> {current[metric]}")
+    for metric in ("throughput_per_s", "precision", "recall", "accuracy"):
+        if current[metric] < baseline[metric] * (1 - tolerance):
+            regressions.append(f"{metric}: {baseline[metric]} -> {current[metric]}")
+    return regressions
+
+
+def build_guardrail(kind: str, model) -> Guardrail:
+    if kind == "llm":
+        return LLMGuardrail(model)
+    if kind == "local":
+        return LocalGuardrail()
+    if kind == "tiered":
+        return TieredGuardrail(model)
+    if kind == "banking_guardrails":
+        return InputGuardrailAdapter(model, Agent(name="Banking Assistant"))
+    raise ValueError(f"Unknown guardrail kind: {kind}")
+
+
+async def main_async(argv: list[str] | None = None) -> BenchmarkReport:
+    parser = argparse.ArgumentParser(description="Benchmark banking guardrails for latency, accuracy and cost.")
+    parser.add_argument("--corpus", default=str(CORPUS_PATH))
+    parser.add_argument("--guardrail", default="tiered", choices=["llm", "local", "tiered", "banking_guardrails"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--real", action="store_true", help="Use gemini-2.0-flash instead of the fake model.")
+    parser.add_argument("--fake-latency", type=float, default=0.05, help="Seconds per fake model call.")
+    parser.add_argument("--report", default=None, help="Write the JSON report to this path.")
+    parser.add_argument("--baseline", default=None, help="Compare against a previous JSON report.")
+    args = parser.parse_args(argv)
+
+    if args.real:
+        model, model_name = LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key), "gemini/gemini-2.0-flash"
+    else:
+        model, model_name = FakeModel(reply=fake_guardrail_reply, latency=args.fake_latency), "fake"
+    corpus = load_corpus(args.corpus)
+    report = await run_benchmark(build_guardrail(args.guardrail, model), corpus, args.concurrency, model_name)
+    print(json.dumps(asdict(report), indent=2))
+    if args.report:
+        Path(args.report).write_text(json.dumps(asdict(report), indent=2), encoding="utf-8")
+    if args.baseline:
+        regressions = compare_reports(json.loads(Path(args.baseline).read_text(encoding="utf-8")), asdict(report))
+        print("Regressions:" if regressions else "No regressions against baseline.")
+        for line in regressions:
+            print(f"  {line}")
+    return report
+
+
+def main():
+    print("Welcome to Guardrail Benchmark!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Protocol
+
+import agents
+from agents import Agent, FunctionTool, RunContextWrapper, Runner, custom_span, set_tracing_disabled
+from agents.exceptions import UserError
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.function_schema import function_schema
+from agents.tool import default_tool_error_function
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+_MISSING = object()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Any: ...
+
+    def set(self, key: str, value: Any, expires_at: float | None) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LRUBackend:
+    """In-process LRU, entries are dropped when they expire or when `max_entries` is exceeded."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: float | None) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """
+    SQLite backed cache, shared between processes that point at the same file.
+    Values are pickled, so only point it at a file you trust. Least recently used entries are evicted in batches,
+    every `max_entries // 10` writes, so the table may briefly hold up to 10% more than `max_entries`.
+    """
+
+    def __init__(self, path: str = "tool_cache.sqlite3", max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._evict_every = max(1, max_entries // 10)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_cache_used_at ON tool_cache (used_at)")
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            now = time.time()
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                return _MISSING
+            self._conn.execute("UPDATE tool_cache SET used_at = ? WHERE key = ?", (now, key))
+            return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, expires_at: float | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), expires_at, time.time()),
+            )
+            self._writes += 1
+            if self._writes % self._evict_every:
+                return
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN (SELECT key FROM tool_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache")
+
+
+class ToolCache:
+    """
+    Memoization settings for one tool, passed as `@cached_tool(ToolCache(...))` or as the `cache` option of
+    `function_tool` in _27.
+    Attributes:
+        ttl (float | None): Seconds a result stays valid, None keeps it until evicted.
+        max_entries (int): Upper bound on cached results.
+        key_fn (Callable | None): Builds the key from (context, args dict). Return None to skip the cache
+            for that call. Required for tools that take a RunContextWrapper, since their result depends on it.
+        backend (str | CacheBackend): "memory" for the in-process LRU, "sqlite" for SQLiteBackend, or an instance.
+        hits (int): Calls answered from the cache.
+        misses (int): Calls that ran the tool.
+    """
+
+    def __init__(self, ttl: float | None = None, max_entries: int = 1024, key_fn: Callable[[RunContextWrapper[Any], dict[str, Any]], str | None] | None = None,
+                 backend: str | CacheBackend = "memory", path: str = "tool_cache.sqlite3"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_fn = key_fn
+        if backend == "memory":
+            backend = LRUBackend(max_entries)
+        elif backend == "sqlite":
+            backend = SQLiteBackend(path, max_entries)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    def make_key(self, tool_name: str, ctx: RunContextWrapper[Any], args: dict[str, Any]) -> str | None:
+        if self.key_fn is not None:
+            custom = self.key_fn(ctx, args)
+            return None if custom is None else f"{tool_name}:{custom}"
+        canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+    async def get_or_run(self, key: str, run: Callable[[], Any]) -> tuple[Any, bool]:
+        """Returns (result, was_hit). Concurrent calls with the same key share one execution."""
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value, True
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending), True
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await run()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved, waiters re-raise it themselves.
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        future.set_result(value)
+        self.backend.set(key, value, time.time() + self.ttl if self.ttl is not None else None)
+        return value, False
+
+
+def raw_invoke(tool: FunctionTool) -> Callable[[RunContextWrapper[Any], str], Any]:
+    """`tool.on_invoke_tool` without the error handling a tool decorator added, so decorators stack."""
+    return getattr(tool, "raw_invoke", tool.on_invoke_tool)
+
+
+def handle_failures(tool: FunctionTool, invoke: Callable[[RunContextWrapper[Any], str], Any], failure_error_function) -> FunctionTool:
+    """Installs `invoke` on `tool`, failures go to `failure_error_function` (None re-raises them)."""
+
+    async def on_invoke_tool(ctx: RunContextWrapper[Any], input: str) -> Any:
+        try:
+            return await invoke(ctx, input)
+        except Exception as e:
+            if failure_error_function is None:
+                raise
+            result = failure_error_function(ctx, e)
+            if asyncio.iscoroutine(result):
+                return await result
+            return result
+
+    tool.raw_invoke = invoke
+    tool.on_invoke_tool = on_invoke_tool
+    return tool
+
+
+def cached_tool(cache: ToolCache, takes_context: bool | None = None,
+                failure_error_function=default_tool_error_function) -> Callable[[FunctionTool | Callable[..., Any]], FunctionTool]:
+    """
+    Decorator that memoizes a tool function, or a FunctionTool built with `failure_error_function=None` (otherwise
+    its error messages are cached as results), with `cache`. Failures are never cached, they go to
+    `failure_error_function`. Stacks with `timeout_tool` from _27, put the timeout outside so its fallbacks are
+    not cached, only the outermost decorator's `failure_error_function` is used.
+    A result that depends on the run context must not be served to another run, so a tool that takes a context
+    needs a ToolCache with a key_fn. For functions that is read from the signature; a FunctionTool does not show
+    it, so one is refused without a key_fn unless `takes_context=False` says it ignores the context.
+    """
+
+    def decorate(tool: FunctionTool | Callable[..., Any]) -> FunctionTool:
+        context_aware = takes_context
+        if not isinstance(tool, FunctionTool):
+            context_aware = function_schema(tool, use_docstring_info=False).takes_context
+            tool = agents.function_tool(tool, failure_error_function=None)
+        if context_aware is not False and cache.key_fn is None:
+            raise UserError(f"Tool {tool.name} may depend on the run context, give its ToolCache a key_fn, or pass "
+                            "takes_context=False if it does not read the context.")
+        invoke = raw_invoke(tool)
+
+        async def cached_invoke(ctx: RunContextWrapper[Any], input: str) -> Any:
+            args = json.loads(input) if input else {}
+            key = cache.make_key(tool.name, ctx, args)
+            if key is None:
+                return await invoke(ctx, input)
+            with custom_span("tool_cache", data={"tool": tool.name}) as span:
+                result, hit = await cache.get_or_run(key, lambda: invoke(ctx, input))
+                span.span_data.data.update(hit=hit, **cache.stats())
+            return result
+
+        tool.cache = cache
+        return handle_failures(tool, cached_invoke, failure_error_function)
+
+    return decorate
+
+
+weather_cache = ToolCache(ttl=600, max_entries=256)
+
+
+@cached_tool(weather_cache)
+def get_weather(city: str) -> str:
+    """
+    Retrieves the weather for a given city.
+    """
+    print(f"Fetching weather for {city}")
+    time.sleep(0.5)  # Simulating a slow weather service
+    return f"The current weather in {city} is sunny with a temperature of 25°C."
+
+
+@cached_tool(ToolCache(key_fn=lambda ctx, args: args["country"].strip().lower()))
+def get_capital_and_country(country: str) -> str:
+    """Function to get the capital for a country."""
+    print(f"Looking up capital of {country}")
+    capitals = {"france": "Paris", "germany": "Berlin", "pakistan": "Islamabad"}
+    return f"The capital of {country} is {capitals.get(country.strip().lower(), 'Unknown')}"
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"Tool said: {input[-1]['output']}"
+    return [FakeToolCall("get_weather", {"city": "Peshawar"}), FakeToolCall("get_capital_and_country", {"country": "France"})]
+
+
+def main():
+    print("Welcome to Tool result cache example!")
+    model = LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply)
+    agent = Agent(
+        name="Weather Assistant",
+        instructions="You are a helpfull weather assistant",
+        model=model,
+        tools=[get_weather, get_capital_and_country],
+    )
+    for _ in range(3):
+        start = time.perf_counter()
+        result = Runner.run_sync(agent, "whats the weather in Peshawar and the capital of France?")
+        print(f"{result.final_output} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    print(f"get_weather cache: {get_weather.cache.stats()}")
+    print(f"get_capital_and_country cache: {get_capital_and_country.cache.stats()}")
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import timeit
+from collections import namedtuple
+from typing import Any, Callable
+
+from agents import Agent, FunctionTool, RunContextWrapper, Runner, set_tracing_disabled
+from agents.exceptions import ModelBehaviorError
+from agents.extensions.models.litellm_model import LitellmModel
+from pydantic import BaseModel, ConfigDict, ValidationError
+from pydantic_core import from_json
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+# JSON schema type -> the exact Python types the JSON parser produces for it.
+_JSON_TYPES = {
+    "string": ("str",),
+    "integer": ("int",),
+    "number": ("int", "float"),
+    "boolean": ("bool",),
+    "array": ("list",),
+    "object": ("dict",),
+    "null": ("NoneType",),
+}
+# Property keywords the compiled checks implement, a schema using any other one is left to pydantic.
+_COMPILED_KEYWORDS = {"type", "anyOf", "enum", "default", "title", "description"}
+# Strings pydantic's lax mode accepts for a bool.
+_BOOL_STRINGS = {"0": False, "off": False, "f": False, "false": False, "n": False, "no": False,
+                 "1": True, "on": True, "t": True, "true": True, "y": True, "yes": True}
+_INTEGRAL_STRING = re.compile(r"\s*[+-]?\d[\d_]*\.0*\s*")
+
+
+class FunctionArguments(BaseModel):
+    name: str
+    age: int
+    email: str
+    model_config = ConfigDict(extra="forbid")
+
+
+def _field_types(prop: dict[str, Any]) -> list[str]:
+    if "anyOf" in prop:
+        return [t for option in prop["anyOf"] for t in _field_types(option)]
+    kind = prop.get("type", [])
+    return kind if isinstance(kind, list) else [kind]
+
+
+def _compilable(prop: dict[str, Any]) -> bool:
+    if not prop.keys() <= _COMPILED_KEYWORDS or not all(_compilable(option) for option in prop.get("anyOf", [])):
+        return False
+    # Unions of several non-null types need pydantic's smart mode to pick a member.
+    return len(set(_field_types(prop)) - {"null"}) <= 1
+
+
+def _check_lines(i: int, name: str, prop: dict[str, Any], strict: bool) -> list[str]:
+    kinds = _field_types(prop)
+    if not kinds:
+        return []
+    types = sorted({t for kind in kinds for t in _JSON_TYPES[kind]})
+    expected = "/".join(kinds)
+    coercible = [kind for kind in kinds if kind in ("integer", "number", "boolean")]
+    lines = [f"    if type(v{i}) not in ({', '.join(types)},):"]
+    if not strict and coercible:
+        lines.append(f"        v{i} = _coerce(v{i}, {coercible[0]!r}, {name!r}, {expected!r})")
+    else:
+        lines.append(f"        _fail({name!r}, {'expected ' + expected!r}, v{i})")
+    if "enum" in prop:
+        lines.append(f"    if v{i} not in {tuple(prop['enum'])!r}: _fail({name!r}, {'expected one of ' + str(prop['enum'])!r}, v{i})")
+    return lines
+
+
+def compile_validator(schema: dict[str, Any], strict: bool = False, tool_name: str = "tool") -> Callable[[str | bytes | bytearray], Any]:
+    """
+    Generates a validator specialised to a flat object `schema` (e.g. `FunctionArguments.model_json_schema()`).
+    The source is built and compiled once, every call then only parses JSON with pydantic_core and runs
+    straight-line type checks, returning a namedtuple so handlers keep `parsed.name` style access.
+    The default lax mode applies pydantic's coercions to int, float and bool fields: numeric strings,
+    integral floats, bools as numbers and 0/1 or "yes"/"off" style strings as bools. `strict=True` rejects them.
+    Bytes input is parsed directly, without decoding to str first.
+    Raises ValueError for schemas with anything but typed, optionally enum-restricted fields (`$ref`, formats,
+    constraints, nested objects or arrays of items), `fast_function_tool` validates those with pydantic instead.
+    """
+    properties: dict[str, dict[str, Any]] = schema.get("properties", {})
+    uncompilable = sorted(name for name, prop in properties.items() if not _compilable(prop))
+    if uncompilable:
+        raise ValueError(f"Cannot compile a validator for fields {uncompilable} of tool {tool_name}")
+    required = set(schema.get("required", []))
+    names = list(properties)
+    lines = ["def validate(raw):"]
+    lines.append("    try: d = from_json(raw)")
+    lines.append("    except ValueError as e: raise ModelBehaviorError(f'Invalid JSON input for tool {TOOL}: {e}') from e")
+    lines.append("    if type(d) is not dict: _fail('', 'expected an object', d)")
+    if schema.get("additionalProperties") is False:
+        lines.append("    if not d.keys() <= ALLOWED: _fail(', '.join(sorted(d.keys() - ALLOWED)), 'extra field not permitted', None)")
+    defaults = {}
+    for i, name in enumerate(names):
+        if name in required:
+            lines.append(f"    try: v{i} = d[{name!r}]")
+            lines.append(f"    except KeyError: _fail({name!r}, 'field required', None)")
+        else:
+            defaults[name] = properties[name].get("default")
+            lines.append(f"    v{i} = d.get({name!r}, DEFAULTS[{name!r}])")
+            lines.append(f"    if v{i} is not None or {name!r} in d:")
+            lines += ["    " + line for line in _check_lines(i, name, properties[name], strict)]
+            continue
+        lines += _check_lines(i, name, properties[name], strict)
+    # tuple.__new__ skips the Python level namedtuple constructor.
+    values = "".join(f"v{i}, " for i in range(len(names)))
+    lines.append(f"    return new_args(Args, ({values}))")
+
+    def _fail(field: str, message: str, value: Any):
+        raise ModelBehaviorError(f"Invalid JSON input for tool {tool_name}: {field}: {message} (got {value!r})")
+
+    def _coerce(value: Any, kind: str, field: str, expected: str) -> Any:
+        # Lax mode, the conversions pydantic accepts from JSON input.
+        if kind == "boolean":
+            if type(value) in (int, float) and value in (0, 1):
+                return bool(value)
+            if type(value) is str and value.lower() in _BOOL_STRINGS:
+                return _BOOL_STRINGS[value.lower()]
+        elif type(value) is bool:
+            return int(value) if kind == "integer" else float(value)
+        elif kind == "integer":
+            if type(value) is float and value.is_integer():
+                return int(value)
+            if type(value) is str:
+                try:
+                    return int(value)
+                except ValueError:
+                    if _INTEGRAL_STRING.fullmatch(value):
+                        return int(value.strip().partition(".")[0])
+        elif type(value) is str:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        _fail(field, f"expected {expected}", value)
+
+    namespace = {
+        "from_json": from_json,
+        "ModelBehaviorError": ModelBehaviorError,
+        "TOOL": tool_name,
+        "ALLOWED": frozenset(names),
+        "DEFAULTS": defaults,
+        "Args": namedtuple(schema.get("title", "Args"), names, rename=True),
+        "new_args": tuple.__new__,
+        "_fail": _fail,
+        "_coerce": _coerce,
+        "NoneType": type(None),
+    }
+    exec(compile("\n".join(lines), f"<validator {tool_name}>", "exec"), namespace)
+    validate = namespace["validate"]
+    validate.source = "\n".join(lines)
+    return validate
+
+
+def _pydantic_validator(params_model: type[BaseModel], strict: bool, tool_name: str) -> Callable[[str | bytes | bytearray], Any]:
+    def validate(raw: str | bytes | bytearray) -> BaseModel:
+        try:
+            return params_model.model_validate_json(raw, strict=strict)
+        except ValidationError as e:
+            raise ModelBehaviorError(f"Invalid JSON input for tool {tool_name}: {e}") from e
+
+    return validate
+
+
+def fast_function_tool(name: str, description: str, params_model: type[BaseModel], handler: Callable[[RunContextWrapper[Any], Any], Any], strict: bool = False) -> FunctionTool:
+    """
+    Builds a FunctionTool like the hand written `mytool` in _03_2_1, but validates with a validator compiled
+    at registration instead of `params_model.model_validate_json` on every call. `handler` gets the parsed args.
+    Models whose schema cannot be compiled are validated with pydantic, `handler` then gets the model instance.
+    """
+    schema = params_model.model_json_schema()
+    try:
+        validate = compile_validator(schema, strict=strict, tool_name=name)
+    except ValueError:
+        validate = _pydantic_validator(params_model, strict, name)
+
+    async def on_invoke_tool(context: RunContextWrapper[Any], args: str) -> Any:
+        result = handler(context, validate(args))
+        if hasattr(result, "__await__"):
+            return await result
+        return result
+
+    tool = FunctionTool(
+        name=name,
+        description=description,
+        params_json_schema=schema,
+        on_invoke_tool=on_invoke_tool,
+        strict_json_schema=True,
+    )
+    tool.validate = validate
+    return tool
+
+
+def benchmark(number: int = 200_000) -> dict[str, float]:
+    """Microseconds per call for the current pydantic path and the compiled paths."""
+    payload = '{"name": "John Doe", "age": 30, "email": "programmersafdar@live.com"}'
+    payload_bytes = payload.encode()
+    schema = FunctionArguments.model_json_schema()
+    lax, strict = compile_validator(schema), compile_validator(schema, strict=True)
+    cases = {
+        "pydantic model_validate_json": lambda: FunctionArguments.model_validate_json(payload),
+        "compiled (str)": lambda: lax(payload),
+        "compiled (bytes)": lambda: lax(payload_bytes),
+        "compiled strict (bytes)": lambda: strict(payload_bytes),
+    }
+    return {label: timeit.timeit(fn, number=number) / number * 1e6 for label, fn in cases.items()}
+
+
+def do_some_work(data: str) -> str:
+    print(f"do_some_work function with data: {data}")
+    return f"Processed data: {data}"
+
+
+mytool = fast_function_tool(
+    name="user_info_tool",
+    description="Process user information from the input string.",
+    params_model=FunctionArguments,
+    handler=lambda context, parsed: do_some_work(f"Username: {parsed.name}, Age: {parsed.age}, Email: {parsed.email}"),
+)
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return input[-1]["output"]
+    return FakeToolCall("user_info_tool", {"name": "John Doe", "age": 30, "email": "programmersafdar@live.com"})
+
+
+def main():
+    print("Welcome to Assistant!")
+    for label, micros in benchmark().items():
+        print(f"{label:32} {micros:6.3f} us/call")
+    agent = Agent(
+        name="Assistant",
+        instructions="You are a helpfull assistant",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[mytool],
+    )
+    start = time.perf_counter()
+    result = Runner.run_sync(agent, "process this user info: name John Doe, age 30, email programmersafdar@live.com")
+    print(f"{result.final_output} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    print("Goodbye from Assistant!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import agents
+from agents import Agent, FunctionTool, RunContextWrapper, Runner, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.strict_schema import ensure_strict_json_schema
+from pydantic import BaseModel, ConfigDict
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+
+class SchemaCache:
+    """
+    Content-addressed store of tool JSON schemas. Each schema is kept both as a dict and as its
+    pre-serialized JSON bytes, so repeated turns hand the model the very same objects.
+    Attributes:
+        path (Path | None): Directory to persist schemas across processes, None keeps them in memory only.
+        computed (int): Schemas generated in this process.
+        hits (int): Lookups answered from memory.
+        loaded (int): Lookups answered from the on-disk cache.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = Path(path) if path else None
+        if self.path:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self._schemas: dict[str, tuple[dict[str, Any], bytes]] = {}
+        self.computed = 0
+        self.hits = 0
+        self.loaded = 0
+
+    def get(self, key: str, build: Callable[[], dict[str, Any]]) -> tuple[dict[str, Any], bytes]:
+        entry = self._schemas.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        file = self.path / f"{key}.json" if self.path else None
+        if file is not None and file.exists():
+            raw = file.read_bytes()
+            entry = (json.loads(raw), raw)
+            self.loaded += 1
+        else:
+            schema = build()
+            entry = (schema, json.dumps(schema, separators=(",", ":")).encode())
+            self.computed += 1
+            if file is not None:
+                tmp = file.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_bytes(entry[1])
+                tmp.replace(file)
+        self._schemas[key] = entry
+        return entry
+
+    def stats(self) -> dict[str, int]:
+        return {"computed": self.computed, "hits": self.hits, "loaded": self.loaded, "entries": len(self._schemas)}
+
+
+schema_cache = SchemaCache(os.getenv("AGENTIC_BANKING_SCHEMA_CACHE"))
+
+
+def _annotation_fingerprint(annotation: Any) -> str:
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return model_fingerprint(annotation)
+    return repr(annotation)
+
+
+def model_fingerprint(model: type[BaseModel]) -> str:
+    """Identifies a pydantic model by its fields and config rather than by object identity."""
+    fields = {name: (_annotation_fingerprint(f.annotation), repr(f.default), f.description) for name, f in model.model_fields.items()}
+    return f"{model.__module__}.{model.__qualname__}:{fields}:{sorted(model.model_config.items(), key=str)}"
+
+
+def signature_key(func: Callable[..., Any], **options: Any) -> str:
+    """Hash of everything the generated schema depends on: signature, annotations, docstring, options and SDK version."""
+    signature = inspect.signature(func)
+    parts = [
+        func.__module__,
+        func.__qualname__,
+        str(signature),
+        *(f"{name}={_annotation_fingerprint(p.annotation)}" for name, p in signature.parameters.items()),
+        inspect.getdoc(func) or "",
+        json.dumps(options, sort_keys=True, default=str),
+        agents.__version__,
+    ]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+class LazyFunctionTool(FunctionTool):
+    """
+    A FunctionTool whose description, JSON schema and invoker are only built on first use. The description and the
+    schema both come from `cache`, so with a persistent cache a new process does not build the tool until it is called.
+    Defining a tool then costs a signature hash, and an entry point that never lists the tool
+    to a model never pays for pydantic schema generation at all.
+    """
+
+    def __init__(self, name: str, schema_key: str, build_schema: Callable[[], dict[str, Any]], build_tool: Callable[[], FunctionTool] | None = None,
+                 description: str | None = None, on_invoke_tool: Callable[..., Any] | None = None, strict_json_schema: bool = True,
+                 is_enabled: Any = True, cache: SchemaCache = schema_cache):
+        # FunctionTool.__init__ would build the schema eagerly, so fields are assigned directly.
+        self.name = name
+        self.strict_json_schema = strict_json_schema
+        self.is_enabled = is_enabled
+        self.schema_key = schema_key
+        self._build_schema = build_schema
+        self._build_tool = build_tool
+        self._tool: FunctionTool | None = None
+        self._description = description
+        self._on_invoke_tool = on_invoke_tool
+        self._schema: dict[str, Any] | None = None
+        self._schema_bytes: bytes | None = None
+        self._cache = cache
+
+    def _real_tool(self) -> FunctionTool:
+        if self._tool is None:
+            self._tool = self._build_tool()
+        return self._tool
+
+    def _load_schema(self) -> None:
+        self._schema, self._schema_bytes = self._cache.get(self.schema_key, self._build_schema)
+
+    @property
+    def params_json_schema(self) -> dict[str, Any]:
+        if self._schema is None:
+            self._load_schema()
+        return self._schema
+
+    @params_json_schema.setter
+    def params_json_schema(self, value: dict[str, Any]) -> None:
+        self._schema, self._schema_bytes = value, json.dumps(value, separators=(",", ":")).encode()
+
+    @property
+    def schema_bytes(self) -> bytes:
+        """The schema serialized once, for callers that send or store raw JSON."""
+        if self._schema_bytes is None:
+            self._load_schema()
+        return self._schema_bytes
+
+    @property
+    def description(self) -> str:
+        # The runner reads this on every model call, so it is cached next to the schema rather than taken from
+        # the built tool, which would generate the pydantic schema anyway.
+        if self._description is None:
+            entry, _ = self._cache.get(f"{self.schema_key}-description", lambda: {"description": self._real_tool().description})
+            self._description = entry["description"]
+        return self._description
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self._description = value
+
+    @property
+    def on_invoke_tool(self) -> Callable[..., Any]:
+        if self._on_invoke_tool is None:
+            self._on_invoke_tool = self._real_tool().on_invoke_tool
+        return self._on_invoke_tool
+
+    @on_invoke_tool.setter
+    def on_invoke_tool(self, value: Callable[..., Any]) -> None:
+        self._on_invoke_tool = value
+
+    @classmethod
+    def from_model(cls, name: str, description: str, params_model: type[BaseModel], on_invoke_tool: Callable[..., Any],
+                   strict_json_schema: bool = True, is_enabled: Any = True) -> "LazyFunctionTool":
+        """Lazy replacement for `FunctionTool(params_json_schema=FunctionArguments.model_json_schema(), ...)`."""
+
+        def build_schema() -> dict[str, Any]:
+            schema = params_model.model_json_schema()
+            return ensure_strict_json_schema(schema) if strict_json_schema else schema
+
+        key = hashlib.sha256(f"{model_fingerprint(params_model)}:{strict_json_schema}:{agents.__version__}".encode()).hexdigest()
+        return cls(name, key, build_schema, description=description, on_invoke_tool=on_invoke_tool,
+                   strict_json_schema=strict_json_schema, is_enabled=is_enabled)
+
+
+def lazy_function_tool(func=None, *, name_override: str | None = None, strict_mode: bool = True, is_enabled: Any = True, **kwargs):
+    """Same arguments as `agents.function_tool`, but the schema is generated on first use and cached by signature hash."""
+
+    def create(the_func) -> LazyFunctionTool:
+        tool = LazyFunctionTool(
+            name=name_override or the_func.__name__,
+            schema_key=signature_key(the_func, name_override=name_override, strict_mode=strict_mode, **kwargs),
+            build_schema=lambda: tool._real_tool().params_json_schema,
+            build_tool=lambda: agents.function_tool(the_func, name_override=name_override, strict_mode=strict_mode, is_enabled=is_enabled, **kwargs),
+            strict_json_schema=strict_mode,
+            is_enabled=is_enabled,
+        )
+        return tool
+
+    if callable(func):
+        return create(func)
+    return create
+
+
+class FunctionArguments(BaseModel):
+    name: str
+    age: int
+    email: str
+    model_config = ConfigDict(extra="forbid")
+
+
+async def run_function(context: RunContextWrapper[Any], args: str) -> str:
+    parsed = FunctionArguments.model_validate_json(args)
+    return f"Processed data: Username: {parsed.name}, Age: {parsed.age}, Email: {parsed.email}"
+
+
+mytool = LazyFunctionTool.from_model(
+    name="user_info_tool",
+    description="Process user information from the input string.",
+    params_model=FunctionArguments,
+    on_invoke_tool=run_function,
+)
+
+
+@lazy_function_tool
+def get_weather(city: str) -> str:
+    """
+    Retrieves the weather for a given city.
+
+    Args:
+        city (str): The name of the city to get the weather for.
+    """
+    return f"The current weather in {city} is sunny with a temperature of 25°C."
+
+
+def _make_tools(decorator, count: int) -> list[FunctionTool]:
+    tools = []
+    for i in range(count):
+        def tool_func(account_no: str, amount: float, currency: str = "PKR") -> str:
+            """Banking operation on an account."""
+            return f"{account_no} {amount} {currency}"
+        tool_func.__name__ = tool_func.__qualname__ = f"banking_operation_{i}"
+        tools.append(decorator(tool_func))
+    return tools
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return input[-1]["output"]
+    return FakeToolCall("get_weather", {"city": "Peshawar"})
+
+
+def main():
+    print("Welcome to Lazy tool schema example!")
+    start = time.perf_counter()
+    _make_tools(agents.function_tool, 200)
+    eager_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    lazy_tools = _make_tools(lazy_function_tool, 200)
+    lazy_ms = (time.perf_counter() - start) * 1000
+    print(f"Defining 200 tools: eager {eager_ms:.1f} ms, lazy {lazy_ms:.1f} ms")
+    start = time.perf_counter()
+    lazy_tools[0].params_json_schema
+    print(f"First schema use: {(time.perf_counter() - start) * 1000:.2f} ms, {len(lazy_tools[0].schema_bytes)} bytes")
+    for tool in lazy_tools:
+        tool.params_json_schema
+    # A reload (or a second agent) defines the same tools again, they share the schemas already in memory.
+    start = time.perf_counter()
+    for tool in _make_tools(lazy_function_tool, 200):
+        tool.params_json_schema
+    print(f"Redefining and listing 200 tools: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    agent = Agent(
+        name="Assistant",
+        instructions="You are a helpfull assistant",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[get_weather, mytool],
+    )
+    result = Runner.run_sync(agent, "whats the weather in Peshawar?")
+    print(result.final_output)
+    print(f"Schema cache: {schema_cache.stats()}")
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
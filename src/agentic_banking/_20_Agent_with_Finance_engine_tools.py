@@ -0,0 +1,251 @@
+import os
+from datetime import date
+from typing import Any, Literal
+
+import numpy as np
+from agents import Agent, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from pydantic import BaseModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+DayCount = Literal["30/360", "ACT/360", "ACT/365", "ACT/ACT"]
+Compounding = Literal["simple", "annual", "quarterly", "monthly", "daily", "continuous"]
+PERIODS_PER_YEAR = {"annual": 1, "quarterly": 4, "monthly": 12, "daily": 365}
+
+
+class Portfolio(BaseModel):
+    """
+    Several customers' accounts priced together in one tool call.
+    Attributes:
+        accounts (list[UserInfo]): The accounts, same model the Triage Agent uses as context.
+    """
+    accounts: list[UserInfo]
+
+
+def _dates(values: Any) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def year_fraction(start: Any, end: Any, convention: DayCount = "ACT/365") -> np.ndarray:
+    """Vectorized year fraction between date arrays under a day-count convention."""
+    start, end = _dates(start), _dates(end)
+    days = (end - start).astype(np.int64).astype(np.float64)
+    if convention == "ACT/360":
+        return days / 360.0
+    if convention == "ACT/365":
+        return days / 365.0
+    if convention == "30/360":
+        # US 30/360 (bond basis): day 31 is treated as day 30.
+        y1, y2 = start.astype("datetime64[Y]"), end.astype("datetime64[Y]")
+        m1, m2 = start.astype("datetime64[M]"), end.astype("datetime64[M]")
+        d1 = np.minimum((start - m1).astype(np.int64) + 1, 30)
+        d2 = (end - m2).astype(np.int64) + 1
+        d2 = np.where((d2 == 31) & (d1 == 30), 30, d2)
+        years = (y2 - y1).astype(np.int64)
+        months = (m2 - m1).astype(np.int64) - 12 * years
+        return (360 * years + 30 * months + (d2 - d1)) / 360.0
+    if convention == "ACT/ACT":
+        # ISDA: days in leap years count over 366, the others over 365.
+        start_year = start.astype("datetime64[Y]").astype(np.int64) + 1970
+        end_year = end.astype("datetime64[Y]").astype(np.int64) + 1970
+        result = np.zeros(np.broadcast(start, end).shape)
+        for offset in range(int(np.max(end_year - start_year, initial=0)) + 1):
+            year = start_year + offset
+            year_start = np.maximum(start, (year - 1970).astype("datetime64[Y]").astype("datetime64[D]"))
+            year_end = np.minimum(end, (year - 1969).astype("datetime64[Y]").astype("datetime64[D]"))
+            leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+            days = np.maximum((year_end - year_start).astype(np.int64), 0)
+            result += np.where(year <= end_year, days / np.where(leap, 366.0, 365.0), 0.0)
+        return result
+    raise ValueError(f"Unknown day-count convention: {convention}")
+
+
+def interest(balance: Any, rate_percent: Any, years: Any, compounding: Compounding = "simple") -> np.ndarray:
+    """Interest earned (not the final balance) for arrays of balances, rates and terms."""
+    balance, rate, years = np.asarray(balance, np.float64), np.asarray(rate_percent, np.float64) / 100.0, np.asarray(years, np.float64)
+    if compounding == "simple":
+        return balance * rate * years
+    if compounding == "continuous":
+        return balance * np.expm1(rate * years)
+    n = PERIODS_PER_YEAR[compounding]
+    return balance * np.expm1(n * years * np.log1p(rate / n))
+
+
+def apr_to_apy(apr_percent: Any, periods_per_year: int = 12) -> np.ndarray:
+    apr = np.asarray(apr_percent, np.float64) / 100.0
+    return np.expm1(periods_per_year * np.log1p(apr / periods_per_year)) * 100.0
+
+
+def apy_to_apr(apy_percent: Any, periods_per_year: int = 12) -> np.ndarray:
+    apy = np.asarray(apy_percent, np.float64) / 100.0
+    return periods_per_year * np.expm1(np.log1p(apy) / periods_per_year) * 100.0
+
+
+def amortization(principal: float, annual_rate_percent: float, months: int) -> dict[str, np.ndarray]:
+    """Level-payment schedule computed in closed form for all periods at once."""
+    if months < 1:
+        raise ValueError(f"A loan needs at least one monthly payment, got months={months}")
+    r = annual_rate_percent / 100.0 / 12
+    k = np.arange(1, months + 1, dtype=np.float64)
+    if r == 0:
+        payment = principal / months
+        balance = principal - payment * k
+    else:
+        payment = principal * r / -np.expm1(-months * np.log1p(r))
+        growth = np.exp(k * np.log1p(r))
+        balance = principal * growth - payment * (growth - 1) / r
+    balance[-1] = 0.0
+    previous = np.concatenate(([principal], balance[:-1]))
+    interest_part = previous * r
+    return {
+        "period": k.astype(np.int64),
+        "payment": np.full(months, payment),
+        "interest": interest_part,
+        "principal": payment - interest_part,
+        "balance": balance,
+    }
+
+
+def _money(values: np.ndarray) -> list[float]:
+    return np.round(values, 2).tolist()
+
+
+@function_tool
+def calculate_interest(balances: list[float], rate_percent: float, years: float, compounding: Compounding = "simple") -> dict[str, Any]:
+    """
+    Calculates interest for one or many account balances at once.
+
+    Args:
+        balances: Account balances.
+        rate_percent: Annual interest rate in percent, e.g. 3.2.
+        years: Term in years, e.g. 1 for annual interest.
+        compounding: simple, annual, quarterly, monthly, daily or continuous.
+    """
+    result = interest(balances, rate_percent, years, compounding)
+    return {"interest": _money(result), "total_interest": round(float(result.sum()), 2)}
+
+
+@function_tool
+def interest_between_dates(balance: float, rate_percent: float, start_date: str, end_date: str, convention: DayCount = "ACT/365") -> dict[str, Any]:
+    """
+    Calculates simple interest accrued between two ISO dates (YYYY-MM-DD) under a day-count convention.
+
+    Args:
+        balance: Account balance.
+        rate_percent: Annual interest rate in percent.
+        start_date: First day of accrual.
+        end_date: Day accrual stops.
+        convention: 30/360, ACT/360, ACT/365 or ACT/ACT.
+    """
+    fraction = float(year_fraction(date.fromisoformat(start_date), date.fromisoformat(end_date), convention))
+    return {"year_fraction": round(fraction, 6), "interest": round(float(interest(balance, rate_percent, fraction)), 2)}
+
+
+@function_tool
+def convert_apr_apy(rate_percent: float, direction: Literal["apr_to_apy", "apy_to_apr"], periods_per_year: int = 12) -> float:
+    """
+    Converts between APR and APY.
+
+    Args:
+        rate_percent: The rate to convert, in percent.
+        direction: apr_to_apy or apy_to_apr.
+        periods_per_year: Compounding periods per year.
+    """
+    convert = apr_to_apy if direction == "apr_to_apy" else apy_to_apr
+    return round(float(convert(rate_percent, periods_per_year)), 6)
+
+
+@function_tool
+def amortization_schedule(principal: float, annual_rate_percent: float, months: int, max_rows: int = 12) -> dict[str, Any]:
+    """
+    Builds a loan amortization schedule with a level monthly payment.
+
+    Args:
+        principal: Loan amount.
+        annual_rate_percent: Annual interest rate in percent.
+        months: Number of monthly payments.
+        max_rows: How many leading rows of the schedule to return.
+    """
+    schedule = amortization(principal, annual_rate_percent, months)
+    rows = [
+        {"period": int(p), "payment": pay, "interest": i, "principal": pr, "balance": b}
+        for p, pay, i, pr, b in zip(schedule["period"][:max_rows], *(_money(schedule[c][:max_rows]) for c in ("payment", "interest", "principal", "balance")))
+    ]
+    return {"monthly_payment": round(float(schedule["payment"][0]), 2), "total_interest": round(float(schedule["interest"].sum()), 2), "rows": rows}
+
+
+def price_accounts(accounts: list[UserInfo], rates_by_type: dict[str, float], years: float = 1.0, compounding: Compounding = "simple") -> dict[str, Any]:
+    """Prices every account in one vectorized pass, rates are looked up by `userAccountType`."""
+    balances = np.fromiter((a.userAccountBalance for a in accounts), np.float64, len(accounts))
+    rates = np.fromiter((rates_by_type.get(a.userAccountType, 0.0) for a in accounts), np.float64, len(accounts))
+    earned = interest(balances, rates, years, compounding)
+    return {
+        "accounts": [
+            {"account_no": a.userAccountNo, "interest": e, "currency": a.userAccountCurrency}
+            for a, e in zip(accounts, _money(earned))
+        ],
+        "total_interest": round(float(earned.sum()), 2),
+    }
+
+
+@function_tool
+def price_portfolio(context: RunContextWrapper[UserInfo | Portfolio], saving_rate_percent: float, current_rate_percent: float = 0.0, years: float = 1.0, compounding: Compounding = "simple") -> dict[str, Any]:
+    """
+    Calculates interest for the customer's account, or every account in the portfolio, from the run context.
+
+    Args:
+        saving_rate_percent: Annual rate for Saving accounts, in percent.
+        current_rate_percent: Annual rate for Current accounts, in percent.
+        years: Term in years.
+        compounding: simple, annual, quarterly, monthly, daily or continuous.
+    """
+    accounts = context.context.accounts if isinstance(context.context, Portfolio) else [context.context]
+    return price_accounts(accounts, {"Saving": saving_rate_percent, "Current": current_rate_percent}, years, compounding)
+
+
+InterestFinderAgent = Agent[UserInfo](
+    name="Banking Interest Finder Assistant",
+    instructions="ALWAYS START WITH YOUR NAME THAT (THAT I'M Intreset Finding AGENT). "
+                 "Never calculate interest yourself, always call the finance tools and only explain their results to the customer "
+                 "in the same currency as the account.",
+    tools=[calculate_interest, interest_between_dates, convert_apr_apy, amortization_schedule, price_portfolio],
+)
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"THAT I'M Intreset Finding AGENT. {input[-1]['output']}"
+    return FakeToolCall("price_portfolio", {"saving_rate_percent": 3.2})
+
+
+def main():
+    print("Welcome to Finance engine example!")
+    userinfo = UserInfo(
+        userName="Safdar Ali Shah",
+        userAccountNo="123456789",
+        userAccountType="Saving",
+        userAccountBalance=10765490.0,
+        userAccountCurrency="PKR",
+    )
+    agent = InterestFinderAgent.clone(model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply))
+    result = Runner.run_sync(agent, "Calculate the APRI on my savings in my account, if the Interest rate is 3.2 percent?", context=userinfo)
+    print(result.final_output)
+
+    rng = np.random.default_rng(7)
+    portfolio = Portfolio(accounts=[
+        UserInfo(userName=f"Customer {i}", userAccountNo=f"{i:09d}", userAccountType="Saving" if i % 3 else "Current",
+                 userAccountBalance=float(balance))
+        for i, balance in enumerate(rng.uniform(1_000, 5_000_000, 10_000).round(2))
+    ])
+    priced = price_accounts(portfolio.accounts, {"Saving": 3.2, "Current": 0.5}, years=1.0, compounding="monthly")
+    print(f"Priced {len(priced['accounts'])} accounts, total interest {priced['total_interest']} PKR")
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
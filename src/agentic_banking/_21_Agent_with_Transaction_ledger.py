@@ -0,0 +1,312 @@
+import csv
+import math
+import os
+import tempfile
+import time
+from typing import Any, Iterable
+
+import numpy as np
+from agents import Agent, RunContextWrapper, Runner, function_tool, handoff, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from pydantic import BaseModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+CSV_COLUMNS = ("txn_id", "account_no", "amount", "merchant", "timestamp")
+# Amount bucket widths in cents, one lazily built index each.
+AMOUNT_BUCKET_WIDTHS = (1, 16, 256, 4096)
+
+
+def _to_epoch_seconds(values: Iterable[Any]) -> np.ndarray:
+    array = np.asarray(list(values) if not isinstance(values, np.ndarray) else values)
+    if array.dtype.kind in "iuf":
+        return array.astype(np.int64)
+    return array.astype("datetime64[s]").astype(np.int64)
+
+
+class TransactionLedger:
+    """
+    Columnar, array-backed transaction store. Each column is a NumPy array grown by doubling, strings
+    (accounts, merchants) are dictionary-encoded to small ints, and a hash index on
+    (account, amount bucket, merchant, time bucket) answers "was this charged before?" with a few dict probes.
+    There is one index per width in AMOUNT_BUCKET_WIDTHS, built the first time a query needs it: exact amounts use
+    width 1, a tolerance uses the smallest width above it (the largest one past that), and matching amounts are in
+    the buckets within ceil(tolerance / width) of the charge's own. The widths are fixed, so a caller's tolerances
+    bound neither the number of indexes nor the cost of keeping them up to date.
+    Attributes:
+        size (int): Number of transactions stored.
+        bucket_seconds (int): Width of the time bucket used in the index.
+    """
+
+    def __init__(self, capacity: int = 1024, bucket_seconds: int = 3600):
+        self.bucket_seconds = bucket_seconds
+        self.size = 0
+        self.account = np.empty(capacity, np.int32)
+        self.amount_cents = np.empty(capacity, np.int64)
+        self.merchant = np.empty(capacity, np.int32)
+        self.timestamp = np.empty(capacity, np.int64)
+        self.txn_ids: list[str] = []
+        self._account_codes: dict[str, int] = {}
+        self._account_names: list[str] = []
+        self._merchant_codes: dict[str, int] = {}
+        self._merchant_names: list[str] = []
+        self._indexes: dict[int, dict[tuple[int, int, int, int], list[int]]] = {1: {}}
+        self._by_account: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def _encode(value: str, codes: dict[str, int], names: list[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        capacity = len(self.account)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for column in ("account", "amount_cents", "merchant", "timestamp"):
+            old = getattr(self, column)
+            new = np.empty(capacity, old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, column, new)
+
+    def extend(self, txn_ids: Iterable[str], accounts: Iterable[str], amounts: Iterable[float], merchants: Iterable[str], timestamps: Iterable[Any]) -> None:
+        """Bulk append, the numeric columns are converted in one vectorized step each."""
+        txn_ids = list(txn_ids)
+        count = len(txn_ids)
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        account_codes = [self._encode(str(a), self._account_codes, self._account_names) for a in accounts]
+        merchant_codes = [self._encode(str(m), self._merchant_codes, self._merchant_names) for m in merchants]
+        self.account[start:end] = account_codes
+        self.merchant[start:end] = merchant_codes
+        self.amount_cents[start:end] = np.round(np.asarray(list(amounts), np.float64) * 100).astype(np.int64)
+        self.timestamp[start:end] = _to_epoch_seconds(timestamps)
+        self.txn_ids.extend(str(t) for t in txn_ids)
+        self.size = end
+        for width, index in self._indexes.items():
+            self._index_rows(index, width, start, end)
+        for row, code in enumerate(account_codes, start):
+            self._by_account.setdefault(code, []).append(row)
+
+    def _index_rows(self, index: dict[tuple[int, int, int, int], list[int]], width: int, start: int, end: int) -> None:
+        amounts = (self.amount_cents[start:end] // width).tolist()
+        buckets = (self.timestamp[start:end] // self.bucket_seconds).tolist()
+        for row, key in enumerate(zip(self.account[start:end].tolist(), amounts, self.merchant[start:end].tolist(), buckets), start):
+            index.setdefault(key, []).append(row)
+
+    def _index_for(self, width: int) -> dict[tuple[int, int, int, int], list[int]]:
+        index = self._indexes.get(width)
+        if index is None:
+            index = self._indexes[width] = {}
+            self._index_rows(index, width, 0, self.size)
+        return index
+
+    def add(self, txn_id: str, account_no: str, amount: float, merchant: str, timestamp: Any) -> int:
+        self.extend([txn_id], [account_no], [amount], [merchant], [timestamp])
+        return self.size - 1
+
+    def load_csv(self, path: str, chunk_size: int = 100_000) -> int:
+        """Loads a CSV with columns txn_id, account_no, amount, merchant, timestamp (ISO or epoch seconds)."""
+        loaded = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), reader)]
+                if not chunk:
+                    return loaded
+                timestamps = [row["timestamp"] for row in chunk]
+                if all(t.lstrip("-").isdigit() for t in timestamps):
+                    timestamps = [int(t) for t in timestamps]
+                self.extend(*([row[c] for row in chunk] for c in CSV_COLUMNS[:4]), timestamps)
+                loaded += len(chunk)
+
+    def load_parquet(self, path: str) -> int:
+        """Loads a Parquet file with the CSV columns, needs the optional `pyarrow` package."""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Loading Parquet needs pyarrow, install it with `pip install pyarrow`.") from e
+        table = pq.read_table(path, columns=list(CSV_COLUMNS))
+        timestamps = table.column("timestamp").to_numpy()
+        if timestamps.dtype.kind == "M":
+            timestamps = timestamps.astype("datetime64[s]").astype(np.int64)
+        self.extend(*(table.column(c).to_pylist() for c in CSV_COLUMNS[:3]), table.column("merchant").to_pylist(), timestamps)
+        return table.num_rows
+
+    def row(self, i: int) -> dict[str, Any]:
+        return {
+            "txn_id": self.txn_ids[i],
+            "account_no": self._account_names[int(self.account[i])],
+            "amount": int(self.amount_cents[i]) / 100,
+            "merchant": self._merchant_names[int(self.merchant[i])],
+            "timestamp": str(np.datetime64(int(self.timestamp[i]), "s")),
+        }
+
+    def duplicates_of(self, i: int, window_seconds: int = 3600, amount_tolerance_cents: int = 0) -> list[int]:
+        """
+        Rows with the same account and merchant within `window_seconds` of row `i` and an amount within
+        `amount_tolerance_cents` of it. Cost is a few dict probes per time bucket, independent of ledger size,
+        tolerances above the widest bucket probe one more bucket per 4096 cents. When that would be more probes
+        than the account has rows, the account's rows are scanned instead.
+        """
+        if amount_tolerance_cents < 0:
+            raise ValueError(f"amount_tolerance_cents must not be negative, got {amount_tolerance_cents}")
+        account, amount, merchant, ts = int(self.account[i]), int(self.amount_cents[i]), int(self.merchant[i]), int(self.timestamp[i])
+        width = next((w for w in AMOUNT_BUCKET_WIDTHS if w > amount_tolerance_cents), AMOUNT_BUCKET_WIDTHS[-1])
+        index = self._index_for(width)
+        bucket = ts // self.bucket_seconds
+        reach = math.ceil(window_seconds / self.bucket_seconds)
+        amount_bucket = amount // width
+        amount_reach = -(-amount_tolerance_cents // width)
+        amount_buckets = range(amount_bucket - amount_reach, amount_bucket + amount_reach + 1)
+        account_rows = self._by_account.get(account, [])
+        if (2 * reach + 1) * len(amount_buckets) > len(account_rows):
+            # A wide window or tolerance would probe more buckets than the account has rows.
+            candidates = (r for r in account_rows if self.merchant[r] == merchant)
+        else:
+            candidates = (other for b in range(bucket - reach, bucket + reach + 1) for a in amount_buckets
+                          for other in index.get((account, a, merchant, b), ()))
+        matches = []
+        for other in candidates:
+            if other == i or abs(int(self.amount_cents[other]) - amount) > amount_tolerance_cents:
+                continue
+            if abs(int(self.timestamp[other]) - ts) <= window_seconds:
+                matches.append(other)
+        return sorted(matches)
+
+    def find_duplicates(self, account_no: str, window_seconds: int = 3600, amount_tolerance_cents: int = 0, since: Any = None) -> list[list[int]]:
+        """Groups of repeated charges on one account, each group is sorted by time."""
+        code = self._account_codes.get(account_no)
+        if code is None:
+            return []
+        rows = self._by_account.get(code, [])
+        if since is not None:
+            cutoff = int(_to_epoch_seconds([since])[0])
+            rows = [r for r in rows if self.timestamp[r] >= cutoff]
+        seen: set[int] = set()
+        groups = []
+        for row in rows:
+            if row in seen:
+                continue
+            others = self.duplicates_of(row, window_seconds, amount_tolerance_cents)
+            if others:
+                group = sorted({row, *others}, key=lambda r: (self.timestamp[r], r))
+                seen.update(group)
+                groups.append(group)
+        return groups
+
+    def recent(self, account_no: str, limit: int = 10) -> list[int]:
+        rows = self._by_account.get(self._account_codes.get(account_no, -1), [])
+        return sorted(rows, key=lambda r: self.timestamp[r], reverse=True)[:limit]
+
+
+ledger = TransactionLedger()
+
+
+class EscalationData(BaseModel):
+    reason: str
+
+
+@function_tool
+def find_duplicate_charges(context: RunContextWrapper[UserInfo], window_minutes: int = 60, amount_tolerance: float = 0.0) -> dict[str, Any]:
+    """
+    Finds charges on the customer's account that were posted more than once, same merchant and amount
+    within `window_minutes` of each other.
+
+    Args:
+        window_minutes: How close in time two charges must be to count as duplicates.
+        amount_tolerance: Largest amount difference still treated as the same charge, e.g. 0.5 for rounding.
+    """
+    groups = ledger.find_duplicates(context.context.userAccountNo, window_minutes * 60, round(amount_tolerance * 100))
+    return {
+        "duplicate_groups": [[ledger.row(r) for r in group] for group in groups],
+        "refundable_amount": round(sum(int(ledger.amount_cents[g[1:]].sum()) for g in groups) / 100, 2),
+    }
+
+
+@function_tool
+def recent_transactions(context: RunContextWrapper[UserInfo], limit: int = 10) -> list[dict[str, Any]]:
+    """
+    Lists the customer's most recent transactions.
+
+    Args:
+        limit: Maximum number of transactions to return.
+    """
+    return [ledger.row(r) for r in ledger.recent(context.context.userAccountNo, limit)]
+
+
+async def on_escalation(ctx: RunContextWrapper[UserInfo], input_data: EscalationData):
+    print(f"Escalation agent called with reason: {input_data.reason}")
+
+
+escalation_agent = Agent(name="Escalation agent")
+
+
+def write_sample_csv(path: str, rows: int = 50_000, seed: int = 11) -> None:
+    """Synthetic statement export with one deliberate double charge on account 123456789."""
+    rng = np.random.default_rng(seed)
+    merchants = ["Daraz", "Foodpanda", "Careem", "K-Electric", "Imtiaz", "Shell", "Netflix"]
+    start = np.datetime64("2025-01-01T00:00:00")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        accounts = rng.integers(100_000_000, 100_000_500, rows)
+        amounts = rng.uniform(100, 20_000, rows).round(2)
+        shops = rng.integers(0, len(merchants), rows)
+        offsets = np.sort(rng.integers(0, 180 * 86400, rows))
+        for i in range(rows):
+            writer.writerow([f"T{i:08d}", accounts[i], amounts[i], merchants[shops[i]], str(start + int(offsets[i]))])
+        writer.writerow(["T_DUP_1", "123456789", 4599.0, "Daraz", "2025-06-20T10:15:00"])
+        writer.writerow(["T_DUP_2", "123456789", 4599.0, "Daraz", "2025-06-20T10:16:30"])
+        writer.writerow(["T_OK_3", "123456789", 1200.0, "Careem", "2025-06-21T18:00:00"])
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"I checked your account: {input[-1]['output']}"
+    return FakeToolCall("find_duplicate_charges", {"window_minutes": 60})
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        write_sample_csv(path)
+        start = time.perf_counter()
+        loaded = ledger.load_csv(path)
+        print(f"Loaded {loaded} transactions in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        ledger.duplicates_of(i % ledger.size)
+    print(f"Duplicate lookup: {(time.perf_counter() - start) / 10_000 * 1e6:.2f} us per transaction")
+
+    userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+    agent = Agent[UserInfo](
+        name="Banking Assistant",
+        instructions="You are a helpfull assistant, who help in customer service and banking. "
+                     "For double or wrong charges call find_duplicate_charges first and explain what you found. "
+                     "Only handoff to the escalation agent if the tools cannot resolve the issue.",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[find_duplicate_charges, recent_transactions],
+        handoffs=[handoff(agent=escalation_agent, on_handoff=on_escalation, input_type=EscalationData)],
+    )
+    result = Runner.run_sync(agent, "I was charged twice for a transaction; please resolve this issue.", context=userinfo)
+    print(result.final_output)
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Iterator
+
+import numpy as np
+from agents import Agent, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking._21_Agent_with_Transaction_ledger import TransactionLedger
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+MAGIC = b"ABSTMT01"
+HEADER = np.dtype([("magic", "S8"), ("records", "<i8"), ("index_stride", "<i8"), ("reserved", "<i8")])
+# 32 byte little-endian record, amounts are signed cents (negative = money out).
+RECORD = np.dtype([
+    ("timestamp", "<i8"),
+    ("account", "<i8"),
+    ("amount_cents", "<i8"),
+    ("merchant", "<i4"),
+    ("category", "<i2"),
+    ("reserved", "<i2"),
+])
+CATEGORIES = ["salary", "groceries", "food", "transport", "utilities", "shopping", "entertainment", "transfer"]
+
+
+def write_statement(path: str, records: np.ndarray, index_stride: int = 4096) -> None:
+    """Writes records sorted by timestamp behind a fixed header, the layout StatementReader maps."""
+    records = np.sort(np.asarray(records, RECORD), order="timestamp", kind="stable")
+    header = np.array([(MAGIC, len(records), index_stride, 0)], HEADER)
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        records.tofile(f)
+
+
+def export_ledger(ledger: TransactionLedger, path: str, categories: np.ndarray | None = None) -> None:
+    """Dumps a TransactionLedger (debits as negative amounts) into the binary statement format."""
+    n = ledger.size
+    records = np.zeros(n, RECORD)
+    records["timestamp"] = ledger.timestamp[:n]
+    records["account"] = [int(a) for a in np.asarray(ledger._account_names)[ledger.account[:n]]]
+    records["amount_cents"] = -ledger.amount_cents[:n]
+    records["merchant"] = ledger.merchant[:n]
+    records["category"] = categories if categories is not None else 0
+    write_statement(path, records)
+
+
+class StatementReader:
+    """
+    Memory-maps a statement file and hands out zero-copy NumPy views of it, so scanning years of
+    transactions never holds more than one chunk in memory.
+
+    Other fixed-width binary layouts work too: pass a structured `dtype` and `header_bytes`, the records need an
+    integer `timestamp` field (epoch seconds, ascending) for the index and seeks.
+    Attributes:
+        records (np.memmap): The whole file as a record array, pages are loaded by the OS on access.
+        sparse_index (np.ndarray): Timestamp of every `index_stride`-th record, for date seeks.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype = RECORD, header_bytes: int | None = None, index_stride: int = 4096):
+        if header_bytes is None:
+            header = np.fromfile(path, HEADER, count=1)[0]
+            if header["magic"] != MAGIC:
+                raise ValueError(f"{path} is not a binary statement file")
+            header_bytes, index_stride = HEADER.itemsize, int(header["index_stride"])
+        if dtype.names is None or "timestamp" not in dtype.names or dtype["timestamp"].kind not in "iu":
+            raise ValueError(f"Statement records need an integer timestamp field, got {dtype}")
+        self.path = path
+        self.header_bytes = header_bytes
+        self.index_stride = index_stride
+        size = os.path.getsize(path) - header_bytes
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=header_bytes, shape=(size // dtype.itemsize,))
+        self.sparse_index = self._load_or_build_index()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _load_or_build_index(self) -> np.ndarray:
+        """
+        The sparse index from the `.idx.npy` sidecar, rebuilt when the file is newer or when the sidecar was
+        built with another stride or record layout (a different `dtype` or `header_bytes` for the same file).
+        """
+        sidecar = f"{self.path}.idx.npy"
+        layout = repr((self.records.dtype.descr, self.header_bytes)).encode()
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(self.path):
+            stored = np.load(sidecar)
+            if stored.dtype.names == ("index_stride", "layout", "index") and stored["index_stride"][0] == self.index_stride \
+                    and stored["layout"][0] == layout:
+                return stored["index"][0]
+        # Strided read, touches one page per stride instead of the whole file.
+        index = np.ascontiguousarray(self.records["timestamp"][:: self.index_stride])
+        stored = np.zeros(1, [("index_stride", "<i8"), ("layout", f"S{len(layout)}"), ("index", index.dtype, index.shape)])
+        stored["index_stride"], stored["layout"], stored["index"] = self.index_stride, layout, index
+        try:
+            np.save(sidecar, stored)
+        except OSError:
+            pass  # Read-only location, the index is cheap to rebuild.
+        return index
+
+    def seek(self, timestamp: int) -> int:
+        """Position of the first record at or after `timestamp`, one binary search plus one block."""
+        block = max(int(np.searchsorted(self.sparse_index, timestamp, side="left")) - 1, 0)
+        start = block * self.index_stride
+        window = self.records["timestamp"][start : start + self.index_stride + 1]
+        return start + int(np.searchsorted(window, timestamp, side="left"))
+
+    def between(self, start: Any = None, end: Any = None) -> np.ndarray:
+        """Zero-copy view of the records with start <= timestamp < end."""
+        lo = 0 if start is None else self.seek(_epoch(start))
+        hi = len(self.records) if end is None else self.seek(_epoch(end))
+        return self.records[lo:hi]
+
+    def chunks(self, start: Any = None, end: Any = None, chunk_records: int = 1 << 16) -> Iterator[np.ndarray]:
+        view = self.between(start, end)
+        for offset in range(0, len(view), chunk_records):
+            yield view[offset : offset + chunk_records]
+
+    def raw(self, start: Any = None, end: Any = None) -> memoryview:
+        """The same range as raw bytes, for handing off to other readers without a copy."""
+        return memoryview(self.between(start, end)).cast("B")
+
+
+def _epoch(value: Any) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+def balance_history(reader: StatementReader, account: int, current_balance: float, start: str, end: str, period: str = "M") -> list[dict[str, Any]]:
+    """Closing balance per period (D, W or M), worked backwards from the current balance. Quiet periods keep the balance before them."""
+    start_ts, end_ts = _epoch(start), _epoch(end)
+    if end_ts <= start_ts:
+        return []
+    flows: dict[np.datetime64, int] = {}
+    for chunk in reader.chunks(start_ts, end_ts):
+        mine = chunk[chunk["account"] == account]
+        if not len(mine):
+            continue
+        periods = mine["timestamp"].astype("datetime64[s]").astype(f"datetime64[{period}]")
+        keys, inverse = np.unique(periods, return_inverse=True)
+        sums = np.bincount(inverse, weights=mine["amount_cents"], minlength=len(keys))
+        for key, total in zip(keys, sums):
+            flows[key] = flows.get(key, 0) + int(total)
+    after_end = sum(int(c["amount_cents"][c["account"] == account].sum()) for c in reader.chunks(end_ts, None))
+    closing = round(current_balance * 100) - after_end
+    first, last = (np.datetime64(ts, "s").astype(f"datetime64[{period}]") for ts in (start_ts, end_ts - 1))
+    history = []
+    for key in np.arange(first, last + 1)[::-1]:
+        flow = flows.get(key, 0)
+        history.append({"period": str(key), "net_flow": flow / 100, "closing_balance": closing / 100})
+        closing -= flow
+    return history[::-1]
+
+
+def spend_by_category(reader: StatementReader, account: int, start: str, end: str) -> dict[str, float]:
+    totals = np.zeros(len(CATEGORIES), np.int64)
+    for chunk in reader.chunks(start, end):
+        spent = chunk[(chunk["account"] == account) & (chunk["amount_cents"] < 0)]
+        totals += np.bincount(spent["category"], weights=-spent["amount_cents"], minlength=len(CATEGORIES)).astype(np.int64)[: len(CATEGORIES)]
+    return {name: total / 100 for name, total in zip(CATEGORIES, totals.tolist()) if total}
+
+
+statement_reader: StatementReader | None = None
+
+
+@function_tool
+def get_balance_history(context: RunContextWrapper[UserInfo], start_date: str, end_date: str, period: str = "M") -> list[dict[str, Any]]:
+    """
+    Closing balance of the customer's account for each day (D), week (W) or month (M) between two ISO dates.
+
+    Args:
+        start_date: First day, YYYY-MM-DD.
+        end_date: Day after the last day, YYYY-MM-DD.
+        period: D, W or M.
+    """
+    info = context.context
+    return balance_history(statement_reader, int(info.userAccountNo), info.userAccountBalance, start_date, end_date, period)
+
+
+@function_tool
+def get_spend_by_category(context: RunContextWrapper[UserInfo], start_date: str, end_date: str) -> dict[str, float]:
+    """
+    Total spending of the customer per category between two ISO dates.
+
+    Args:
+        start_date: First day, YYYY-MM-DD.
+        end_date: Day after the last day, YYYY-MM-DD.
+    """
+    return spend_by_category(statement_reader, int(context.context.userAccountNo), start_date, end_date)
+
+
+def synthetic_records(count: int, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    records = np.zeros(count, RECORD)
+    records["timestamp"] = np.sort(rng.integers(_epoch("2020-01-01"), _epoch("2025-07-01"), count))
+    records["account"] = np.where(rng.random(count) < 0.01, 123456789, rng.integers(100_000_000, 100_010_000, count))
+    records["category"] = rng.integers(0, len(CATEGORIES), count)
+    amounts = rng.integers(100_00, 20_000_00, count)
+    records["amount_cents"] = np.where(records["category"] == 0, amounts * 10, -amounts)
+    records["merchant"] = rng.integers(0, 500, count)
+    return records
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"Here is your spending: {input[-1]['output']}"
+    return FakeToolCall("get_spend_by_category", {"start_date": "2024-01-01", "end_date": "2025-01-01"})
+
+
+def main():
+    global statement_reader
+    print("Welcome to agentic-banking!")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.bin")
+        write_statement(path, synthetic_records(2_000_000))
+        print(f"Statement file: {os.path.getsize(path) / 1e6:.1f} MB")
+        statement_reader = StatementReader(path)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        history = balance_history(statement_reader, 123456789, 10765490.0, "2021-01-01", "2025-01-01")
+        elapsed = (time.perf_counter() - start) * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{len(history)} months of balance history in {elapsed:.1f} ms, peak Python memory {peak / 1e6:.1f} MB")
+        print(f"Seek to 2024-06-01: record #{statement_reader.seek(_epoch('2024-06-01'))} of {len(statement_reader)}")
+
+        userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+        agent = Agent[UserInfo](
+            name="Banking Assistant",
+            instructions="You are a helpfull assistant, who help in customer service and banking. "
+                         "Use the statement tools for any question about past balances or spending.",
+            model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+            tools=[get_balance_history, get_spend_by_category],
+        )
+        result = Runner.run_sync(agent, "How much did I spend on each category in 2024?", context=userinfo)
+        print(result.final_output)
+        statement_reader = None
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
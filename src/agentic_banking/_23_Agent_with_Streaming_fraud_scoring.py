@@ -0,0 +1,247 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import numpy as np
+from agents import Agent, RunContextWrapper, RunResult, Runner, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from pydantic import BaseModel
+
+from agentic_banking._22_Agent_with_Memory_mapped_statement_reader import RECORD, synthetic_records
+from agentic_banking.fake_model import FakeModel
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+
+class EscalationData(BaseModel):
+    reason: str
+
+
+@dataclass
+class FraudAlert:
+    account: int
+    timestamp: int
+    amount: float
+    z_score: float
+    velocity: float
+    reason: str
+
+
+class AccountSlots:
+    """Maps account numbers to dense array slots with a sorted key array, so lookups are one searchsorted per batch."""
+
+    def __init__(self):
+        self.keys = np.empty(0, np.int64)
+        self.slots = np.empty(0, np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, accounts: np.ndarray) -> np.ndarray:
+        pos = np.searchsorted(self.keys, accounts)
+        found = (pos < len(self.keys)) & (self.keys[np.minimum(pos, len(self.keys) - 1)] == accounts) if len(self.keys) else np.zeros(len(accounts), bool)
+        if not found.all():
+            new = np.unique(accounts[~found])
+            keys = np.concatenate([self.keys, new])
+            slots = np.concatenate([self.slots, np.arange(len(self.keys), len(keys))])
+            order = np.argsort(keys, kind="stable")
+            self.keys, self.slots = keys[order], slots[order]
+            pos = np.searchsorted(self.keys, accounts)
+        return self.slots[pos]
+
+
+class RollingAccountStats:
+    """
+    Per-account exponentially weighted mean/variance of spend and a time-decayed transaction velocity,
+    held in flat NumPy arrays (about 40 bytes per account).
+
+    Batches are scored exactly as if events were processed one by one: events are split into rounds
+    by their occurrence number per account, and each round updates all its accounts in one vector step.
+    Attributes:
+        alpha (float): EWMA weight of the newest amount.
+        velocity_tau (float): Seconds for the velocity counter to decay by 1/e.
+        z_threshold (float): Alert when an amount is this many standard deviations above the account mean.
+        velocity_threshold (float): Alert when the decayed transaction count exceeds this.
+        min_history (int): Transactions needed before z-scores are trusted.
+    """
+
+    def __init__(self, alpha: float = 0.05, velocity_tau: float = 3600.0, z_threshold: float = 4.0,
+                 velocity_threshold: float = 8.0, min_history: int = 10, capacity: int = 1024):
+        self.alpha = alpha
+        self.velocity_tau = velocity_tau
+        self.z_threshold = z_threshold
+        self.velocity_threshold = velocity_threshold
+        self.min_history = min_history
+        self.accounts = AccountSlots()
+        self.mean = np.zeros(capacity)
+        self.var = np.zeros(capacity)
+        self.velocity = np.zeros(capacity)
+        self.last_ts = np.zeros(capacity, np.int64)
+        self.count = np.zeros(capacity, np.int32)
+        self.events = 0
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self.mean)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("mean", "var", "velocity", "last_ts", "count"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def score(self, batch: np.ndarray) -> list[FraudAlert]:
+        """Updates the statistics with a time-ordered RECORD batch and returns the alerts it raised, only debits are scored."""
+        self.events += len(batch)
+        batch = batch[batch["amount_cents"] < 0]
+        if not len(batch):
+            return []
+        slots = self.accounts.lookup(batch["account"])
+        self._grow(len(self.accounts))
+        amounts = np.abs(batch["amount_cents"]).astype(np.float64) / 100
+        timestamps = batch["timestamp"]
+
+        # rank[i] = how many earlier events of the same account are in this batch.
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+        rank_sorted = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+        rank = np.empty_like(rank_sorted)
+        rank[order] = rank_sorted
+        by_round = np.lexsort((np.arange(len(rank)), rank))
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+
+        z = np.zeros(len(batch))
+        velocity = np.zeros(len(batch))
+        for r in range(len(bounds) - 1):
+            idx = by_round[bounds[r] : bounds[r + 1]]
+            s, x, ts = slots[idx], amounts[idx], timestamps[idx]
+            seen = self.count[s]
+            std = np.sqrt(self.var[s])
+            z[idx] = np.where((seen >= self.min_history) & (std > 0), (x - self.mean[s]) / np.where(std > 0, std, 1), 0.0)
+            decay = np.exp(-np.maximum(ts - self.last_ts[s], 0) / self.velocity_tau)
+            v = np.where(seen > 0, self.velocity[s] * decay, 0.0) + 1
+            velocity[idx] = v
+            diff = np.where(seen > 0, x - self.mean[s], 0.0)
+            incr = self.alpha * diff
+            self.mean[s] = np.where(seen > 0, self.mean[s] + incr, x)
+            self.var[s] = (1 - self.alpha) * (self.var[s] + diff * incr)
+            self.velocity[s] = v
+            self.last_ts[s] = ts
+            self.count[s] = seen + 1
+
+        flagged = np.flatnonzero((z > self.z_threshold) | (velocity > self.velocity_threshold))
+        return [
+            FraudAlert(
+                account=int(batch["account"][i]),
+                timestamp=int(timestamps[i]),
+                amount=float(amounts[i]),
+                z_score=round(float(z[i]), 2),
+                velocity=round(float(velocity[i]), 2),
+                reason="unusual amount" if z[i] > self.z_threshold else "high transaction velocity",
+            )
+            for i in flagged
+        ]
+
+
+async def score_stream(source: AsyncIterator[np.ndarray], stats: RollingAccountStats, cooldown_seconds: int = 3600) -> AsyncIterator[FraudAlert]:
+    """Pipeline stage: consumes transaction batches and yields alerts, at most one per account per cooldown."""
+    last_alert: dict[int, int] = {}
+    async for batch in source:
+        for alert in stats.score(batch):
+            if alert.timestamp - last_alert.get(alert.account, -cooldown_seconds) >= cooldown_seconds:
+                last_alert[alert.account] = alert.timestamp
+                yield alert
+
+
+async def on_escalation(ctx: RunContextWrapper[EscalationData], agent: Agent) -> str:
+    return f"You are a fraud escalation agent. Investigate this alert and draft a message to the customer: {ctx.context.reason}"
+
+
+escalation_agent = Agent[EscalationData](name="Escalation agent", instructions=on_escalation)
+
+
+async def escalate(alerts: AsyncIterator[FraudAlert], agent: Agent[EscalationData], max_concurrent: int = 4,
+                   limit: int | None = None) -> AsyncIterator[RunResult]:
+    """
+    Starts an escalation agent run for each alert without waiting for the customer to write in, and yields the
+    results as the runs finish. At most `max_concurrent` runs are started and not yet handed out, the alert
+    stream is not read further until one is, so a long stream never piles up tasks or results.
+    """
+    slots = asyncio.BoundedSemaphore(max_concurrent)
+    done: asyncio.Queue[asyncio.Task[RunResult]] = asyncio.Queue(max_concurrent)
+    tasks: set[asyncio.Task[RunResult]] = set()
+
+    async def run(alert: FraudAlert) -> RunResult:
+        reason = f"Account {alert.account}: {alert.reason}, amount {alert.amount}, z={alert.z_score}, velocity={alert.velocity}"
+        return await Runner.run(agent, "A transaction was flagged, please escalate.", context=EscalationData(reason=reason))
+
+    async def next_result() -> RunResult:
+        task = await done.get()
+        slots.release()
+        return task.result()
+
+    started = 0
+    try:
+        async for alert in alerts:
+            while slots.locked() or not done.empty():
+                yield await next_result()
+            await slots.acquire()
+            task = asyncio.create_task(run(alert))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(done.put_nowait)
+            started += 1
+            if limit is not None and started >= limit:
+                break
+        while tasks or not done.empty():
+            yield await next_result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def main_async():
+    records = synthetic_records(1_000_000)
+    # A burst of card testing on one account, and one very large charge on another.
+    burst = np.zeros(12, RECORD)
+    burst["account"], burst["amount_cents"] = 123456789, -150_00
+    burst["timestamp"] = records["timestamp"][500_000] + np.arange(12) * 30
+    records = np.sort(np.concatenate([records, burst]), order="timestamp", kind="stable")
+
+    async def source():
+        for offset in range(0, len(records), 1 << 16):
+            yield records[offset : offset + (1 << 16)]
+
+    stats = RollingAccountStats()
+    start = time.perf_counter()
+    alerts = [alert async for alert in score_stream(source(), stats)]
+    elapsed = time.perf_counter() - start
+    print(f"Scored {stats.events} events for {len(stats.accounts)} accounts in {elapsed:.2f} s ({stats.events / elapsed:,.0f} events/s), {len(alerts)} alerts")
+    for alert in [a for a in alerts if a.account == 123456789][:2]:
+        print(alert)
+
+    async def proactive():
+        for alert in alerts:
+            if alert.account == 123456789:
+                yield alert
+
+    agent = escalation_agent.clone(model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(
+        reply=lambda text, input: "We noticed unusual activity on your account and have temporarily blocked your card."))
+    async for result in escalate(proactive(), agent, limit=1):
+        print(result.final_output)
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, TypeVar
+
+from agents import Agent, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo, get_dynamic_instruction
+from agentic_banking.fake_model import FakeModel
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    account_no TEXT PRIMARY KEY,
+    user_name TEXT NOT NULL,
+    account_type TEXT NOT NULL,
+    balance_cents INTEGER NOT NULL,
+    currency TEXT NOT NULL DEFAULT 'PKR',
+    version INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID
+"""
+# Constant SQL text, so sqlite3's per-connection statement cache reuses the prepared statements.
+SELECT_ONE = "SELECT account_no, user_name, account_type, balance_cents, currency, version FROM profiles WHERE account_no = ?"
+UPSERT = """
+INSERT INTO profiles (account_no, user_name, account_type, balance_cents, currency) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(account_no) DO UPDATE SET user_name = excluded.user_name, account_type = excluded.account_type,
+    balance_cents = excluded.balance_cents, currency = excluded.currency, version = profiles.version + 1
+"""
+MAX_VARIABLES = 500
+
+
+class PooledConnection:
+    """A sqlite3 connection pinned to its own worker thread, so it is never shared across threads."""
+
+    def __init__(self, path: str, init_sql: str = ""):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conn: sqlite3.Connection = self._executor.submit(self._open, path, init_sql).result()
+
+    @staticmethod
+    def _open(path: str, init_sql: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if init_sql:
+            conn.executescript(init_sql)
+        return conn
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, self.conn)
+
+    def close(self) -> None:
+        self._executor.submit(self.conn.close).result()
+        self._executor.shutdown()
+
+
+class AsyncConnectionPool:
+    """
+    Fixed-size pool of SQLite connections for asyncio code. WAL mode lets the readers work while one writer commits.
+    Attributes:
+        size (int): Number of connections, each with its own thread.
+    """
+
+    def __init__(self, path: str, size: int = 4, init_sql: str = ""):
+        self.size = size
+        self._connections = [PooledConnection(path, init_sql) for _ in range(size)]
+        self._idle: asyncio.Queue[PooledConnection] | None = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[PooledConnection]:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            for connection in self._connections:
+                self._idle.put_nowait(connection)
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        async with self.acquire() as connection:
+            return await connection.run(fn)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.close()
+
+
+def _to_profile(row: tuple) -> UserInfo:
+    return UserInfo(userAccountNo=row[0], userName=row[1], userAccountType=row[2], userAccountBalance=row[3] / 100, userAccountCurrency=row[4])
+
+
+class ProfileRepository:
+    """
+    Customer profiles (UserInfo) in SQLite behind a read-through LRU cache. Writes go through the
+    repository and invalidate their cache entries, `max_age` bounds staleness from writers in other processes.
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that went to SQLite.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, cache_size: int = 10_000, max_age: float | None = 30.0):
+        self.pool = AsyncConnectionPool(path, pool_size, init_sql=SCHEMA)
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self._cache: OrderedDict[str, tuple[float, UserInfo]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every write, a read that overlapped a write does not repopulate the cache.
+        self._generation = 0
+
+    def _cached(self, account_no: str) -> UserInfo | None:
+        entry = self._cache.get(account_no)
+        if entry is None:
+            return None
+        loaded_at, profile = entry
+        if self.max_age is not None and time.monotonic() - loaded_at > self.max_age:
+            del self._cache[account_no]
+            return None
+        self._cache.move_to_end(account_no)
+        return profile
+
+    def _remember(self, profile: UserInfo) -> None:
+        self._cache[profile.userAccountNo] = (time.monotonic(), profile)
+        self._cache.move_to_end(profile.userAccountNo)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, *account_nos: str) -> None:
+        for account_no in account_nos:
+            self._cache.pop(account_no, None)
+
+    async def get(self, account_no: str) -> UserInfo | None:
+        profile = self._cached(account_no)
+        if profile is not None:
+            self.hits += 1
+            return profile.model_copy()
+        self.misses += 1
+        generation = self._generation
+        row = await self.pool.run(lambda conn: conn.execute(SELECT_ONE, (account_no,)).fetchone())
+        if row is None:
+            return None
+        profile = _to_profile(row)
+        if generation == self._generation:
+            self._remember(profile)
+        return profile.model_copy()
+
+    async def get_many(self, account_nos: Iterable[str]) -> dict[str, UserInfo]:
+        """Batched lookup: cache hits first, then one IN (...) query per 500 misses."""
+        found: dict[str, UserInfo] = {}
+        missing = []
+        for account_no in dict.fromkeys(account_nos):
+            profile = self._cached(account_no)
+            if profile is None:
+                missing.append(account_no)
+            else:
+                found[account_no] = profile.model_copy()
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        def fetch(conn: sqlite3.Connection) -> list[tuple]:
+            rows = []
+            for i in range(0, len(missing), MAX_VARIABLES):
+                batch = missing[i : i + MAX_VARIABLES]
+                sql = f"{SELECT_ONE[: SELECT_ONE.index('WHERE')]}WHERE account_no IN ({','.join('?' * len(batch))})"
+                rows += conn.execute(sql, batch).fetchall()
+            return rows
+
+        if missing:
+            generation = self._generation
+            for row in await self.pool.run(fetch):
+                profile = _to_profile(row)
+                if generation == self._generation:
+                    self._remember(profile)
+                found[profile.userAccountNo] = profile.model_copy()
+        return found
+
+    async def upsert_many(self, profiles: Iterable[UserInfo]) -> None:
+        params = [(p.userAccountNo, p.userName, p.userAccountType, round(p.userAccountBalance * 100), p.userAccountCurrency) for p in profiles]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(UPSERT, params)
+
+        await self.pool.run(write)
+        self._generation += 1
+        self.invalidate(*(p[0] for p in params))
+
+    async def upsert(self, profile: UserInfo) -> None:
+        await self.upsert_many([profile])
+
+    async def context_factory(self, account_no: str) -> UserInfo:
+        """Loads the UserInfo to pass as `context=` to Runner.run for this customer."""
+        profile = await self.get(account_no)
+        if profile is None:
+            raise KeyError(f"No customer profile for account {account_no}")
+        return profile
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0, "cached": len(self._cache)}
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+@function_tool
+def get_user_info(context: RunContextWrapper[UserInfo]) -> UserInfo:
+    """This function retrieves user information from the context.
+    It returns the user information as a UserInfo object."""
+    return context.context
+
+
+async def main_async():
+    with tempfile.TemporaryDirectory() as tmp:
+        repository = ProfileRepository(os.path.join(tmp, "profiles.sqlite3"))
+        await repository.upsert_many(
+            UserInfo(userName=f"Customer {i}", userAccountNo=f"{i:09d}", userAccountType="Saving" if i % 2 else "Current", userAccountBalance=1000.0 + i)
+            for i in range(50_000)
+        )
+        await repository.upsert(UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0))
+
+        start = time.perf_counter()
+        await repository.context_factory("123456789")
+        print(f"Cold load: {(time.perf_counter() - start) * 1e6:.0f} us")
+        start = time.perf_counter()
+        for _ in range(10_000):
+            await repository.context_factory("123456789")
+        print(f"Cached load: {(time.perf_counter() - start) / 10_000 * 1e6:.2f} us")
+        start = time.perf_counter()
+        batch = await repository.get_many(f"{i:09d}" for i in range(0, 50_000, 10))
+        print(f"Batched load of {len(batch)} customers: {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"Profile cache: {repository.stats()}")
+
+        agent = Agent[UserInfo](
+            name="Banking Interest Finder Assistant",
+            instructions=get_dynamic_instruction,
+            model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(),
+            tools=[get_user_info],
+        )
+        result = await Runner.run(agent, "What is my balance?", context=await repository.context_factory("123456789"))
+        print(result.final_output)
+        repository.close()
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
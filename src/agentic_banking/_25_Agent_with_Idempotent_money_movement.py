@@ -0,0 +1,376 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from agents import Agent, MaxTurnsExceeded, ModelSettings, Runner, custom_span, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.tool_context import ToolContext
+from pydantic import Field
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking._16_Agent_Guardrail_benchmark_harness import percentile
+from agentic_banking._24_Agent_with_SQLite_profile_store import AsyncConnectionPool, PooledConnection
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_no TEXT PRIMARY KEY,
+    balance_cents INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    idempotency_key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    debit_account TEXT NOT NULL,
+    credit_account TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    receipt TEXT NOT NULL,
+    committed_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+# The writer connection fsyncs every commit, one commit covers a whole batch of postings.
+WRITER_INIT = SCHEMA + "PRAGMA synchronous=FULL;"
+SELECT_RECEIPT = "SELECT receipt FROM postings WHERE idempotency_key = ?"
+SELECT_ACCOUNT = "SELECT balance_cents, version FROM accounts WHERE account_no = ?"
+APPLY = "UPDATE accounts SET balance_cents = balance_cents + ?, version = version + 1 WHERE account_no = ? AND version = ?"
+INSERT_POSTING = "INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?, ?)"
+# Refunds are paid out of this clearing account, it is allowed to go negative.
+REFUND_CLEARING_ACCOUNT = "000000000"
+
+
+class MoneyContext(UserInfo):
+    """
+    UserInfo plus the id of the run. Create one per Runner.run call and pass the same one again when
+    retrying that run, so its tool calls get the same idempotency keys.
+    Attributes:
+        run_id (str): Stable id of the logical run.
+    """
+    run_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class VersionConflict(Exception):
+    """An account changed between the optimistic read and the commit."""
+
+
+class InsufficientFunds(ValueError):
+    pass
+
+
+@dataclass
+class Posting:
+    key: str
+    kind: Literal["transfer", "refund"]
+    debit_account: str
+    credit_account: str
+    amount_cents: int
+    # account_no -> version seen by the optimistic read
+    expected: dict[str, int]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    future: asyncio.Future | None = None
+
+
+class GroupCommitWriter:
+    """
+    Single writer that drains queued postings into one SQLite transaction, so many concurrent runs
+    share one durable commit. Each posting is checked on its own: a replayed idempotency key returns the
+    stored receipt and a stale account version fails only that posting with VersionConflict.
+    Attributes:
+        max_batch (int): Most postings per commit.
+        max_delay (float): Extra seconds to wait for more postings before committing. The default 0 still
+            batches, since postings queue up while the previous commit is being fsynced.
+    """
+
+    def __init__(self, path: str, max_batch: int = 256, max_delay: float = 0.0):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.connection = PooledConnection(path, WRITER_INIT)
+        self._queue: asyncio.Queue[Posting] | None = None
+        self._task: asyncio.Task | None = None
+        self.commits = 0
+        # Postings written to the table, conflicts and replays are submitted but not committed.
+        self.committed = 0
+        self.latencies: list[float] = []
+
+    async def submit(self, posting: Posting) -> dict[str, Any]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        posting.future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(posting)
+        return await posting.future
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self.max_delay:
+                await asyncio.sleep(self.max_delay)
+            # Everything that queued up while the previous commit was running goes into this one.
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                results = await self.connection.run(lambda conn: self._commit(conn, batch))
+            except Exception as e:
+                results = [e] * len(batch)
+            self.commits += 1
+            self.committed += sum(isinstance(result, dict) and not result["replayed"] for result in results)
+            committed_at = time.perf_counter()
+            for posting, result in zip(batch, results):
+                self.latencies.append(committed_at - posting.enqueued_at)
+                if posting.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    posting.future.set_exception(result)
+                else:
+                    posting.future.set_result(result)
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, batch: list[Posting]) -> list[dict[str, Any] | Exception]:
+        results: list[dict[str, Any] | Exception] = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for posting in batch:
+                stored = conn.execute(SELECT_RECEIPT, (posting.key,)).fetchone()
+                if stored is not None:
+                    results.append({**json.loads(stored[0]), "replayed": True})
+                    continue
+                current = {account: conn.execute(SELECT_ACCOUNT, (account,)).fetchone() for account in posting.expected}
+                if any(row is None or row[1] != posting.expected[account] for account, row in current.items()):
+                    results.append(VersionConflict(f"Account changed while posting {posting.key}"))
+                    continue
+                conn.execute(APPLY, (-posting.amount_cents, posting.debit_account, posting.expected[posting.debit_account]))
+                conn.execute(APPLY, (posting.amount_cents, posting.credit_account, posting.expected[posting.credit_account]))
+                customer = posting.credit_account if posting.kind == "refund" else posting.debit_account
+                delta = posting.amount_cents if posting.kind == "refund" else -posting.amount_cents
+                receipt = {
+                    "posting_id": posting.key[:16],
+                    "kind": posting.kind,
+                    "from_account": posting.debit_account,
+                    "to_account": posting.credit_account,
+                    "amount": posting.amount_cents / 100,
+                    "balance": (current[customer][0] + delta) / 100,
+                }
+                conn.execute(INSERT_POSTING, (posting.key, posting.kind, posting.debit_account, posting.credit_account,
+                                              posting.amount_cents, json.dumps(receipt), time.time()))
+                results.append({**receipt, "replayed": False})
+        return results
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self.connection.close()
+
+
+class MoneyMovementService:
+    """
+    Transfers and refunds with idempotency keys and optimistic concurrency. Account versions are read
+    without locks, the writer re-checks them at commit and a conflicting posting is retried from a fresh read.
+    Attributes:
+        key_scope (str): "arguments" keys a posting by run id, tool and arguments, so a model that repeats the
+            same call (tool_choice="required" loops) posts once per run. "call" keys it by run id and tool call id.
+        max_retries (int): Attempts after a version conflict.
+        retry_delay (float): Base of the jittered exponential backoff between attempts, in seconds. A retry waits a
+            random time up to retry_delay * 2 ** attempt (at most max_retry_delay), so postings that collided on
+            one account do not all collide again on the next attempt.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = 4, key_scope: Literal["arguments", "call"] = "arguments",
+                 max_retries: int = 8, retry_delay: float = 0.002, max_retry_delay: float = 0.1, **writer_options):
+        self.readers = AsyncConnectionPool(path, read_pool_size, init_sql=SCHEMA)
+        self.writer = GroupCommitWriter(path, **writer_options)
+        self.key_scope = key_scope
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.attempts = 0
+        self.conflicts = 0
+        self.replays = 0
+
+    def idempotency_key(self, context: ToolContext[MoneyContext], args: dict[str, Any]) -> str:
+        basis = context.tool_call_id if self.key_scope == "call" else json.dumps(args, sort_keys=True)
+        return hashlib.sha256(f"{context.context.run_id}\0{context.tool_name}\0{basis}".encode()).hexdigest()
+
+    async def open_accounts(self, balances: dict[str, float]) -> None:
+        rows = [(account, round(balance * 100)) for account, balance in balances.items()]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT OR REPLACE INTO accounts (account_no, balance_cents) VALUES (?, ?)", rows)
+
+        await self.writer.connection.run(write)
+
+    async def balance(self, account_no: str) -> float:
+        row = await self.readers.run(lambda conn: conn.execute(SELECT_ACCOUNT, (account_no,)).fetchone())
+        if row is None:
+            raise KeyError(f"Unknown account {account_no}")
+        return row[0] / 100
+
+    async def post(self, key: str, kind: Literal["transfer", "refund"], debit_account: str, credit_account: str, amount: float) -> dict[str, Any]:
+        amount_cents = round(amount * 100)
+        if amount_cents <= 0:
+            raise ValueError("Amount must be positive")
+        if debit_account == credit_account:
+            raise ValueError("Cannot move money to the same account")
+
+        def read(conn: sqlite3.Connection) -> tuple[Any, dict[str, tuple[int, int] | None]]:
+            stored = conn.execute(SELECT_RECEIPT, (key,)).fetchone()
+            return stored, {account: conn.execute(SELECT_ACCOUNT, (account,)).fetchone() for account in (debit_account, credit_account)}
+
+        with custom_span("money_movement", data={"kind": kind, "key": key[:16]}) as span:
+            for attempt in range(self.max_retries + 1):
+                stored, accounts = await self.readers.run(read)
+                if stored is not None:
+                    self.replays += 1
+                    span.span_data.data.update(replayed=True)
+                    return {**json.loads(stored[0]), "replayed": True}
+                for account, row in accounts.items():
+                    if row is None:
+                        raise KeyError(f"Unknown account {account}")
+                if debit_account != REFUND_CLEARING_ACCOUNT and accounts[debit_account][0] < amount_cents:
+                    raise InsufficientFunds(f"Account {debit_account} has insufficient funds")
+                self.attempts += 1
+                try:
+                    receipt = await self.writer.submit(Posting(key, kind, debit_account, credit_account, amount_cents,
+                                                               {account: row[1] for account, row in accounts.items()}))
+                except VersionConflict:
+                    self.conflicts += 1
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt)))
+                    continue
+                if receipt["replayed"]:
+                    self.replays += 1
+                span.span_data.data.update(attempts=attempt + 1, replayed=receipt["replayed"])
+                return receipt
+        raise VersionConflict(f"Gave up after {self.max_retries + 1} attempts, the accounts are too busy")
+
+    def stats(self) -> dict[str, Any]:
+        latencies = sorted(self.writer.latencies)
+        attempts = len(latencies)
+        return {
+            "attempts": attempts,
+            "committed": self.writer.committed,
+            "commits": self.writer.commits,
+            "attempts_per_commit": round(attempts / self.writer.commits, 1) if self.writer.commits else 0.0,
+            "commit_latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "commit_latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "conflict_rate": round(self.conflicts / self.attempts, 4) if self.attempts else 0.0,
+            "replays": self.replays,
+        }
+
+    async def close(self) -> None:
+        await self.writer.close()
+        self.readers.close()
+
+
+money_service: MoneyMovementService | None = None
+
+
+@function_tool
+async def transfer_funds(context: ToolContext[MoneyContext], to_account: str, amount: float, memo: str = "") -> dict[str, Any]:
+    """
+    Transfers money from the customer's account to another account. Retrying the same transfer is safe,
+    it is only posted once.
+
+    Args:
+        to_account: Account number to pay.
+        amount: Amount in the account currency.
+        memo: Note for the receiver.
+    """
+    key = money_service.idempotency_key(context, {"to_account": to_account, "amount": amount, "memo": memo})
+    return await money_service.post(key, "transfer", context.context.userAccountNo, to_account, amount)
+
+
+@function_tool
+async def refund_charge(context: ToolContext[MoneyContext], amount: float, reference: str) -> dict[str, Any]:
+    """
+    Refunds a disputed charge to the customer's account. Retrying the same refund is safe, it is only posted once.
+
+    Args:
+        amount: Amount to refund.
+        reference: Reference of the disputed charge.
+    """
+    key = money_service.idempotency_key(context, {"amount": amount, "reference": reference})
+    return await money_service.post(key, "refund", REFUND_CLEARING_ACCOUNT, context.context.userAccountNo, amount)
+
+
+async def load_test(service: MoneyMovementService, accounts: list[str], transfers: int, concurrency: int, seed: int = 11) -> tuple[float, int]:
+    """
+    Random transfers between `accounts` from `concurrency` concurrent workers. Returns transfers per second and
+    how many gave up on version conflicts, those count as failed requests instead of stopping the test.
+    """
+    rng = random.Random(seed)
+    plan = [(uuid.uuid4().hex, *rng.sample(accounts, 2), rng.randint(1, 500) / 100) for _ in range(transfers)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(key: str, debit: str, credit: str, amount: float) -> bool:
+        async with semaphore:
+            try:
+                await service.post(key, "transfer", debit, credit, amount)
+            except VersionConflict:
+                return False
+            return True
+
+    start = time.perf_counter()
+    posted = await asyncio.gather(*(one(*p) for p in plan))
+    return transfers / (time.perf_counter() - start), posted.count(False)
+
+
+async def main_async():
+    global money_service
+    with tempfile.TemporaryDirectory() as tmp:
+        money_service = MoneyMovementService(os.path.join(tmp, "money.sqlite3"))
+        accounts = [f"{i:09d}" for i in range(1, 201)]
+        await money_service.open_accounts({REFUND_CLEARING_ACCOUNT: 0.0, "123456789": 10765490.0, **{a: 10_000.0 for a in accounts}})
+
+        # The _03_6 setup: tool_choice="required" without reset keeps the model calling the tool until max_turns.
+        def fake_reply(text: str, input: Any) -> Any:
+            return FakeToolCall("transfer_funds", {"to_account": "000000001", "amount": 2500.0, "memo": "rent"})
+
+        agent = Agent[MoneyContext](
+            name="Banking Assistant",
+            instructions="You are a helpfull assistant, who help in customer service and banking. Use the tools to move money.",
+            model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+            tools=[transfer_funds, refund_charge],
+            model_settings=ModelSettings(tool_choice="required"),
+            reset_tool_choice=False,
+        )
+        context = MoneyContext(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+        for attempt in range(2):  # the second attempt is a client retry of the same run
+            try:
+                await Runner.run(agent, "Please transfer 2500 to account 000000001 for rent.", context=context, max_turns=3)
+            except MaxTurnsExceeded:
+                print(f"Attempt {attempt + 1}: stopped at max_turns")
+        posted = await money_service.readers.run(lambda conn: conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0])
+        print(f"Balance after repeated transfer calls: {await money_service.balance('123456789')}, postings: {posted}, replays: {money_service.replays}")
+
+        for concurrency in (1, 64, 256):
+            money_service.writer.latencies.clear()
+            money_service.writer.commits = money_service.writer.committed = money_service.attempts = money_service.conflicts = money_service.replays = 0
+            rate, gave_up = await load_test(money_service, accounts, 4000, concurrency)
+            print(f"concurrency={concurrency}: {rate:,.0f} transfers/s, {gave_up} gave up, {money_service.stats()}")
+
+        total = await money_service.readers.run(lambda conn: conn.execute("SELECT SUM(balance_cents) FROM accounts").fetchone()[0])
+        print(f"Money conserved: {total / 100 == 10765490.0 + 10_000.0 * len(accounts)}")
+        await money_service.close()
+        money_service = None
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import asyncio
+import contextvars
+import dataclasses
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Literal
+
+from agents import (
+    Agent,
+    FunctionTool,
+    Handoff,
+    MaxTurnsExceeded,
+    Model,
+    ModelResponse,
+    ModelSettings,
+    RunContextWrapper,
+    Runner,
+    ToolsToFinalOutputResult,
+    function_tool,
+    set_tracing_disabled,
+)
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.models.multi_provider import MultiProvider
+from agents.run import DEFAULT_MAX_TURNS
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+logger = logging.getLogger(__name__)
+
+LoopPolicy = Literal["cache", "final_answer", "ask_model"]
+_MISSING = object()
+FINAL_ANSWER_NOTE = "You are repeating a step you already took. Do not call tools again, answer the user now with the results you already have."
+
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def output_fingerprint(response: ModelResponse) -> str:
+    """Fingerprint of what the model decided, tool call ids and message ids are left out."""
+    parts = []
+    for item in response.output:
+        if item.type == "function_call":
+            parts.append(("call", item.name, json.loads(item.arguments or "{}")))
+        elif item.type == "message":
+            parts.append(("message", [getattr(c, "text", None) for c in item.content]))
+        else:
+            parts.append((item.type,))
+    return fingerprint(parts)
+
+
+@dataclass
+class LoopState:
+    """Everything the detector remembers for one scope (a conversation), across runs."""
+    seen: dict[str, tuple[float, int, Any]] = field(default_factory=dict)
+    runs: int = 0
+    model_calls: int = 0
+    tokens: int = 0
+    burned_turns: int = 0
+    burned_tokens: int = 0
+    cached_tool_results: int = 0
+    forced_finals: int = 0
+    tokens_saved: int = 0
+    # Runs of this scope in progress, a running scope is never evicted.
+    running: int = 0
+    # Set when the policy ends the current run, consumed by the agent's tool_use_behavior.
+    final_output: Any = _MISSING
+
+    def hit(self, key: str, ttl: float | None, limit: int | None = None) -> tuple[int, Any]:
+        """
+        Records one occurrence of `key` and returns (occurrences so far, remembered value).
+        `seen` is kept in least recently hit order and cut to the newest `limit` fingerprints.
+        """
+        now = time.monotonic()
+        first, count, value = self.seen.pop(key, (now, 0, _MISSING))
+        if ttl is not None and now - first > ttl:
+            first, count, value = now, 0, _MISSING
+        self.seen[key] = (first, count + 1, value)
+        if limit is not None:
+            for old in list(itertools.islice(self.seen, max(len(self.seen) - limit, 0))):
+                del self.seen[old]
+        return count + 1, value
+
+    def remember(self, key: str, value: Any) -> None:
+        if key in self.seen:
+            first, count, _ = self.seen[key]
+            self.seen[key] = (first, count, value)
+
+
+_active: contextvars.ContextVar[LoopState | None] = contextvars.ContextVar("loop_state", default=None)
+
+
+class LoopDetectingModel(Model):
+    """Wraps the agent's model to fingerprint its outputs, and for the "ask_model" policy to re-ask without tools."""
+
+    def __init__(self, model: Model, detector: "LoopDetector"):
+        self.model = model
+        self.detector = detector
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, prompt=None, **kwargs) -> ModelResponse:
+        response = await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                                                 previous_response_id=previous_response_id, prompt=prompt, **kwargs)
+        state = _active.get()
+        if state is None:
+            return response
+        state.model_calls += 1
+        state.tokens += response.usage.total_tokens
+        if not any(item.type == "function_call" for item in response.output):
+            return response
+        count, _ = state.hit("output:" + output_fingerprint(response), self.detector.ttl, self.detector.max_fingerprints)
+        if count <= self.detector.max_repeats:
+            return response
+        state.burned_turns += 1
+        state.burned_tokens += response.usage.total_tokens
+        if self.detector.policy != "ask_model":
+            return response
+        state.forced_finals += 1
+        forced = await self.model.get_response(
+            f"{system_instructions or ''}\n\n{FINAL_ANSWER_NOTE}", input, dataclasses.replace(model_settings, tool_choice=None),
+            [], output_schema, [], tracing, previous_response_id=previous_response_id, prompt=prompt, **kwargs,
+        )
+        state.model_calls += 1
+        state.tokens += forced.usage.total_tokens
+        forced.usage.add(response.usage)
+        return forced
+
+    def stream_response(self, *args, **kwargs) -> AsyncIterator[Any]:
+        return self.model.stream_response(*args, **kwargs)
+
+
+class LoopDetector:
+    """
+    Stops agents from repeating the same tool call, within a run and across runs of the same conversation.
+    Every (tool, args, context) triple and every tool-calling model output is fingerprinted. Once one occurs more
+    than `max_repeats` times the policy applies:
+        cache: the repeated tool call gets the remembered result instead of running the tool again. If the model
+            still repeats it after that, the run ends with the remembered result as the final output.
+        final_answer: like cache, but the run ends on the first repeat.
+        ask_model: the repeated model output is replaced by one more model call without tools, so it must answer.
+    State is kept per `scope`, which every run must name (e.g. the conversation id), and tool results are only
+    reused for the same `context_key(context)`, so one customer never gets another's tool output.
+    Handoff targets are instrumented too, so a loop after a handoff is caught the same way.
+    Attributes:
+        max_repeats (int): Occurrences allowed before a repeat counts as a loop.
+        ttl (float | None): Seconds a fingerprint is remembered, so an honest repeat much later still runs.
+        context_key (Callable): Maps the run context to what tool results depend on, repr() of it by default.
+        max_scopes (int): Scopes kept, the least recently run idle ones are dropped beyond it.
+        max_fingerprints (int): Fingerprints kept per scope, the least recently seen are dropped beyond it.
+    """
+
+    def __init__(self, policy: LoopPolicy = "final_answer", max_repeats: int = 1, ttl: float | None = 600.0,
+                 context_key: Callable[[Any], Any] = repr, max_scopes: int = 10_000, max_fingerprints: int = 1024):
+        self.policy = policy
+        self.max_repeats = max_repeats
+        self.ttl = ttl
+        self.context_key = context_key
+        self.max_scopes = max_scopes
+        self.max_fingerprints = max_fingerprints
+        self.scopes: OrderedDict[str, LoopState] = OrderedDict()
+
+    def _guard_tool(self, tool: FunctionTool) -> FunctionTool:
+        invoke = tool.on_invoke_tool
+
+        async def on_invoke_tool(ctx: RunContextWrapper[Any], input: str) -> Any:
+            state = _active.get()
+            if state is None:
+                return await invoke(ctx, input)
+            key = "tool:" + fingerprint(tool.name, json.loads(input or "{}"), self.context_key(ctx.context))
+            count, result = state.hit(key, self.ttl, self.max_fingerprints)
+            if count > self.max_repeats and result is not _MISSING:
+                state.cached_tool_results += 1
+                if self.policy == "final_answer" or self.policy == "cache" and count > self.max_repeats + 1:
+                    state.final_output = result
+                return result
+            result = await invoke(ctx, input)
+            state.remember(key, result)
+            return result
+
+        return dataclasses.replace(tool, on_invoke_tool=on_invoke_tool)
+
+    @staticmethod
+    async def _stop_on_loop(context: RunContextWrapper[Any], tool_results: list[Any]) -> ToolsToFinalOutputResult:
+        state = _active.get()
+        if state is None or state.final_output is _MISSING:
+            return ToolsToFinalOutputResult(is_final_output=False)
+        output, state.final_output = state.final_output, _MISSING
+        state.forced_finals += 1
+        return ToolsToFinalOutputResult(is_final_output=True, final_output=output if isinstance(output, str) else json.dumps(output, default=str))
+
+    def instrument(self, agent: Agent[Any], _done: dict[int, Agent[Any]] | None = None) -> Agent[Any]:
+        """
+        Clone of `agent` with a fingerprinting model and guarded function tools, the original is not changed.
+        Handoff targets are instrumented the same way, Handoff objects when they are invoked.
+        """
+        done = {} if _done is None else _done
+        if id(agent) in done:
+            return done[id(agent)]
+        model = agent.model if isinstance(agent.model, Model) else MultiProvider().get_model(agent.model)
+        overrides: dict[str, Any] = {
+            "model": LoopDetectingModel(model, self),
+            "tools": [self._guard_tool(t) if isinstance(t, FunctionTool) else t for t in agent.tools],
+        }
+        # Agents that already stop after tools keep their own tool_use_behavior.
+        if self.policy in ("cache", "final_answer") and agent.tool_use_behavior == "run_llm_again":
+            overrides["tool_use_behavior"] = self._stop_on_loop
+        clone = done[id(agent)] = agent.clone(**overrides)
+        # Set after the clone is registered, so agents that hand back to each other end in the same clones.
+        clone.handoffs = [self.instrument(target, done) if isinstance(target, Agent) else self._guard_handoff(target, done)
+                          for target in agent.handoffs]
+        return clone
+
+    def _guard_handoff(self, handoff: Handoff[Any], done: dict[int, Agent[Any]]) -> Handoff[Any]:
+        invoke = handoff.on_invoke_handoff
+
+        async def on_invoke_handoff(ctx: RunContextWrapper[Any], input_json: str) -> Agent[Any]:
+            return self.instrument(await invoke(ctx, input_json), done)
+
+        return dataclasses.replace(handoff, on_invoke_handoff=on_invoke_handoff)
+
+    def stats(self, scope: str) -> dict[str, Any]:
+        state = self.scopes.get(scope, LoopState())
+        return {k: v for k, v in dataclasses.asdict(state).items() if k not in ("seen", "final_output", "running")}
+
+    def _evict_scopes(self) -> None:
+        excess = len(self.scopes) - self.max_scopes
+        if excess > 0:
+            for scope in [scope for scope, state in self.scopes.items() if not state.running][:excess]:
+                del self.scopes[scope]
+
+    async def run(self, agent: Agent[Any], input: Any, *, scope: str, max_turns: int = DEFAULT_MAX_TURNS, **kwargs) -> Any:
+        """Runner.run with loop detection. Runs with the same `scope` share fingerprints, pass the conversation id."""
+        state = self.scopes.pop(scope, None) or LoopState()
+        self.scopes[scope] = state
+        self._evict_scopes()
+        state.runs += 1
+        state.running += 1
+        state.final_output = _MISSING
+        calls_before, burned_before, burned_tokens_before = state.model_calls, state.burned_turns, state.burned_tokens
+        token = _active.set(state)
+        finished = False
+        try:
+            result = await Runner.run(self.instrument(agent), input, max_turns=max_turns, **kwargs)
+            finished = True
+        finally:
+            _active.reset(token)
+            state.running -= 1
+            burned = state.burned_turns - burned_before
+            if burned:
+                calls = state.model_calls - calls_before
+                # Turns the loop would have kept burning until max_turns, at the average cost per model call.
+                saved = max(max_turns - calls, 0) * (state.tokens // max(state.model_calls, 1)) if finished else 0
+                state.tokens_saved += saved
+                logger.warning("Loop in scope %s: %d burned turns (%d tokens), %d model calls of max %d, about %d tokens saved",
+                               scope, burned, state.burned_tokens - burned_tokens_before, calls, max_turns, saved)
+        return result
+
+
+@function_tool
+def human_in_the_loop(input_text: str) -> str:
+    """
+    This function simulates a human in the loop
+    """
+    print(f"Human in the loop: {input_text}")
+    return "Human response to: " + input_text
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    # A model stuck like the one in _03_6: it keeps calling the tool with the same text.
+    return FakeToolCall("human_in_the_loop", {"input_text": "hello world"})
+
+
+async def main_async():
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    agent = Agent(
+        name="Banking Assistant",
+        instructions="You are example agent you nothing do special.",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[human_in_the_loop],
+        model_settings=ModelSettings(tool_choice="required"),
+        reset_tool_choice=False,
+    )
+    prompt = "hello, i need to call human_in_the_loop with this text 'hello world'"
+    try:
+        await Runner.run(agent, prompt, max_turns=10)
+    except MaxTurnsExceeded:
+        print("Without the detector: MaxTurnsExceeded after 10 turns")
+
+    for policy in ("cache", "final_answer", "ask_model"):
+        detector = LoopDetector(policy=policy)
+        try:
+            result = await detector.run(agent, prompt, max_turns=10, scope="customer-123")
+            print(f"{policy}: {result.final_output!r}")
+        except MaxTurnsExceeded:
+            print(f"{policy}: MaxTurnsExceeded")
+        # A retry of the same conversation is stopped on its first repeated call.
+        if policy == "final_answer":
+            await detector.run(agent, prompt, max_turns=10, scope="customer-123")
+        print(f"{policy}: {detector.stats('customer-123')}")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
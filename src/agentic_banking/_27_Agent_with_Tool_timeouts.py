@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import agents
+from agents import Agent, FunctionTool, RunContextWrapper, Runner, get_current_span, set_tracing_disabled
+from agents.exceptions import UserError
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.function_schema import function_schema
+from agents.tool import default_tool_error_function
+from agents.tracing import SpanError
+
+from agentic_banking._17_Agent_with_Tool_result_cache import _MISSING, LRUBackend, ToolCache, cached_tool, handle_failures, raw_invoke
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+@dataclass
+class TimeoutStats:
+    calls: int = 0
+    timeouts: int = 0
+    served_stale: int = 0
+    served_fallback: int = 0
+    abandoned_threads: int = 0
+
+
+def run_sync_in_thread(func: Callable[..., Any], max_threads: int = 4) -> Callable[..., Any]:
+    """
+    Async version of a sync tool function with the same signature, so the SDK awaits it and it can be timed out.
+    Each function gets its own pool of `max_threads`: a timed out call is abandoned and its thread finishes on its
+    own, so a hanging tool ties up at most its own threads, its later calls wait in its queue and time out there.
+    """
+    threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix=f"tool-{func.__name__}")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(threads, call)
+
+    return wrapper
+
+
+def timeout_tool(seconds: float, fallback: Any = _MISSING, stale_entries: int = 256,
+                 key_fn: Callable[[RunContextWrapper[Any], dict[str, Any]], str | None] | None = None, takes_context: bool | None = None,
+                 runs_in_thread: bool = False, failure_error_function=default_tool_error_function) -> Callable[[FunctionTool], FunctionTool]:
+    """
+    Decorator that puts a timeout on a FunctionTool built with `failure_error_function=None`. On timeout the call
+    is cancelled (async tools) or its thread is abandoned (sync tools wrapped with `run_sync_in_thread`, pass
+    `runs_in_thread=True`), the current function span gets a timeout error, and the model gets, in order of preference:
+        - the last good result for the same arguments (`stale_entries` > 0),
+        - `fallback`, a value or a callable(ctx, args),
+        - the `failure_error_function` message.
+    Sync tools built with `agents.function_tool` block the event loop and cannot be timed out, build them with
+    `function_tool` from this module. Stacks with `cached_tool` from _17, only the outermost decorator's
+    `failure_error_function` is used. Only the timeout itself is handled here, a TimeoutError raised by the tool
+    is an ordinary failure.
+    Like `cached_tool`, stale results keyed on the arguments alone could reach another customer, so a FunctionTool
+    keeping them needs a `key_fn` unless `takes_context=False` says it does not read the context.
+    """
+
+    def decorate(tool: FunctionTool) -> FunctionTool:
+        if takes_context is not False and stale_entries and key_fn is None:
+            raise UserError(f"Tool {tool.name} may depend on the run context, give it a key_fn, set stale_entries=0, or "
+                            "pass takes_context=False if it does not read the context.")
+        invoke = raw_invoke(tool)
+        stale = LRUBackend(stale_entries) if stale_entries else None
+        stats = TimeoutStats()
+
+        def stale_key(ctx: RunContextWrapper[Any], args: dict[str, Any]) -> str | None:
+            if key_fn is not None:
+                return key_fn(ctx, args)
+            return json.dumps(args, sort_keys=True)
+
+        async def timed_invoke(ctx: RunContextWrapper[Any], input: str) -> Any:
+            stats.calls += 1
+            args = json.loads(input) if input else {}
+            key = stale_key(ctx, args) if stale is not None else None
+            try:
+                async with asyncio.timeout(seconds) as deadline:
+                    result = await invoke(ctx, input)
+            except TimeoutError:
+                if not deadline.expired():
+                    raise
+                stats.timeouts += 1
+                stats.abandoned_threads += runs_in_thread
+                served = "error"
+                result = stale.get(key) if key is not None else _MISSING
+                if result is not _MISSING:
+                    stats.served_stale += 1
+                    served = "stale"
+                elif fallback is not _MISSING:
+                    stats.served_fallback += 1
+                    served = "fallback"
+                    result = fallback(ctx, args) if callable(fallback) else fallback
+                span = get_current_span()
+                if span is not None:
+                    span.set_error(SpanError(message=f"Tool {tool.name} timed out after {seconds}s", data={"timeout": seconds, "served": served}))
+                if served == "error":
+                    raise TimeoutError(f"Tool {tool.name} did not answer within {seconds} seconds")
+                return result
+            if key is not None:
+                stale.set(key, result, None)
+            return result
+
+        tool.timeout_stats = stats
+        return handle_failures(tool, timed_invoke, failure_error_function)
+
+    return decorate
+
+
+def function_tool(func=None, *, cache: ToolCache | None = None, timeout: float | None = None, fallback: Any = _MISSING,
+                  stale_entries: int = 256, key_fn=None, failure_error_function=default_tool_error_function, **kwargs):
+    """
+    Drop-in for `agents.function_tool` with the `cache` option of _17 and declarative `timeout` (seconds),
+    `fallback` and stale-result options. The cache goes inside the timeout, so fallbacks are never cached.
+    Sync functions with a timeout run in a worker thread, so they no longer block the event loop either.
+    """
+
+    def create(the_func) -> FunctionTool:
+        if cache is None and timeout is None:
+            return agents.function_tool(the_func, failure_error_function=failure_error_function, **kwargs)
+        runs_in_thread = timeout is not None and not inspect.iscoroutinefunction(the_func)
+        tool = agents.function_tool(run_sync_in_thread(the_func) if runs_in_thread else the_func, failure_error_function=None, **kwargs)
+        takes_context = function_schema(the_func, use_docstring_info=False).takes_context
+        if cache is not None:
+            tool = cached_tool(cache, takes_context, failure_error_function)(tool)
+        if timeout is not None:
+            tool = timeout_tool(timeout, fallback, stale_entries, key_fn, takes_context, runs_in_thread, failure_error_function)(tool)
+        return tool
+
+    if callable(func):
+        return create(func)
+    return create
+
+
+website_delay = 0.1
+
+
+@function_tool(timeout=1.0, fallback="The weather website is not responding, weather updates are unavailable right now.")
+async def get_weather_updates_website(city: str) -> str:
+    """
+    Fetches weather updates for a given city from a website.
+    """
+    print(f"Fetching weather updates for {city} from the website...")
+    # Simulate fetching weather updates
+    await asyncio.sleep(website_delay)
+    return f"Weather updates for {city}: Sunny, 25°C"
+
+
+def handle_error(context: RunContextWrapper, error: Exception) -> str:
+    print(f"An error occurred: {error} with context: {context}")
+    return "An error occurred while processing the tool your request. Please try again later."
+
+
+@function_tool(name_override="do_some_work_tool", timeout=0.5, stale_entries=0, failure_error_function=handle_error)
+def do_some_work(data: str) -> str:
+    print(f"do_some_work function with data: {data}")
+    print("Processing data...")
+    time.sleep(5)  # A blocking call, it runs in a worker thread and is abandoned after the timeout.
+    return f"Processed data: {data}"
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return " ".join(item["output"] for item in input if isinstance(item, dict) and item.get("type") == "function_call_output")
+    city = text.split("city = ")[1].split(",")[0]
+    return [FakeToolCall("get_weather_updates_website", {"city": city}), FakeToolCall("do_some_work_tool", {"data": "report"})]
+
+
+async def main_async():
+    global website_delay
+    agent = Agent(
+        name="Assistant",
+        instructions="You are a helpfull assistant",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[get_weather_updates_website, do_some_work],
+    )
+    # Fresh answer, then the website hangs: the same city gets the last good result, a new city gets the fallback.
+    for city, delay in (("peshawar", 0.1), ("peshawar", 10), ("lahore", 10)):
+        website_delay = delay
+        start = time.perf_counter()
+        result = await Runner.run(agent, f"get weather updates for city = {city}, and process this data: report")
+        print(f"website delay {delay}s -> answered in {time.perf_counter() - start:.2f}s: {result.final_output}")
+    print(f"get_weather_updates_website: {get_weather_updates_website.timeout_stats}")
+    print(f"do_some_work_tool: {do_some_work.timeout_stats}")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
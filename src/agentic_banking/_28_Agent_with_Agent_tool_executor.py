@@ -0,0 +1,297 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Literal
+
+from agents import (
+    Agent,
+    FunctionTool,
+    ItemHelpers,
+    Model,
+    ModelResponse,
+    RunContextWrapper,
+    Runner,
+    RunResult,
+    function_tool,
+    set_tracing_disabled,
+)
+from agents.exceptions import AgentsException
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.models.multi_provider import MultiProvider
+from pydantic import create_model
+
+from agentic_banking._17_Agent_with_Tool_result_cache import ToolCache
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+
+class TokenBudgetExceeded(AgentsException):
+    """The run and its sub-agents used up their shared token budget."""
+
+
+@dataclass
+class RunBudget:
+    """
+    Limits shared by a parent run and every sub-agent it calls.
+    Attributes:
+        max_tokens (int | None): Total tokens for all model calls of the run tree.
+        max_concurrency (int): Model calls in flight at once, parent and children together.
+        child_share (float): Part of `max_tokens` sub-agents may use, the rest is kept for the parent's answer.
+    """
+    max_tokens: int | None = None
+    max_concurrency: int = 4
+    child_share: float = 0.8
+    used_tokens: int = 0
+    model_calls: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    semaphore: asyncio.Semaphore = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def check(self, child: bool) -> None:
+        if self.max_tokens is None:
+            return
+        limit = self.max_tokens * self.child_share if child else self.max_tokens
+        if self.used_tokens >= limit:
+            which = f"sub-agent limit {limit:g} of the run's {self.max_tokens}" if child else f"run limit {self.max_tokens}"
+            raise TokenBudgetExceeded(f"Token budget exhausted: {self.used_tokens} tokens used, {which}")
+
+    def stats(self) -> dict[str, Any]:
+        return {"used_tokens": self.used_tokens, "max_tokens": self.max_tokens, "model_calls": self.model_calls, "peak_in_flight": self.peak_in_flight}
+
+
+_budget: contextvars.ContextVar[RunBudget | None] = contextvars.ContextVar("run_budget", default=None)
+
+
+class BudgetedModel(Model):
+    """Wraps a model so every call takes a slot of the active RunBudget and is charged against its tokens."""
+
+    def __init__(self, model: Model, child: bool = False):
+        self.model = model
+        self.child = child
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, prompt=None, **kwargs) -> ModelResponse:
+        budget = _budget.get()
+        if budget is None:
+            return await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                                                 previous_response_id=previous_response_id, prompt=prompt, **kwargs)
+        budget.check(self.child)
+        async with budget.semaphore:
+            budget.in_flight += 1
+            budget.peak_in_flight = max(budget.peak_in_flight, budget.in_flight)
+            try:
+                response = await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                                                         previous_response_id=previous_response_id, prompt=prompt, **kwargs)
+            finally:
+                budget.in_flight -= 1
+        budget.model_calls += 1
+        budget.used_tokens += response.usage.total_tokens
+        return response
+
+    def stream_response(self, *args, **kwargs) -> AsyncIterator[Any]:
+        return self.model.stream_response(*args, **kwargs)
+
+
+def _resolve_model(agent: Agent[Any]) -> Model:
+    model = agent.model
+    if isinstance(model, BudgetedModel):
+        return model.model
+    return model if isinstance(model, Model) else MultiProvider().get_model(model)
+
+
+def agent_config_hash(agent: Agent[Any]) -> str:
+    """Hash of everything that shapes a sub-agent's answer: instructions, model, settings, tools and output type."""
+    model = _resolve_model(agent)
+    instructions = agent.instructions if isinstance(agent.instructions, str) or agent.instructions is None else \
+        f"{agent.instructions.__module__}.{agent.instructions.__qualname__}"
+    config = {
+        "name": agent.name,
+        "instructions": instructions,
+        # LitellmModel knows its model name, other model objects are only equal to themselves.
+        "model": getattr(model, "model", None) or f"{type(model).__qualname__}@{id(model)}",
+        "model_settings": agent.model_settings.to_json_dict(),
+        "tools": [(tool.name, getattr(tool, "params_json_schema", None)) for tool in agent.tools],
+        "handoffs": [getattr(h, "name", None) or getattr(h, "agent_name", None) for h in agent.handoffs],
+        "output_type": repr(agent.output_type),
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class AgentToolExecutor:
+    """
+    Runs agents as tools with a shared budget and a result cache. `as_tool` replaces `Agent.as_tool`, and
+    `fan_out_tool` gives the model one tool that asks several experts concurrently, so a multi-expert question
+    takes one sub-agent round-trip even when the model emits one tool call per turn.
+
+    Results are cached on (sub-agent config hash, context scope, input). Instructions, tools and handoffs of a
+    sub-agent can all read the run context, so a run with a context is only cached when `context_key(context)`
+    maps it to a scope (e.g. the customer id); without a context_key, or when it returns None, it is not cached.
+    Attributes:
+        cache (ToolCache | None): Where sub-agent answers are kept, None disables caching.
+        max_turns (int): Turn limit of each sub-agent run.
+    """
+
+    def __init__(self, cache: ToolCache | None = None, max_turns: int = 5, context_key: Callable[[Any], str | None] | None = None):
+        self.cache = cache
+        self.max_turns = max_turns
+        self.context_key = context_key
+
+    def instrument(self, agent: Agent[Any], child: bool = False) -> Agent[Any]:
+        return agent.clone(model=BudgetedModel(_resolve_model(agent), child=child))
+
+    def _cache_key(self, agent: Agent[Any], input: str, context: RunContextWrapper[Any]) -> str | None:
+        if self.cache is None:
+            return None
+        scope = None
+        if context.context is not None:
+            if self.context_key is None:
+                return None
+            scope = self.context_key(context.context)
+            if scope is None:
+                return None
+        digest = hashlib.sha256(json.dumps([scope, input]).encode()).hexdigest()
+        return f"{agent_config_hash(agent)}:{digest}"
+
+    async def _run(self, agent: Agent[Any], input: str, context: RunContextWrapper[Any]) -> str:
+        result = await Runner.run(self.instrument(agent, child=True), input, context=context.context, max_turns=self.max_turns)
+        # The parent's usage includes its sub-agents, as if they were part of the same run.
+        context.usage.add(result.context_wrapper.usage)
+        return ItemHelpers.text_message_outputs(result.new_items)
+
+    async def call(self, agent: Agent[Any], input: str, context: RunContextWrapper[Any]) -> str:
+        key = self._cache_key(agent, input, context)
+        if key is None:
+            return await self._run(agent, input, context)
+        result, _ = await self.cache.get_or_run(key, lambda: self._run(agent, input, context))
+        return result
+
+    def as_tool(self, agent: Agent[Any], tool_name: str, tool_description: str) -> FunctionTool:
+        @function_tool(name_override=tool_name, description_override=tool_description)
+        async def run_agent(context: RunContextWrapper, input: str) -> str:
+            return await self.call(agent, input, context)
+
+        return run_agent
+
+    def fan_out_tool(self, experts: dict[str, Agent[Any]], tool_name: str = "ask_experts", tool_description: str | None = None) -> FunctionTool:
+        """One tool call that sends each question to its expert, all experts run concurrently."""
+        question_model = create_model("ExpertQuestion", expert=(Literal[tuple(experts)], ...), question=(str, ...))
+        params_model = create_model(f"{tool_name}_args", questions=(list[question_model], ...))
+        description = tool_description or "Asks several experts at once. Experts: " + "; ".join(
+            f"{name}: {agent.handoff_description or agent.name}" for name, agent in experts.items())
+
+        async def on_invoke_tool(context: RunContextWrapper[Any], args: str) -> str:
+            questions = params_model.model_validate_json(args).questions
+            answers = await asyncio.gather(*(self.call(experts[q.expert], q.question, context) for q in questions), return_exceptions=True)
+            return json.dumps([
+                {"expert": q.expert, "answer": a if isinstance(a, str) else f"Failed: {a}"}
+                for q, a in zip(questions, answers)
+            ])
+
+        return FunctionTool(
+            name=tool_name,
+            description=description,
+            params_json_schema=params_model.model_json_schema(),
+            on_invoke_tool=on_invoke_tool,
+            strict_json_schema=False,
+        )
+
+    async def run(self, agent: Agent[Any], input: Any, *, budget: RunBudget | None = None, **kwargs) -> RunResult:
+        """Runner.run for the parent agent, every model call of the run tree shares `budget`."""
+        budget = budget or RunBudget()
+        token = _budget.set(budget)
+        try:
+            result = await Runner.run(self.instrument(agent), input, **kwargs)
+        finally:
+            _budget.reset(token)
+        result.budget = budget
+        return result
+
+
+def expert(name: str, description: str, answer: str) -> Agent:
+    return Agent(
+        name=name,
+        instructions=f"You are a {name.lower()}. Answer briefly.",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=lambda text, input: answer, latency=0.5),
+        handoff_description=description,
+    )
+
+
+def one_call_per_turn(text: str, input: Any) -> Any:
+    # How Gemini usually behaves here: one tool call per turn, so the experts run one after another.
+    done = [item for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"] if isinstance(input, list) else []
+    remaining = ["homework_agent", "special_task_agent_tool_astool", "biology_expert"][len(done):]
+    if remaining:
+        return FakeToolCall(remaining[0], {"input": text})
+    return " | ".join(item["output"] for item in done)
+
+
+def fan_out(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return " | ".join(f"{a['expert']}: {a['answer']}" for a in json.loads(input[-1]["output"]))
+    return FakeToolCall("ask_experts", {"questions": [
+        {"expert": "homework", "question": "write a short defination of physics?"},
+        {"expert": "special_task", "question": "writw a short defination of Biology?"},
+        {"expert": "biology", "question": "What is biology?"},
+    ]})
+
+
+async def main_async():
+    experts = {
+        "homework": expert("Homework Assistant", "This agent is designed to assist with homework tasks.", "Physics is the study of matter and energy."),
+        "special_task": expert("Special Task Agent", "This agent is designed to handle special tasks.", "Biology is the study of living things."),
+        "biology": expert("Biology Expert", "Answers biology questions.", "Bio means life and logy means study."),
+    }
+    model = LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else None
+    prompt = "HomeWork Task 1: write a short defination of physics?, Special Task: writw a short defination of Biology?"
+
+    baseline = Agent(
+        name="AI Assistant",
+        instructions="You are a helpful assistant that can answer questions using the expert tools.",
+        model=model or FakeModel(reply=one_call_per_turn),
+        tools=[
+            experts["homework"].as_tool(tool_name="homework_agent", tool_description="This tool handles homework tasks."),
+            experts["special_task"].as_tool(tool_name="special_task_agent_tool_astool", tool_description="This tool handles special tasks."),
+            experts["biology"].as_tool(tool_name="biology_expert", tool_description="This tool answers biology questions."),
+        ],
+    )
+    start = time.perf_counter()
+    result = await Runner.run(baseline, prompt)
+    print(f"Agent.as_tool, one call per turn: {time.perf_counter() - start:.2f}s")
+
+    executor = AgentToolExecutor(cache=ToolCache(ttl=3600))
+    agent = baseline.clone(model=model or FakeModel(reply=fan_out), tools=[executor.fan_out_tool(experts)])
+    for attempt in ("cold", "cached"):
+        start = time.perf_counter()
+        result = await executor.run(agent, prompt, budget=RunBudget(max_tokens=20_000, max_concurrency=4))
+        print(f"ask_experts fan-out ({attempt}): {time.perf_counter() - start:.2f}s, budget {result.budget.stats()}, "
+              f"total tokens {result.context_wrapper.usage.total_tokens}")
+    print(result.final_output)
+    print(f"Sub-agent cache: {executor.cache.stats()}")
+
+    # The parent's first call leaves no room for the experts, they fail and the parent still answers.
+    uncached = AgentToolExecutor()
+    agent = agent.clone(tools=[uncached.fan_out_tool(experts)])
+    result = await uncached.run(agent, prompt, budget=RunBudget(max_tokens=400, child_share=0.1))
+    print(f"With a 400 token budget: {result.final_output}")
+    try:
+        await uncached.run(agent, prompt, budget=RunBudget(max_tokens=150))
+    except TokenBudgetExceeded as e:
+        print(f"With a 150 token budget: {e}")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import asyncio
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from agents import Agent, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+PACKAGE_DIR = Path(__file__).parent
+DOC_DIRS = ["explaination_docs", "mcqs", "01_prompt-guide", "02_prompt-guide", "KagglePromptEngineering"]
+TEXT_SUFFIXES = {".md", ".markdown", ".txt"}
+TOKEN = re.compile(r"[a-z0-9_]+")
+STOPWORDS = frozenset("a an and are as at be by can do for from how i if in is it its of on or so that the this to was what when which with you".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def chunk_text(text: str, max_words: int = 180) -> Iterator[tuple[int, str]]:
+    """Splits a document into passages of whole paragraphs, a markdown heading always starts a new passage."""
+    start, lines, words = 1, [], 0
+    for number, line in enumerate(text.splitlines(), 1):
+        if lines and (line.startswith("#") or words >= max_words and not line.strip()):
+            yield start, "\n".join(lines).strip()
+            start, lines, words = number, [], 0
+        lines.append(line)
+        words += len(line.split())
+    if any(line.strip() for line in lines):
+        yield start, "\n".join(lines).strip()
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128: 7 bits per byte, the high bit marks that more bytes follow."""
+    values = np.asarray(values, np.uint64)
+    sizes = np.ones(len(values), np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        sizes += rest > 0
+        rest >>= np.uint64(7)
+    out = np.empty(int(sizes.sum()), np.uint8)
+    starts = np.cumsum(sizes) - sizes
+    for k in range(int(sizes.max(initial=0))):
+        mask = sizes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(buffer: np.ndarray) -> np.ndarray:
+    """Vectorized LEB128 decode of a uint8 array."""
+    if not len(buffer):
+        return np.empty(0, np.int64)
+    ends = np.flatnonzero(buffer < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1)
+    parts = (buffer.astype(np.int64) & 0x7F) << (7 * position)
+    return np.add.reduceat(parts, starts)
+
+
+def encode_postings(docs: np.ndarray, tfs: np.ndarray) -> bytes:
+    """Doc ids as gaps interleaved with term frequencies, so most entries fit in one byte each."""
+    gaps = np.diff(np.asarray(docs, np.int64), prepend=0)
+    return encode_varints(np.column_stack((gaps, tfs)).ravel())
+
+
+def decode_postings(buffer: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    values = decode_varints(buffer)
+    return np.cumsum(values[0::2]), values[1::2]
+
+
+class FileSearchIndex:
+    """
+    BM25 over text files with delta-encoded, varint-compressed postings. The saved index is memory-mapped,
+    new or changed files go into an in-memory delta until `save` merges them into a new generation.
+
+    Searches never block each other: the saved segment is immutable and a search takes its postings and a snapshot
+    of the passage table under a short lock, so one index can serve many agents, threads included, while another
+    thread saves or reloads it. `save` keeps the previous generation's files for processes still loading it.
+    Attributes:
+        path (str | None): Directory the index is saved to and loaded from.
+        k1 (float): BM25 term-frequency saturation.
+        b (float): BM25 length normalization.
+    """
+
+    def __init__(self, path: str | None = None, k1: float = 1.2, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._terms: dict[str, int] = {}
+        self._term_meta = np.zeros((0, 2), np.int64)  # offset, length into _postings
+        self._postings = np.zeros(0, np.uint8)
+        self._text = np.zeros(0, np.uint8)
+        self._text_offsets = np.zeros(1, np.int64)
+        self._base_docs = 0
+        self.docs: list[tuple[str, int]] = []  # (path, first line) per passage
+        self._delta_text: list[str] = []
+        self._delta: dict[str, list[tuple[int, int]]] = {}
+        self._doc_len = np.zeros(0, np.float32)
+        self._deleted = np.zeros(0, bool)
+        self.files: dict[str, tuple[float, list[int]]] = {}
+        self.generation = 0
+        self.dirty = False
+        if self.path and (self.path / "manifest.json").exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return int(len(self.docs) - self._deleted.sum())
+
+    # Writing
+
+    def add_text(self, path: str, text: str, mtime: float = 0.0) -> int:
+        """Indexes `text` as the contents of `path`, replacing what was indexed for it before."""
+        passages = list(chunk_text(text))
+        with self._lock:
+            self._remove(path)
+            first = len(self.docs)
+            lengths = []
+            for offset, (line, passage) in enumerate(passages):
+                tokens = tokenize(passage)
+                for term, tf in Counter(tokens).items():
+                    self._delta.setdefault(term, []).append((first + offset, tf))
+                self.docs.append((path, line))
+                self._delta_text.append(passage)
+                lengths.append(len(tokens))
+            self._doc_len = np.concatenate((self._doc_len, np.asarray(lengths, np.float32)))
+            self._deleted = np.concatenate((self._deleted, np.zeros(len(passages), bool)))
+            self.files[path] = (mtime, list(range(first, first + len(passages))))
+            self.dirty = True
+        return len(passages)
+
+    def _remove(self, path: str) -> None:
+        _, doc_ids = self.files.pop(path, (0.0, []))
+        if doc_ids:
+            deleted = self._deleted.copy()
+            deleted[doc_ids] = True
+            self._deleted = deleted
+
+    def add_file(self, path: str | Path) -> int:
+        """Indexes one file unless it is unchanged since it was last indexed."""
+        path = Path(path)
+        key, mtime = str(path), path.stat().st_mtime
+        if key in self.files and self.files[key][0] == mtime:
+            return 0
+        return self.add_text(key, path.read_text(encoding="utf-8", errors="replace"), mtime)
+
+    def add_directory(self, directory: str | Path) -> int:
+        return sum(self.add_file(p) for p in sorted(Path(directory).rglob("*")) if p.suffix.lower() in TEXT_SUFFIXES and p.is_file())
+
+    def save(self) -> None:
+        """
+        Merges the delta into a new on-disk generation, switched to atomically through manifest.json.
+        Deleted passages are dropped and the rest renumbered, so replaced files do not grow the index.
+        """
+        if self.path is None:
+            raise ValueError("This index has no path to save to")
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            generation = self.generation + 1
+            alive = ~self._deleted
+            # Old doc id -> new doc id, order preserving so postings stay sorted.
+            remap = np.cumsum(alive) - 1
+            terms, blobs, meta, offset = [], [], [], 0
+            for term in sorted(set(self._terms) | set(self._delta)):
+                docs, tfs = self._term_postings(term)
+                keep = alive[docs]
+                if not keep.any():
+                    continue
+                blob = encode_postings(remap[docs[keep]], tfs[keep])
+                terms.append(term)
+                blobs.append(blob)
+                meta.append((offset, len(blob)))
+                offset += len(blob)
+            kept = np.flatnonzero(alive).tolist()
+            texts = [self._passage(i).encode() for i in kept]
+            text_offsets = np.concatenate(([0], np.cumsum([len(t) for t in texts]))).astype(np.int64)
+            docs = [self.docs[i] for i in kept]
+            files = {path: (mtime, remap[ids].tolist()) for path, (mtime, ids) in self.files.items()}
+
+            prefix = self.path / f"gen{generation}"
+            Path(f"{prefix}.postings").write_bytes(b"".join(blobs))
+            Path(f"{prefix}.text").write_bytes(b"".join(texts))
+            np.save(f"{prefix}.meta.npy", np.asarray(meta, np.int64).reshape(-1, 2))
+            np.save(f"{prefix}.offsets.npy", text_offsets)
+            np.save(f"{prefix}.doclen.npy", self._doc_len[alive])
+            np.save(f"{prefix}.deleted.npy", np.zeros(len(kept), bool))
+            Path(f"{prefix}.terms.json").write_text(json.dumps(terms))
+            Path(f"{prefix}.docs.json").write_text(json.dumps({"docs": docs, "files": files}))
+            manifest = self.path / "manifest.json.tmp"
+            manifest.write_text(json.dumps({"generation": generation}))
+            os.replace(manifest, self.path / "manifest.json")
+            # The previous generation stays for readers that loaded the old manifest, older ones are removed.
+            for old in self.path.glob("gen*.*"):
+                number = old.name[3:].split(".", 1)[0]
+                if number.isdigit() and int(number) < self.generation:
+                    old.unlink(missing_ok=True)
+        self.load()
+
+    def load(self) -> None:
+        generation = json.loads((self.path / "manifest.json").read_text())["generation"]
+        prefix = self.path / f"gen{generation}"
+        terms = json.loads(Path(f"{prefix}.terms.json").read_text())
+        docs = json.loads(Path(f"{prefix}.docs.json").read_text())
+        postings_size = os.path.getsize(f"{prefix}.postings")
+        text_size = os.path.getsize(f"{prefix}.text")
+        with self._lock:
+            self._terms = {term: i for i, term in enumerate(terms)}
+            self._term_meta = np.load(f"{prefix}.meta.npy", mmap_mode="r")
+            self._postings = np.memmap(f"{prefix}.postings", np.uint8, "r") if postings_size else np.zeros(0, np.uint8)
+            self._text = np.memmap(f"{prefix}.text", np.uint8, "r") if text_size else np.zeros(0, np.uint8)
+            self._text_offsets = np.load(f"{prefix}.offsets.npy", mmap_mode="r")
+            self._doc_len = np.load(f"{prefix}.doclen.npy")
+            self._deleted = np.load(f"{prefix}.deleted.npy")
+            self.docs = [tuple(d) for d in docs["docs"]]
+            self.files = {path: (mtime, ids) for path, (mtime, ids) in docs["files"].items()}
+            self._base_docs = len(self.docs)
+            self._delta, self._delta_text = {}, []
+            self.generation = generation
+            self.dirty = False
+
+    # Reading
+
+    def _passages(self) -> tuple[list[tuple[str, int]], np.ndarray, np.ndarray, int, list[str]]:
+        """What `_passage` reads, taken under the lock. `load` replaces these objects and appends only extend them."""
+        return self.docs, self._text, self._text_offsets, self._base_docs, self._delta_text
+
+    def _passage(self, doc: int, passages: tuple | None = None) -> str:
+        _, text, text_offsets, base_docs, delta_text = passages or self._passages()
+        if doc >= base_docs:
+            return delta_text[doc - base_docs]
+        return bytes(text[text_offsets[doc] : text_offsets[doc + 1]]).decode()
+
+    def _term_postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """All postings of `term`, saved segment first, delta after it (delta doc ids are always higher)."""
+        parts_docs, parts_tfs = [], []
+        term_id = self._terms.get(term)
+        if term_id is not None:
+            offset, length = self._term_meta[term_id]
+            docs, tfs = decode_postings(self._postings[offset : offset + length])
+            parts_docs.append(docs)
+            parts_tfs.append(tfs)
+        delta = self._delta.get(term)
+        if delta:
+            pairs = np.asarray(delta, np.int64)
+            parts_docs.append(pairs[:, 0])
+            parts_tfs.append(pairs[:, 1])
+        if not parts_docs:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        return np.concatenate(parts_docs), np.concatenate(parts_tfs)
+
+    def search(self, query: str, k: int = 5) -> list[dict[str, Any]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            postings = [self._term_postings(term) for term in terms]
+            doc_len, deleted = self._doc_len, self._deleted
+            passages = self._passages()
+        alive = ~deleted
+        n = int(alive.sum())
+        if not n:
+            return []
+        norm = self.k1 * (1 - self.b + self.b * doc_len / doc_len[alive].mean())
+        scores = np.zeros(len(doc_len), np.float32)
+        for docs, tfs in postings:
+            docs, tfs = docs[alive[docs]], tfs[alive[docs]]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        results = []
+        for doc in hits:
+            path, line = passages[0][doc]
+            results.append({"file": os.path.relpath(path, PACKAGE_DIR), "line": line, "score": round(float(scores[doc]), 3),
+                            "text": self._passage(int(doc), passages)[:600]})
+        return results
+
+
+def build_index(path: str | None, directories: Iterable[str | Path] = (PACKAGE_DIR / d for d in DOC_DIRS)) -> FileSearchIndex:
+    """Opens the index at `path` and brings it up to date, only new or changed files are re-indexed."""
+    index = FileSearchIndex(path)
+    for directory in directories:
+        if Path(directory).is_dir():
+            index.add_directory(directory)
+    if index.path is not None and index.dirty:
+        index.save()
+    return index
+
+
+_file_index: FileSearchIndex | None = None
+
+
+def file_index() -> FileSearchIndex:
+    global _file_index
+    if _file_index is None:
+        _file_index = build_index(os.getenv("AGENTIC_BANKING_SEARCH_INDEX", os.path.join(tempfile.gettempdir(), "agentic_banking_search")))
+    return _file_index
+
+
+@function_tool
+def search_files(query: str, max_results: int = 5) -> list[dict[str, Any]]:
+    """
+    Searches the local documentation (SDK explanations, MCQs and prompt guides) and returns the best matching passages.
+
+    Args:
+        query: What to look for, in keywords or a question.
+        max_results: Number of passages to return.
+    """
+    return file_index().search(query, max_results)
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"From the docs: {input[-1]['output'][:100]}..."
+    return FakeToolCall("search_files", {"query": text, "max_results": 3})
+
+
+async def main_async():
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        index = build_index(tmp)
+        print(f"Indexed {len(index)} passages from {len(index.files)} files in {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"postings {len(index._postings)} bytes")
+        start = time.perf_counter()
+        reopened = FileSearchIndex(tmp)
+        print(f"Reopened (memory-mapped) in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        queries = ["what is RunContextWrapper", "tool_choice required", "agent lifecycle hooks", "how to install the sdk", "few-shot prompting"]
+        for query in queries[:3]:
+            best = reopened.search(query, 1)
+            print(f"{query!r} -> {best[0]['file']}:{best[0]['line']} ({best[0]['score']})")
+        rounds = 2000
+        start = time.perf_counter()
+        for i in range(rounds):
+            reopened.search(queries[i % len(queries)])
+        print(f"Query latency: {(time.perf_counter() - start) / rounds * 1e6:.0f} us")
+
+        reopened.add_text(os.path.join(tmp, "notes.md"), "# Overdraft policy\nThe overdraft fee is waived for Saving accounts.")
+        print(f"Incremental add, before save: {reopened.search('overdraft fee', 1)[0]['text'].splitlines()[0]}")
+
+        global _file_index
+        _file_index = reopened
+        agent = Agent(
+            name="Banking Assistant",
+            instructions="You are a helpfull assistant, who help in customer service and banking. Use search_files to answer from the documentation.",
+            model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+            tools=[search_files],
+        )
+        results = await asyncio.gather(*(Runner.run(agent, q) for q in queries))
+        for query, result in zip(queries, results):
+            print(f"{query}: {result.final_output}")
+        _file_index = None
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
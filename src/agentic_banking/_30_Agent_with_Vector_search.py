@@ -0,0 +1,333 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+from agents import Agent, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._29_Agent_with_Local_file_search import PACKAGE_DIR, TEXT_SUFFIXES, chunk_text, tokenize
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+POLICY_DIRS = ["explaination_docs", "KagglePromptEngineering"]
+
+
+class Embedder(Protocol):
+    """Anything that turns texts into L2-normalized float32 rows of width `dim`. `name` is saved with the index."""
+    name: str
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """
+    Offline embedder using the hashing trick: words, word bigrams and character trigrams are hashed into
+    `dim` signed buckets with sublinear term frequency. No model download, deterministic across processes.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> dict[int, float]:
+        words = tokenize(text)
+        grams = [(w, 1.0) for w in words] + [(f"{a} {b}", 0.7) for a, b in zip(words, words[1:])]
+        grams += [(f"#{w[i:i + 3]}", 0.3) for w in words if len(w) > 3 for i in range(len(w) - 2)]
+        features: dict[int, float] = {}
+        for gram, weight in grams:
+            h = zlib.crc32(gram.encode())
+            bucket, sign = h % self.dim, 1.0 if h & 0x80000000 else -1.0
+            features[bucket] = features.get(bucket, 0.0) + sign * weight
+        return features
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), np.float32)
+        for row, text in enumerate(texts):
+            for bucket, value in self._features(text).items():
+                vectors[row, bucket] = math.copysign(1 + math.log(abs(value)), value) if abs(value) >= 1 else value
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+
+class LitellmEmbedder:
+    """Hosted embeddings through LiteLLM, e.g. gemini/text-embedding-004, for when the network is available."""
+
+    def __init__(self, model: str = "gemini/text-embedding-004", dim: int = 768, api_key: str | None = None):
+        self.model = model
+        self.dim = dim
+        self.name = f"litellm-{model}"
+        self.api_key = api_key
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        import litellm
+
+        response = litellm.embedding(model=self.model, input=texts, api_key=self.api_key)
+        vectors = np.asarray([item["embedding"] for item in response.data], np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Row-wise top k of a (queries, candidates) score matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((len(scores), 0), np.int64), np.empty((len(scores), 0), scores.dtype)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class VectorIndex:
+    """
+    Dense vectors in one row-major matrix (float16 by default) saved as `vectors.npy` and memory-mapped on load.
+    Search is a batched dot product (vectors are normalized, so it is cosine similarity) with argpartition top-k,
+    scanned in blocks so float16 rows are widened a block at a time. `train_ivf` adds an inverted file:
+    rows grouped by k-means cluster, queries only scan the `n_probe` closest clusters.
+    Attributes:
+        embedder (Embedder): Used for documents and queries.
+        dtype (np.dtype): Storage type of the matrix, float16 halves memory and disk.
+        metadata (list[dict]): One entry per row, returned with search hits.
+    """
+
+    def __init__(self, embedder: Embedder | None = None, dtype: Any = np.float16, block_rows: int = 65536):
+        self.embedder = embedder or HashingEmbedder()
+        self.dtype = np.dtype(dtype)
+        self.block_rows = block_rows
+        self.vectors = np.zeros((0, self.embedder.dim), self.dtype)
+        self.metadata: list[dict[str, Any]] = []
+        self.centroids: np.ndarray | None = None
+        self.list_offsets: np.ndarray | None = None
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.query_cache_size = 4096
+        self.query_hits = 0
+        self.query_misses = 0
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def add(self, texts: list[str], metadata: list[dict[str, Any]], vectors: np.ndarray | None = None) -> None:
+        vectors = self.embedder.embed(texts) if vectors is None else vectors
+        self.vectors = np.concatenate((np.asarray(self.vectors), vectors.astype(self.dtype)))
+        self.metadata += metadata
+        # New rows are not in any cluster yet, the inverted file has to be trained again.
+        self.centroids = self.list_offsets = None
+
+    def train_ivf(self, n_lists: int | None = None, iterations: int = 8, sample_per_list: int = 64, seed: int = 0) -> None:
+        """Spherical k-means on a sample, then reorders rows by cluster so each list is one contiguous slice."""
+        n = len(self.vectors)
+        if not n:
+            raise ValueError("Cannot train an inverted file on an empty index")
+        # Every list needs a distinct sample row as its starting centroid.
+        n_lists = min(n_lists or max(1, int(math.sqrt(n))), n)
+        rng = np.random.default_rng(seed)
+        data = np.asarray(self.vectors, np.float32)
+
+        def assign_rows(rows: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+            return np.concatenate([np.argmax(rows[i : i + self.block_rows] @ centroids.T, axis=1) for i in range(0, len(rows), self.block_rows)])
+
+        sample = data[rng.choice(n, min(n, sample_per_list * n_lists), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = assign_rows(sample, centroids)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            used = counts > 0
+            sums[used] = np.add.reduceat(sample[order], (np.cumsum(counts) - counts)[used])
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids)
+        assign = assign_rows(data, centroids)
+        order = np.argsort(assign, kind="stable")
+        self.vectors = np.ascontiguousarray(np.asarray(self.vectors)[order])
+        self.metadata = [self.metadata[i] for i in order]
+        self.centroids = centroids.astype(np.float32)
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=n_lists))))
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", np.asarray(self.vectors))
+        if self.centroids is not None:
+            np.save(path / "centroids.npy", self.centroids)
+            np.save(path / "lists.npy", self.list_offsets)
+        (path / "meta.json").write_text(json.dumps({"embedder": self.embedder.name, "dim": self.embedder.dim, "metadata": self.metadata}))
+
+    @classmethod
+    def load(cls, path: str | Path, embedder: Embedder | None = None) -> "VectorIndex":
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        index = cls(embedder)
+        if meta["embedder"] != index.embedder.name:
+            raise ValueError(f"Index was built with {meta['embedder']}, queries would use {index.embedder.name}")
+        index.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        index.dtype = index.vectors.dtype
+        index.metadata = meta["metadata"]
+        if (path / "centroids.npy").exists():
+            index.centroids = np.load(path / "centroids.npy")
+            index.list_offsets = np.load(path / "lists.npy")
+        return index
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Query embedding through an LRU cache, agents tend to ask the same things again."""
+        key = " ".join(query.lower().split())
+        vector = self._query_cache.get(key)
+        if vector is not None:
+            self.query_hits += 1
+            self._query_cache.move_to_end(key)
+            return vector
+        self.query_misses += 1
+        vector = self.embedder.embed([query])[0]
+        vector.flags.writeable = False
+        self._query_cache[key] = vector
+        if len(self._query_cache) > self.query_cache_size:
+            self._query_cache.popitem(last=False)
+        return vector
+
+    def search_vectors(self, queries: np.ndarray, k: int = 5, n_probe: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Top k row ids and scores for each query row. Uses the inverted file when trained and `n_probe` is given."""
+        queries = np.atleast_2d(np.asarray(queries, np.float32))
+        if self.centroids is not None and n_probe:
+            return self._search_ivf(queries, k, n_probe)
+        best_ids = np.empty((len(queries), 0), np.int64)
+        best_scores = np.empty((len(queries), 0), np.float32)
+        for start in range(0, len(self.vectors), self.block_rows):
+            block = np.asarray(self.vectors[start : start + self.block_rows], np.float32)
+            ids, scores = top_k(queries @ block.T, k)
+            merged_ids = np.concatenate((best_ids, ids + start), axis=1)
+            merged_scores = np.concatenate((best_scores, scores), axis=1)
+            pick, best_scores = top_k(merged_scores, k)
+            best_ids = np.take_along_axis(merged_ids, pick, axis=1)
+        return best_ids, best_scores
+
+    def _search_ivf(self, queries: np.ndarray, k: int, n_probe: int) -> tuple[np.ndarray, np.ndarray]:
+        lists, _ = top_k(queries @ self.centroids.T, n_probe)
+        all_ids, all_scores = np.zeros((len(queries), k), np.int64), np.full((len(queries), k), -np.inf, np.float32)
+        for q, probe in enumerate(lists):
+            rows = np.concatenate([np.arange(self.list_offsets[c], self.list_offsets[c + 1]) for c in probe])
+            ids, scores = top_k(queries[q : q + 1] @ np.asarray(self.vectors[rows], np.float32).T, k)
+            all_ids[q, : ids.shape[1]], all_scores[q, : ids.shape[1]] = rows[ids[0]], scores[0]
+        return all_ids, all_scores
+
+    def search(self, query: str, k: int = 5, n_probe: int | None = None) -> list[dict[str, Any]]:
+        ids, scores = self.search_vectors(self.embed_query(query), k, n_probe)
+        return [{**self.metadata[i], "score": round(float(s), 4)} for i, s in zip(ids[0], scores[0]) if np.isfinite(s)]
+
+
+def build_policy_index(directories: list[str] = POLICY_DIRS, embedder: Embedder | None = None) -> VectorIndex:
+    index = VectorIndex(embedder)
+    texts, metadata = [], []
+    for directory in directories:
+        for path in sorted((PACKAGE_DIR / directory).rglob("*")):
+            if path.suffix.lower() not in TEXT_SUFFIXES:
+                continue
+            for line, passage in chunk_text(path.read_text(encoding="utf-8", errors="replace")):
+                texts.append(passage)
+                metadata.append({"file": str(path.relative_to(PACKAGE_DIR)), "line": line, "text": passage[:600]})
+    index.add(texts, metadata)
+    return index
+
+
+_vector_index: VectorIndex | None = None
+
+
+def vector_index() -> VectorIndex:
+    global _vector_index
+    if _vector_index is None:
+        path = os.getenv("AGENTIC_BANKING_VECTOR_INDEX")
+        if path and (Path(path) / "meta.json").exists():
+            _vector_index = VectorIndex.load(path)
+        else:
+            _vector_index = build_policy_index()
+            if path:
+                _vector_index.save(path)
+    return _vector_index
+
+
+@function_tool
+def semantic_search(query: str, max_results: int = 5) -> list[dict[str, Any]]:
+    """
+    Finds the policy and documentation passages closest in meaning to the query.
+
+    Args:
+        query: A question or description of what you are looking for.
+        max_results: Number of passages to return.
+    """
+    return vector_index().search(query, max_results)
+
+
+def recall_at_k(index: VectorIndex, queries: np.ndarray, k: int, n_probe: int) -> float:
+    exact, _ = index.search_vectors(queries, k)
+    approx, _ = index.search_vectors(queries, k, n_probe=n_probe)
+    return float(np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)]))
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"From the docs: {input[-1]['output'][:100]}..."
+    return FakeToolCall("semantic_search", {"query": text, "max_results": 3})
+
+
+async def main_async():
+    global _vector_index
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        index = build_policy_index()
+        index.save(tmp)
+        print(f"Embedded {len(index)} passages in {(time.perf_counter() - start) * 1000:.0f} ms")
+        _vector_index = VectorIndex.load(tmp)
+        for query in ["how do I keep state between tool calls", "give the model a few examples"]:
+            best = _vector_index.search(query, 1)[0]
+            print(f"{query!r} -> {best['file']}:{best['line']} ({best['score']})")
+
+        # A larger synthetic corpus: 200k rows x 256 dims in float16 is 100 MB on disk.
+        rng = np.random.default_rng(3)
+        topics = rng.standard_normal((500, 256)).astype(np.float32)
+        rows = topics[rng.integers(0, 500, 200_000)] + 0.6 * rng.standard_normal((200_000, 256)).astype(np.float32)
+        rows /= np.linalg.norm(rows, axis=1, keepdims=True)
+        big = VectorIndex(HashingEmbedder(256))
+        big.add([], [{"row": i} for i in range(len(rows))], vectors=rows)
+        big.save(os.path.join(tmp, "big"))
+        big = VectorIndex.load(os.path.join(tmp, "big"), HashingEmbedder(256))
+        queries = rows[rng.integers(0, len(rows), 64)] + 0.1 * rng.standard_normal((64, 256)).astype(np.float32)
+        start = time.perf_counter()
+        big.search_vectors(queries, 10)
+        print(f"Brute force, 64 queries over {len(big)} rows: {(time.perf_counter() - start) * 1000 / 64:.2f} ms/query")
+        start = time.perf_counter()
+        big.train_ivf(n_lists=512)
+        print(f"IVF trained in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        big.search_vectors(queries, 10, n_probe=8)
+        print(f"IVF n_probe=8: {(time.perf_counter() - start) * 1000 / 64:.2f} ms/query, recall@10 {recall_at_k(big, queries, 10, 8):.3f}")
+
+        agent = Agent(
+            name="Banking Assistant",
+            instructions="You are a helpfull assistant, who help in customer service and banking. Use semantic_search to answer from the policy docs.",
+            model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+            tools=[semantic_search],
+        )
+        for _ in range(2):
+            result = await Runner.run(agent, "What is the context object in the SDK used for?")
+        print(result.final_output)
+        print(f"Query embedding cache: {_vector_index.query_hits} hits, {_vector_index.query_misses} misses")
+        _vector_index = None
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
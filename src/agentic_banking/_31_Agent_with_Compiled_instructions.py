@@ -0,0 +1,215 @@
+import operator
+import os
+import string
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import litellm
+from agents import Agent, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._02_2_Agent_with_handoff_input_filter import UserLoginInfo
+from agentic_banking._02_2_Agent_with_handoff_input_filter import summary_of_provided_context as get_context_summary
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo, get_dynamic_instruction
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+MODEL_NAME = "gemini/gemini-2.0-flash"
+_formatter = string.Formatter()
+# Class attribute of contexts whose context_version is never given to another object, like _32's FrozenContext.
+UNIQUE_VERSIONS = "__unique_context_versions__"
+
+
+def count_tokens(text: str, model: str = MODEL_NAME) -> int:
+    return litellm.token_counter(model=model, text=text)
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class InstructionTemplate:
+    """
+    Dynamic instructions written once as a template, e.g. "Welcome {context.userName}, you are {agent.name}".
+    `context.` slots read the run context (RunContextWrapper.context), `agent.` slots read the agent, and
+    format specs work as in f-strings ("{context.userAccountBalance:,.2f}").
+
+    The template is parsed once into static text and slot getters. Rendering reads only the slot fields and
+    reuses the cached text and token count while they are unchanged. A context class that sets UNIQUE_VERSIONS and
+    stamps every instance with a process-unique int `context_version` is keyed on that instead, so even the context
+    field reads are skipped until the version moves. A per-object counter is not enough: ids and counts repeat
+    once a context is garbage-collected, so such contexts are keyed on their slot values.
+    Use the instance itself as `Agent(instructions=...)`.
+    Attributes:
+        renders (int): Times the text was actually built.
+        hits (int): Times a cached text was returned.
+    """
+
+    def __init__(self, template: str, token_counter: Callable[[str], int] = count_tokens, cache_size: int = 1024):
+        self.template = template
+        self.token_counter = token_counter
+        self.cache_size = cache_size
+        self._static: list[str] = []
+        self._slots: list[tuple[str, Callable[[Any], Any], str, str | None]] = []
+        for literal, field, spec, conversion in _formatter.parse(template):
+            if len(self._static) > len(self._slots):
+                # Two literals in a row, parse() splits text around escaped braces.
+                self._static[-1] += literal
+            else:
+                self._static.append(literal)
+            if field is None:
+                continue
+            root, _, path = field.partition(".")
+            if root not in ("context", "agent"):
+                raise ValueError(f"Template slot {{{field}}} must start with context. or agent.")
+            self._slots.append((root, operator.attrgetter(path) if path else (lambda obj: obj), spec, conversion))
+        # parse() yields no trailing literal after a slot that ends the template.
+        self._static += [""] * (len(self._slots) + 1 - len(self._static))
+        self._agent_slots = [get for root, get, _, _ in self._slots if root == "agent"]
+        self._cache: OrderedDict[Any, tuple[str, int]] = OrderedDict()
+        self.renders = 0
+        self.hits = 0
+
+    def _values(self, context: Any, agent: Agent[Any]) -> tuple[Any, ...]:
+        return tuple(get(context if root == "context" else agent) for root, get, _, _ in self._slots)
+
+    def _build(self, values: tuple[Any, ...]) -> str:
+        parts = [self._static[0]]
+        for (_, _, spec, conversion), value, literal in zip(self._slots, values, self._static[1:]):
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            parts.append(format(value, spec))
+            parts.append(literal)
+        return "".join(parts)
+
+    def _entry(self, context: Any, agent: Agent[Any]) -> tuple[str, int]:
+        version = getattr(context, "context_version", None)
+        if isinstance(version, int) and getattr(type(context), UNIQUE_VERSIONS, False):
+            key: Any = (version, *(_hashable(get(agent)) for get in self._agent_slots))
+            values = None
+        else:
+            values = key = self._values(context, agent)
+            try:
+                hash(key)
+            except TypeError:
+                # Unhashable slot values (lists, models without frozen=True) are keyed on their repr.
+                key = repr(values)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entry
+        self.renders += 1
+        text = self._build(values if values is not None else self._values(context, agent))
+        entry = self._cache[key] = (text, self.token_counter(text))
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def __call__(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> str:
+        return self._entry(context.context, agent)[0]
+
+    def tokens(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> int:
+        """Token count of the instructions for this context, counted once per distinct rendering."""
+        return self._entry(context.context, agent)[1]
+
+    def stats(self) -> dict[str, Any]:
+        total = self.renders + self.hits
+        return {"renders": self.renders, "hits": self.hits, "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+
+# _02's get_dynamic_instruction as a compiled template.
+interest_finder_instructions = InstructionTemplate("""
+    ALWAYS START WITH YOUR NAME THAT (THAT I'M Intreset Finding AGENT)
+        You are a helpfull assistant, who help customer in
+        finding Annual Per Return on Investment (APRI) which is  Interest on Savings.
+        You will be provided with the user's account balance and interest rate.
+        Calculate the interest on the user's savings based on the provided interest rate.
+        The interest rate will be provided in percentage.
+        Use the formula: Interest = (Balance * Interest Rate) / 100
+        Respond with the calculated interest amount in the same currency as the user's account balance.
+        For example, if the user's account balance is in PKR, respond with the interest amount in PKR.
+
+    You use These Detailed provided according to customer need and use,
+    which is Customer / User name :  {context.userName},
+    Customer / User account No. {context.userAccountNo},
+    Customer / User account type is {context.userAccountType},
+    Customer / User Account balance is {context.userAccountBalance},
+    and Customer / User account currency is {context.userAccountCurrency}.""")
+
+# _01_2's get_dynamic_instruction.
+welcome_instructions = InstructionTemplate(
+    "Welcome {context.userName}, your account No. {context.userAccountNo}, your account type is {context.userAccountType}, "
+    "and your balance is {context.userAccountBalance}. You can ask me about your account details or any banking related queries."
+)
+
+# _02_2's summary_of_provided_context.
+summary_of_provided_context = InstructionTemplate("This is context provided by is_enabled {context} with agent.name: {agent.name}")
+
+
+@function_tool
+def get_user_info(context: RunContextWrapper[UserInfo]) -> UserInfo:
+    """This function retrieves user information from the context.
+    It returns the user information as a UserInfo object."""
+    return context.context
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    calls = sum(1 for item in input if isinstance(item, dict) and item.get("type") == "function_call_output") if isinstance(input, list) else 0
+    if calls < 4:
+        return FakeToolCall("get_user_info")
+    return f"THAT I'M Intreset Finding AGENT. {input[-1]['output']}"
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+    agent = Agent[UserInfo](name="Banking Interest Finder Assistant", instructions=get_dynamic_instruction)
+    wrapper = RunContextWrapper(context=userinfo)
+    # Same prompt as _02 apart from its trailing spaces.
+    same = [line.rstrip() for line in get_dynamic_instruction(wrapper, agent).splitlines()]
+    assert interest_finder_instructions(wrapper, agent).splitlines() == same
+    # _01_2's f-string, on _02's UserInfo field names.
+    assert welcome_instructions(wrapper, agent) == (
+        f"Welcome {userinfo.userName}, your account No. {userinfo.userAccountNo}, your account type is {userinfo.userAccountType}, "
+        f"and your balance is {userinfo.userAccountBalance}. You can ask me about your account details or any banking related queries."
+    )
+    login = RunContextWrapper(context=UserLoginInfo(isUserLoggedin=True))
+    assert summary_of_provided_context(login, agent) == get_context_summary(login, agent)
+
+    rounds = 10_000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        count_tokens(get_dynamic_instruction(wrapper, agent))
+    baseline = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        interest_finder_instructions.tokens(wrapper, agent)
+    compiled = (time.perf_counter() - start) / rounds * 1e6
+    print(f"Render + token count per turn: f-string {baseline:.1f} us, compiled template {compiled:.2f} us")
+
+    agent = agent.clone(
+        instructions=interest_finder_instructions,
+        model=LitellmModel(model=MODEL_NAME, api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[get_user_info],
+    )
+    before = interest_finder_instructions.stats()
+    result = Runner.run_sync(agent, "Calculate the APRI on my savings, if the Interest rate is 3.2 percent?", context=userinfo)
+    print(result.final_output)
+    after = interest_finder_instructions.stats()
+    print(f"5 turn run: {after['renders'] - before['renders']} renders, {after['hits'] - before['hits']} cache hits")
+    userinfo.userAccountBalance += 500.0
+    print(f"After a deposit: ...{interest_finder_instructions(RunContextWrapper(context=userinfo), agent)[-90:]!r}")
+    print(f"Template cache: {interest_finder_instructions.stats()}")
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
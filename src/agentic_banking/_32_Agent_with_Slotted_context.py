@@ -0,0 +1,322 @@
+import asyncio
+import dataclasses
+import gc
+import itertools
+import json
+import os
+import time
+import tracemalloc
+import types
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Callable, ClassVar, TypeVar
+
+from agents import Agent, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from pydantic import BaseModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking._31_Agent_with_Compiled_instructions import InstructionTemplate
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+C = TypeVar("C", bound="FrozenContext")
+
+# Every snapshot gets a new stamp, so (id, context_version) never names two different snapshots,
+# even after one is freed and its id reused.
+_versions = itertools.count(1)
+_layouts: dict[type, tuple[tuple[str, ...], frozenset[str], dict[str, Callable[[Any], Any]]]] = {}
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _next_version() -> int:
+    return next(_versions)
+
+
+def _from_json(hint: Any) -> Callable[[Any], Any] | None:
+    """Converts the JSON form of a value annotated with `hint` back, None when it is already the right value."""
+    if isinstance(hint, type) and issubclass(hint, FrozenContext):
+        return lambda value: hint.from_dict(value) if isinstance(value, dict) else value
+    origin, args = typing.get_origin(hint), typing.get_args(hint)
+    if origin in (typing.Union, types.UnionType):
+        options = [option for option in args if option is not type(None)]
+        # Only Optional[X] is unambiguous, other unions keep the generic list -> tuple rule.
+        return _from_json(options[0]) if len(options) == 1 else None
+    if hint is frozenset or origin is frozenset:
+        item = _from_json(args[0]) if args else None
+        return lambda value: frozenset(map(item, value) if item else value) if isinstance(value, list) else value
+    if hint is tuple or origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            item = _from_json(args[0])
+            return lambda value: tuple(map(item, value) if item else value) if isinstance(value, list) else value
+        items = [_from_json(arg) for arg in args]
+        if any(items):
+            return lambda value: tuple(item(v) if item else v for item, v in zip(items, value)) if isinstance(value, list) else value
+    return None
+
+
+def _layout(cls: type) -> tuple[tuple[str, ...], frozenset[str], dict[str, Callable[[Any], Any]]]:
+    """
+    Field names, the same as a set, and for fields whose JSON form differs from their value (nested contexts,
+    frozensets, tuples of those) the converter back from JSON, computed once per class from the annotations.
+    """
+    layout = _layouts.get(cls)
+    if layout is None:
+        names = tuple(f.name for f in dataclasses.fields(cls) if f.name != "context_version")
+        hints = typing.get_type_hints(cls)
+        converters = {name: _from_json(hints[name]) for name in names if name in hints}
+        layout = _layouts[cls] = (names, frozenset(names), {name: convert for name, convert in converters.items() if convert})
+    return layout
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, FrozenContext):
+        return value.to_dict()
+    if isinstance(value, (tuple, list, frozenset)):
+        return [_plain(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class FrozenContext:
+    """
+    Base for run contexts that are cheap to hold by the thousand. Subclasses are declared with
+    `@dataclass(frozen=True, slots=True)`: no per-instance __dict__, no validation on construction, and an instance
+    can never change, so it is its own snapshot and can be shared between runs, prompts and traces without copying.
+
+    Derived contexts come from `evolve(**changes)`, which builds a new instance pointing at the same field objects
+    (nested contexts, tuples, strings) as the original, so only the changed fields cost memory.
+
+    Serialization contract: `to_dict()` returns JSON-ready data (nested contexts as dicts, tuples as lists), without
+    `context_version`; `from_dict()` accepts exactly that shape, rejects unknown fields, fills defaults and rebuilds
+    nested contexts and frozensets from the field annotations (other lists become tuples). Field values must be
+    immutable (str, numbers, bool, None, tuples, frozensets or other FrozenContexts).
+    Attributes:
+        context_version (int): A process-unique stamp set on every new instance (constructor, `evolve`,
+            `dataclasses.replace`, `from_dict`), used by caches such as InstructionTemplate to key on the snapshot
+            without reading its fields. Not part of equality or hashing.
+    """
+
+    # Not an init field, so dataclasses.replace() and copies made through __init__ cannot carry an old stamp over.
+    context_version: int = field(init=False, compare=False, repr=False)
+    # Tells InstructionTemplate (and other caches) that context_version alone names a snapshot.
+    __unique_context_versions__: ClassVar[bool] = True
+
+    def __post_init__(self) -> None:
+        # Subclasses that define __post_init__ must call this one.
+        object.__setattr__(self, "context_version", _next_version())
+
+    def evolve(self: C, **changes: Any) -> C:
+        """New snapshot with `changes` applied, every other field shared with this one."""
+        names, known, _ = _layout(type(self))
+        unknown = changes.keys() - known
+        if unknown:
+            raise TypeError(f"{type(self).__name__} has no fields {sorted(unknown)}")
+        new = object.__new__(type(self))
+        for name in names:
+            object.__setattr__(new, name, changes[name] if name in changes else getattr(self, name))
+        new.__post_init__()
+        return new
+
+    def snapshot(self: C) -> C:
+        """An instance is immutable, so it is already a snapshot."""
+        return self
+
+    def to_dict(self) -> dict[str, Any]:
+        names, _, _ = _layout(type(self))
+        data = {}
+        for name in names:
+            value = getattr(self, name)
+            data[name] = value if value is None or isinstance(value, (str, int, float)) else _plain(value)
+        return data
+
+    def to_json(self) -> str:
+        return _encoder.encode(self.to_dict())
+
+    @classmethod
+    def from_dict(cls: type[C], data: dict[str, Any]) -> C:
+        _, known, converters = _layout(cls)
+        unknown = data.keys() - known
+        if unknown:
+            raise ValueError(f"Unknown {cls.__name__} fields {sorted(unknown)}")
+        values = {}
+        for name, value in data.items():
+            if name in converters:
+                value = converters[name](value)
+            elif isinstance(value, list):
+                value = tuple(value)
+            values[name] = value
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls: type[C], text: str) -> C:
+        return cls.from_dict(json.loads(text))
+
+
+@dataclass(frozen=True, slots=True)
+class CustomerInfo(FrozenContext):
+    """Slotted counterpart of _02's UserInfo, the field names match so instructions and tools work unchanged."""
+
+    userName: str
+    userAccountNo: str
+    userAccountType: str
+    userAccountBalance: float
+    userAccountCurrency: str = "PKR"
+
+
+@dataclass(frozen=True, slots=True)
+class LoginState(FrozenContext):
+    """Slotted counterpart of _02_2's UserLoginInfo."""
+
+    isUserLoggedin: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class BankingSession(FrozenContext):
+    """Per-session context, each turn derives a new one that shares the customer and login objects."""
+
+    session_id: str
+    customer: CustomerInfo
+    login: LoginState
+    turn: int = 0
+    tags: tuple[str, ...] = ()
+
+
+# The pydantic shape the demo compares against.
+class PydanticLoginInfo(BaseModel):
+    isUserLoggedin: bool = False
+
+
+class PydanticSession(BaseModel):
+    session_id: str
+    customer: UserInfo
+    login: PydanticLoginInfo
+    turn: int = 0
+    tags: tuple[str, ...] = ()
+
+
+session_instructions = InstructionTemplate(
+    "You are a banking assistant for {context.customer.userName}, account No. {context.customer.userAccountNo}, "
+    "balance {context.customer.userAccountBalance} {context.customer.userAccountCurrency}. This is turn {context.turn}."
+)
+
+
+@function_tool
+def get_balance(context: RunContextWrapper[BankingSession]) -> str:
+    """Returns the balance of the logged in customer."""
+    customer = context.context.customer
+    return f"{customer.userName}: {customer.userAccountBalance} {customer.userAccountCurrency}"
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"Your balance is {input[-1]['output']}"
+    return FakeToolCall("get_balance")
+
+
+def measure(label: str, build: Callable[[], list[Any]], sessions: int) -> tuple[float, int]:
+    gc.collect()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    del kept
+    gc.collect()
+    # Timed without tracemalloc, which slows allocation down several times.
+    tracemalloc.start()
+    kept = build()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<44} {elapsed * 1e3:8.1f} ms {used / sessions:8.0f} bytes/session")
+    del kept
+    return elapsed, used
+
+
+def benchmark(sessions: int = 10_000, turns: int = 5):
+    """
+    Holds `sessions` concurrent sessions, each keeping one context snapshot per turn as traces do, and compares
+    allocation time and retained memory per session.
+    """
+    print(f"{sessions} sessions x {turns} turns, one snapshot kept per turn")
+
+    def pydantic_sessions() -> list[Any]:
+        kept = []
+        for i in range(sessions):
+            session = PydanticSession(
+                session_id=f"s{i}",
+                customer=UserInfo(userName=f"user {i}", userAccountNo=f"{i:09d}", userAccountType="Saving", userAccountBalance=1000.0 + i),
+                login=PydanticLoginInfo(isUserLoggedin=True),
+            )
+            history = [session]
+            for turn in range(1, turns):
+                # A mutable model has to be deep-copied to be a real snapshot.
+                session = session.model_copy(update={"turn": turn}, deep=True)
+                history.append(session)
+            kept.append(history)
+        return kept
+
+    def slotted_sessions() -> list[Any]:
+        kept = []
+        for i in range(sessions):
+            session = BankingSession(
+                f"s{i}",
+                CustomerInfo(f"user {i}", f"{i:09d}", "Saving", 1000.0 + i),
+                LoginState(isUserLoggedin=True),
+            )
+            history = [session]
+            for turn in range(1, turns):
+                session = session.evolve(turn=turn)
+                history.append(session)
+            kept.append(history)
+        return kept
+
+    slow, heavy = measure("pydantic models, model_copy(deep=True)", pydantic_sessions, sessions)
+    fast, light = measure("FrozenContext, evolve()", slotted_sessions, sessions)
+    print(f"FrozenContext: {slow / fast:.1f}x faster, {heavy / light:.1f}x less memory")
+
+    pydantic_one = PydanticSession(session_id="s1", customer=UserInfo(userName="a", userAccountNo="1", userAccountType="Saving", userAccountBalance=1.0), login=PydanticLoginInfo())
+    slotted_one = BankingSession("s1", CustomerInfo("a", "1", "Saving", 1.0), LoginState())
+    for label, dump in (("pydantic model_dump_json", pydantic_one.model_dump_json), ("FrozenContext to_json", slotted_one.to_json)):
+        start = time.perf_counter()
+        for _ in range(sessions):
+            dump()
+        print(f"{label:<44} {(time.perf_counter() - start) / sessions * 1e6:8.2f} us/call")
+
+
+async def main_async():
+    agent = Agent[BankingSession](
+        name="Banking Assistant",
+        instructions=session_instructions,
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=[get_balance],
+    )
+    customer = CustomerInfo("Safdar Ali Shah", "123456789", "Saving", 10765490.0)
+    login = LoginState(isUserLoggedin=True)
+    base = BankingSession("session-0", customer, login)
+    contexts = [base.evolve(session_id=f"session-{i}", turn=1) for i in range(100)]
+    assert all(ctx.customer is customer and ctx.login is login for ctx in contexts)
+    results = await asyncio.gather(*(Runner.run(agent, "What is my balance?", context=ctx) for ctx in contexts))
+    print(f"100 concurrent runs sharing one customer object: {results[0].final_output}")
+
+    restored = BankingSession.from_json(base.to_json())
+    assert restored == base and restored.context_version != base.context_version
+    # Every way of deriving a snapshot gets a new stamp, caches keyed on it must not see the old one.
+    replaced = dataclasses.replace(base, login=LoginState(isUserLoggedin=False))
+    assert replaced.context_version not in (base.context_version, contexts[0].context_version)
+    print(f"Round trip: {base.to_json()}")
+    try:
+        base.turn = 5
+    except dataclasses.FrozenInstanceError as e:
+        print(f"Snapshots are immutable: {e}")
+    benchmark()
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
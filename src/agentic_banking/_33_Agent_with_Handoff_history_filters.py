@@ -0,0 +1,345 @@
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from agents import Agent, HandoffInputData, ItemHelpers, Model, ModelSettings, Runner, handoff, set_tracing_disabled
+from agents.extensions import handoff_filters
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.items import HandoffOutputItem, ToolCallOutputItem, TResponseInputItem
+from agents.models.interface import ModelTracing
+from openai.types.responses import ResponseOutputMessage
+
+from agentic_banking._31_Agent_with_Compiled_instructions import count_tokens
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for another banking agent taking it over. Keep names, account numbers, "
+    "amounts, dates and open requests, drop small talk. Answer in at most {words} words."
+)
+
+
+def item_text(item: TResponseInputItem) -> str:
+    """The part of an input item the model reads: message text, tool call name and arguments, or tool output."""
+    kind = item.get("type")
+    if kind == "function_call":
+        return f"{item.get('name')}({item.get('arguments', '')})"
+    if kind == "function_call_output":
+        output = item.get("output", "")
+        return output if isinstance(output, str) else json.dumps(output, default=str)
+    content = item.get("content", "")
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+@functools.lru_cache(maxsize=8192)
+def text_tokens(text: str) -> int:
+    return count_tokens(text) if text else 0
+
+
+def item_tokens(item: TResponseInputItem) -> int:
+    # A few tokens of role and framing per item on top of the text.
+    return text_tokens(item_text(item)) + 4
+
+
+@dataclass(slots=True)
+class Entry:
+    """One item of the next agent's input, with where it came from so the filtered result maps back."""
+    origin: str  # "history", "pre", "new" or "summary"
+    item: Any  # the input item for history and summary, the RunItem otherwise
+    input: TResponseInputItem
+    tokens: int
+
+
+@dataclass
+class HandoffReport:
+    to_agent: str
+    items_before: int
+    items_after: int
+    tokens_before: int
+    tokens_after: int
+    summarized_items: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _entries(data: HandoffInputData) -> list[Entry]:
+    history = data.input_history
+    if isinstance(history, str):
+        history = ({"role": "user", "content": history},)
+    entries = [Entry("history", item, item, item_tokens(item)) for item in history]
+    for origin, items in (("pre", data.pre_handoff_items), ("new", data.new_items)):
+        for run_item in items:
+            item = run_item.to_input_item()
+            entries.append(Entry(origin, run_item, item, item_tokens(item)))
+    return entries
+
+
+def _is_user_message(entry: Entry) -> bool:
+    return entry.input.get("role") == "user" and entry.input.get("type", "message") == "message"
+
+
+def turns(entries: list[Entry]) -> list[list[Entry]]:
+    """Splits the entries into turns, each starting at a user message, so tool calls stay with their outputs."""
+    grouped: list[list[Entry]] = []
+    for entry in entries:
+        if not grouped or _is_user_message(entry):
+            grouped.append([])
+        grouped[-1].append(entry)
+    return grouped
+
+
+def keep_last_turns(n: int) -> Callable[[list[Entry]], list[Entry]]:
+    """Keeps the last `n` user turns and everything said after them."""
+
+    def step(entries: list[Entry]) -> list[Entry]:
+        return [entry for turn in turns(entries)[-n:] for entry in turn]
+
+    return step
+
+
+def keep_user_messages() -> Callable[[list[Entry]], list[Entry]]:
+    """Keeps only what the user said, like remove_all_tools but without the assistant's answers either."""
+
+    def step(entries: list[Entry]) -> list[Entry]:
+        return [entry for entry in entries if _is_user_message(entry) or entry.origin == "summary"]
+
+    return step
+
+
+def drop_large_tool_outputs(max_tokens: int = 200) -> Callable[[list[Entry]], list[Entry]]:
+    """
+    Replaces tool outputs longer than `max_tokens` by a short note. The call and its output both stay, so the
+    history remains a valid call/output sequence for the model.
+    """
+
+    def step(entries: list[Entry]) -> list[Entry]:
+        kept = []
+        for entry in entries:
+            if entry.input.get("type") != "function_call_output" or entry.tokens <= max_tokens:
+                kept.append(entry)
+                continue
+            note = f"[tool output of about {entry.tokens} tokens omitted before the handoff]"
+            new_input = {**entry.input, "output": note}
+            item = new_input
+            if isinstance(entry.item, ToolCallOutputItem):
+                item = dataclasses.replace(entry.item, raw_item=new_input, output=note)
+            kept.append(Entry(entry.origin, item, new_input, item_tokens(new_input)))
+        return kept
+
+    return step
+
+
+class CachedSummarizer:
+    """
+    Summarizes the turns a handoff filter drops. Conversations only grow, so summaries are cached by a running
+    digest of the summarized items: the next handoff finds the longest already summarized prefix and only folds
+    the turns after it into that summary. Without a model the summary is extractive (the start of every message),
+    which keeps offline runs deterministic.
+    Attributes:
+        calls (int): Summaries actually produced.
+        hits (int): Summaries served whole from the cache.
+        extended (int): Summaries built on top of a cached prefix.
+    """
+
+    def __init__(self, model: Model | None = None, max_words: int = 120, cache_size: int = 256):
+        self.model = model
+        self.max_words = max_words
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self.calls = 0
+        self.hits = 0
+        self.extended = 0
+
+    @staticmethod
+    def _digests(items: list[TResponseInputItem], previous: str = "") -> list[str]:
+        digest = hashlib.sha1(previous.encode())
+        out = []
+        for item in items:
+            digest.update(json.dumps(item, sort_keys=True, default=str).encode())
+            out.append(digest.copy().hexdigest())
+        return out
+
+    async def summarize(self, items: list[TResponseInputItem], previous: str = "") -> str:
+        """Summary of `items`, folded into `previous` (an earlier summary of what came before them) if given."""
+        digests = self._digests(items, previous)
+        start = 0
+        for i in range(len(digests) - 1, -1, -1):
+            cached = self._cache.get(digests[i])
+            if cached is not None:
+                start, previous = i + 1, cached
+                self._cache.move_to_end(digests[i])
+                break
+        if start == len(items):
+            self.hits += 1
+            return previous
+        self.extended += start > 0
+        self.calls += 1
+        summary = await self._summarize(previous, items[start:])
+        self._cache[digests[-1]] = summary
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return summary
+
+    async def _summarize(self, previous: str, items: list[TResponseInputItem]) -> str:
+        lines = [f"{item.get('role') or item.get('type')}: {item_text(item)}" for item in items]
+        if self.model is None:
+            words_per_line = max(8, self.max_words // max(1, len(lines)))
+            clipped = [" ".join(line.split()[:words_per_line]) for line in lines]
+            text = " | ".join(filter(None, [previous, *clipped]))
+            return " ".join(text.split()[-self.max_words:])
+        transcript = "\n".join(filter(None, [previous and f"Earlier summary: {previous}", *lines]))
+        response = await self.model.get_response(
+            SUMMARY_INSTRUCTIONS.format(words=self.max_words), [{"role": "user", "content": transcript}], ModelSettings(),
+            [], None, [], ModelTracing.DISABLED, previous_response_id=None, prompt=None,
+        )
+        texts = [ItemHelpers.extract_last_text(item) for item in response.output if isinstance(item, ResponseOutputMessage)]
+        return " ".join(filter(None, texts)) or previous
+
+
+class HandoffHistoryFilter:
+    """
+    Composable handoff input filter. The `steps` (keep_last_turns, keep_user_messages, drop_large_tool_outputs or
+    any callable over the entry list) run in order, then, if the history is still above `max_tokens`, the oldest
+    turns are folded into one summary message by `summarizer`, or dropped when there is none. The last turn is
+    always kept. Pass the instance as `handoff(input_filter=...)` or `RunConfig(handoff_input_filter=...)`.
+    Attributes:
+        reports (deque[HandoffReport]): Token counts before and after each recent handoff.
+        tokens_saved (int): Tokens kept out of the next agents' inputs over all handoffs.
+    """
+
+    def __init__(self, *steps: Callable[[list[Entry]], list[Entry]], max_tokens: int | None = None,
+                 summarizer: CachedSummarizer | None = None, report_size: int = 1000):
+        self.steps = steps
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.reports: deque[HandoffReport] = deque(maxlen=report_size)
+        self.tokens_saved = 0
+
+    async def _fit_budget(self, entries: list[Entry]) -> tuple[list[Entry], int]:
+        total = sum(entry.tokens for entry in entries)
+        if self.max_tokens is None or total <= self.max_tokens:
+            return entries, 0
+        # Leave room for the summary itself, about two tokens per word.
+        budget = self.max_tokens - (self.summarizer.max_words * 2 if self.summarizer is not None else 0)
+        grouped = turns(entries)
+        dropped: list[Entry] = []
+        while len(grouped) > 1 and total > budget:
+            turn = grouped.pop(0)
+            dropped.extend(turn)
+            total -= sum(entry.tokens for entry in turn)
+        kept = [entry for turn in grouped for entry in turn]
+        if self.summarizer is None or not dropped:
+            return kept, len(dropped)
+        summary = await self.summarizer.summarize([entry.input for entry in dropped])
+        message = {"role": "user", "content": SUMMARY_PREFIX + summary}
+        return [Entry("summary", message, message, item_tokens(message)), *kept], len(dropped)
+
+    async def __call__(self, data: HandoffInputData) -> HandoffInputData:
+        entries = _entries(data)
+        tokens_before = sum(entry.tokens for entry in entries)
+        kept = entries
+        for step in self.steps:
+            kept = step(kept)
+        kept, summarized = await self._fit_budget(kept)
+        target = next((item.target_agent.name for item in data.new_items if isinstance(item, HandoffOutputItem)), "")
+        report = HandoffReport(target, len(entries), len(kept), tokens_before, sum(entry.tokens for entry in kept), summarized)
+        self.reports.append(report)
+        self.tokens_saved += report.tokens_saved
+        logger.info("Handoff to %s: %d -> %d items, %d -> %d tokens (%d saved, %d items summarized)", target,
+                    report.items_before, report.items_after, report.tokens_before, report.tokens_after, report.tokens_saved, summarized)
+        return data.clone(
+            input_history=tuple(entry.item for entry in kept if entry.origin in ("history", "summary")),
+            pre_handoff_items=tuple(entry.item for entry in kept if entry.origin == "pre"),
+            new_items=tuple(entry.item for entry in kept if entry.origin == "new"),
+        )
+
+
+def build_history(turn_count: int) -> list[TResponseInputItem]:
+    """A long earlier conversation with bulky statement lookups, as a returning customer would bring to triage."""
+    history: list[TResponseInputItem] = []
+    for i in range(turn_count):
+        history.append({"role": "user", "content": f"Show my transactions for month {i + 1} on account 123456789."})
+        history.append({"type": "function_call", "call_id": f"stmt_{i}", "name": "get_statement", "arguments": json.dumps({"month": i + 1})})
+        rows = "; ".join(f"2025-{i % 12 + 1:02d}-{day:02d} card payment {day * 137 % 9000} PKR" for day in range(1, 29))
+        history.append({"type": "function_call_output", "call_id": f"stmt_{i}", "output": rows})
+        history.append({"role": "assistant", "content": f"Here are your month {i + 1} transactions, 28 card payments in total."})
+    return history
+
+
+def triage_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return "Handing you over."
+    return FakeToolCall("transfer_to_banking_interest_finder_assistant")
+
+
+def interest_reply(text: str, input: Any) -> Any:
+    items = input if isinstance(input, list) else [input]
+    return f"THAT I'M Intreset Finding AGENT. I received {len(items)} items. 3.2% of 10765490 PKR is 344495.68 PKR."
+
+
+async def main_async():
+    model = (lambda reply: LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key)) if api_key else (lambda reply: FakeModel(reply=reply))
+    interest_agent = Agent(
+        name="Banking Interest Finder Assistant",
+        instructions="You calculate the Annual Per Return on Investment (APRI) on the customer's savings.",
+        model=model(interest_reply),
+    )
+    summarizer = CachedSummarizer(model=None if not api_key else model(None))
+    filters = {
+        "none (full history)": None,
+        "remove_all_tools": handoff_filters.remove_all_tools,
+        "last 3 turns": HandoffHistoryFilter(keep_last_turns(3)),
+        "user messages only": HandoffHistoryFilter(keep_user_messages()),
+        "large tool outputs dropped": HandoffHistoryFilter(drop_large_tool_outputs(200)),
+        "2k token budget + summary": HandoffHistoryFilter(drop_large_tool_outputs(200), max_tokens=2000, summarizer=summarizer),
+    }
+    history = build_history(30)
+    question = {"role": "user", "content": "Calculate the APRI on my savings, if the Interest rate is 3.2 percent?"}
+    for label, input_filter in filters.items():
+        triage_agent = Agent(
+            name="Triage Agent",
+            instructions="Route interest and APRI questions to the Banking Interest Finder Assistant.",
+            model=model(triage_reply),
+            handoffs=[handoff(interest_agent, input_filter=input_filter)],
+        )
+        result = await Runner.run(triage_agent, [*history, question])
+        line = f"{label:<28} {result.final_output}"
+        if isinstance(input_filter, HandoffHistoryFilter):
+            report = input_filter.reports[-1]
+            line += f" [{report.tokens_before} -> {report.tokens_after} tokens, {report.tokens_saved} saved]"
+        print(line)
+
+    # The same customer hands off again a few turns later: only the new turns are folded into the cached summary.
+    budgeted = filters["2k token budget + summary"]
+    for extra in (0, 2, 4):
+        longer = build_history(30 + extra)
+        triage_agent = Agent(name="Triage Agent", model=model(triage_reply), handoffs=[handoff(interest_agent, input_filter=budgeted)])
+        await Runner.run(triage_agent, [*longer, question])
+    print(f"Summarizer: {summarizer.calls} summaries, {summarizer.extended} extended a cached one, {summarizer.hits} cache hits")
+    print(f"Budgeted filter saved {budgeted.tokens_saved} tokens over {len(budgeted.reports)} handoffs")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
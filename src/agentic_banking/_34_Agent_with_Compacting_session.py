@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from agents import Agent, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.items import TResponseInputItem
+
+from agentic_banking._33_Agent_with_Handoff_history_filters import SUMMARY_PREFIX, CachedSummarizer, item_tokens
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+logger = logging.getLogger(__name__)
+
+
+def _starts_turn(item: TResponseInputItem) -> bool:
+    return item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+class CompactingSession:
+    """
+    Session (agents.memory.Session protocol) that keeps a rolling summary of the old turns plus the recent turns
+    verbatim, so the prompt stays about `window_tokens` + the summary however long the customer talks.
+    Use it instead of carrying `result.to_input_list()` from turn to turn: `Runner.run(agent, text, session=...)`.
+
+    Once the verbatim part grows past `compact_at` tokens, the oldest whole turns are folded into the summary by a
+    background task. The next turn never waits for it: it reads whatever is there, and the compaction is applied
+    atomically when the summary is ready. Turns are cut at user messages, so tool calls keep their outputs.
+    Attributes:
+        compactions (int): Compactions applied.
+        compacted_items (int): Items folded into the summary so far.
+        discarded_compactions (int): Compactions thrown away because pop_item/clear_session changed the history.
+    """
+
+    def __init__(self, session_id: str, summarizer: CachedSummarizer | None = None, window_tokens: int = 1500,
+                 compact_at: int = 3000):
+        if compact_at <= window_tokens:
+            raise ValueError("compact_at must be larger than window_tokens, or every turn would compact.")
+        self.session_id = session_id
+        self.summarizer = summarizer or CachedSummarizer()
+        self.window_tokens = window_tokens
+        self.compact_at = compact_at
+        self._summary = ""
+        self._items: list[TResponseInputItem] = []
+        self._tokens: list[int] = []
+        self._total = 0
+        # Bumped by anything that rewrites history, so a compaction started before it is not applied.
+        self._epoch = 0
+        self._task: asyncio.Task | None = None
+        self.compactions = 0
+        self.compacted_items = 0
+        self.discarded_compactions = 0
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    def prompt_tokens(self) -> int:
+        """Tokens the next turn sends as history, the summary included."""
+        return self._total + (item_tokens(self._summary_item()) if self._summary else 0)
+
+    def _summary_item(self) -> TResponseInputItem:
+        return {"role": "user", "content": SUMMARY_PREFIX + self._summary}
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        items = ([self._summary_item()] if self._summary else []) + self._items
+        return items[-limit:] if limit else items
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        for item in items:
+            tokens = item_tokens(item)
+            self._items.append(item)
+            self._tokens.append(tokens)
+            self._total += tokens
+        if self._total > self.compact_at and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._compact())
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        if not self._items:
+            return None
+        self._epoch += 1
+        self._total -= self._tokens.pop()
+        return self._items.pop()
+
+    async def clear_session(self) -> None:
+        self._epoch += 1
+        self._summary = ""
+        self._items, self._tokens, self._total = [], [], 0
+
+    async def wait_compacted(self) -> None:
+        """Waits for a running compaction, for shutdown and tests; turns never need to call it."""
+        while self._task is not None and not self._task.done():
+            await self._task
+
+    def _cut(self) -> int:
+        """Index of the first turn to keep verbatim: the oldest one whose suffix fits `window_tokens`."""
+        suffix = self._total
+        last_start = 0
+        for i, item in enumerate(self._items):
+            if _starts_turn(item) and i > 0:
+                last_start = i
+                if suffix <= self.window_tokens:
+                    return i
+            suffix -= self._tokens[i]
+        # Even the last turn is larger than the window, keep at least that one.
+        return last_start
+
+    async def _compact(self) -> None:
+        epoch = self._epoch
+        cut = self._cut()
+        if cut == 0:
+            return
+        folded = self._items[:cut]
+        try:
+            summary = await self.summarizer.summarize(folded, previous=self._summary)
+        except Exception:
+            logger.exception("Compaction of session %s failed, keeping the full history", self.session_id)
+            return
+        if epoch != self._epoch:
+            self.discarded_compactions += 1
+            return
+        # Items are only appended while the summary was written, so the first `cut` are still the folded ones.
+        self._summary = summary
+        self._total -= sum(self._tokens[:cut])
+        del self._items[:cut], self._tokens[:cut]
+        self.compactions += 1
+        self.compacted_items += cut
+        logger.info("Session %s: folded %d items into the summary, %d tokens of history left", self.session_id, cut, self.prompt_tokens())
+        if self._total > self.compact_at:
+            # Turns kept coming while the summary was written, catch up right away.
+            self._task = asyncio.create_task(self._compact())
+
+
+@function_tool
+def get_statement(month: int) -> str:
+    """Returns the card transactions of account 123456789 for a month of 2025."""
+    return "; ".join(f"2025-{month:02d}-{day:02d} card payment {day * 137 % 9000} PKR" for day in range(1, 29, 3))
+
+
+def banking_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"Here are your transactions: {input[-1]['output'][:60]}..."
+    month = int(text.rsplit(" ", 1)[-1].rstrip("?")) % 12 + 1
+    return FakeToolCall("get_statement", {"month": month})
+
+
+def summary_reply(text: str, input: Any) -> Any:
+    # Offline stand-in for an LLM summary: the last 80 words of the transcript.
+    return " ".join(text.split()[-80:])
+
+
+async def run_session(agent: Agent, turns: int, session: CompactingSession | None) -> list[tuple[int, float]]:
+    """Runs `turns` customer messages, returning the history tokens sent and the wall time of each turn."""
+    history: list[TResponseInputItem] = []
+    samples = []
+    for turn in range(1, turns + 1):
+        message = f"Show my card payments for month {turn}?"
+        start = time.perf_counter()
+        if session is None:
+            # The to_input_list() way: every turn re-sends everything said so far.
+            sent = sum(item_tokens(item) for item in history)
+            result = await Runner.run(agent, [*history, {"role": "user", "content": message}])
+            history = result.to_input_list()
+        else:
+            sent = session.prompt_tokens()
+            await Runner.run(agent, message, session=session)
+        samples.append((sent, time.perf_counter() - start))
+    return samples
+
+
+async def main_async():
+    agent = Agent(
+        name="Banking Assistant",
+        instructions="You are a helpfull assistant, who help in customer service and banking.",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=banking_reply, latency=0.02),
+        tools=[get_statement],
+    )
+    summary_model = LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=summary_reply, latency=0.2)
+    session = CompactingSession("customer-123456789", CachedSummarizer(model=summary_model, max_words=100), window_tokens=1200, compact_at=2400)
+    turns = 200
+    plain = await run_session(agent, turns, None)
+    compacted = await run_session(agent, turns, session)
+    await session.wait_compacted()
+    print("turn   to_input_list tokens   compacting session tokens")
+    for turn in (1, 10, 50, 100, 200):
+        print(f"{turn:>4} {plain[turn - 1][0]:>22} {compacted[turn - 1][0]:>27}")
+    slowest = max(seconds for _, seconds in compacted)
+    print(f"{session.compactions} background compactions folded {session.compacted_items} items, each summary took 0.2 s, "
+          f"slowest turn {slowest * 1e3:.1f} ms")
+    print(f"Summary now: {session.summary[:160]}...")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
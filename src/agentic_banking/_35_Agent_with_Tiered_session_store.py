@@ -0,0 +1,373 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from agents import Agent, RunResult, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.items import TResponseInputItem
+
+from agentic_banking._24_Agent_with_SQLite_profile_store import AsyncConnectionPool
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    turns INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS turns (
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    item_count INTEGER NOT NULL,
+    items BLOB NOT NULL,
+    result BLOB,
+    PRIMARY KEY (session_id, turn)
+) WITHOUT ROWID;
+"""
+UPSERT_SESSION = """
+INSERT INTO sessions (session_id, turns, updated_at) VALUES (?, ?, ?)
+ON CONFLICT(session_id) DO UPDATE SET turns = excluded.turns, updated_at = excluded.updated_at
+"""
+# Turns are small JSON documents, a preset dictionary of the strings every item repeats lets zlib compress even
+# the first bytes of each one. Changing it makes the blobs already written unreadable.
+ZDICT = (
+    b'{"type":"function_call_output","call_id":"call_","output":"'
+    b'{"type":"function_call","call_id":"call_","name":"","arguments":"{\\"'
+    b'{"id":"fake_","content":[{"annotations":[],"text":"","type":"output_text"}],"role":"assistant","status":"completed","type":"message"}'
+    b'{"content":"","role":"user"}{"role":"assistant","content":"'
+    b'account PKR balance transfer interest statement card payment'
+)
+
+
+def compress(value: Any) -> bytes:
+    packer = zlib.compressobj(6, zdict=ZDICT)
+    return packer.compress(json.dumps(value, separators=(",", ":"), default=str).encode()) + packer.flush()
+
+
+def decompress(blob: bytes) -> Any:
+    unpacker = zlib.decompressobj(zdict=ZDICT)
+    return json.loads(unpacker.decompress(blob) + unpacker.flush())
+
+
+def result_metadata(result: RunResult) -> dict[str, Any]:
+    """What a resumed conversation needs to know about a finished run, without the run itself."""
+    usage = result.context_wrapper.usage
+    return {
+        "last_agent": result.last_agent.name,
+        "final_output": result.final_output if isinstance(result.final_output, (str, int, float, bool, type(None))) else str(result.final_output),
+        "new_items": len(result.new_items),
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "finished_at": time.time(),
+    }
+
+
+@dataclass
+class _Cached:
+    """Memory tier entry. `turns` holds the loaded suffix of the session, turns below `first_loaded` stay on disk."""
+    turn_count: int
+    item_counts: list[int]
+    updated_at: float
+    turns: dict[int, list[TResponseInputItem]] = field(default_factory=dict)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def first_loaded(self) -> int:
+        return min(self.turns, default=self.turn_count + 1)
+
+
+class TieredSessionStore:
+    """
+    Conversation histories that survive worker restarts: an LRU of recently used sessions in memory in front of
+    SQLite, where every turn (one Runner.run) is one zlib-compressed row with its RunResult metadata.
+
+    Opening a session reads only the per-turn item counts; turn bodies load on demand, newest first, so
+    `get_items(limit=20)` on a 200-turn session touches a handful of rows and a full load is one range query.
+    Sessions idle for more than `ttl` seconds are deleted, lazily on access and in bulk every `evict_every` writes.
+    Attributes:
+        memory_hits (int): Sessions served from the memory tier.
+        disk_opens (int): Sessions opened from SQLite.
+        turns_loaded (int): Turn rows read and decompressed.
+        raw_bytes (int): JSON bytes written.
+        stored_bytes (int): Compressed bytes written.
+    """
+
+    def __init__(self, path: str, memory_sessions: int = 1024, ttl: float | None = 30 * 24 * 3600, pool_size: int = 4,
+                 evict_every: int = 1000):
+        self.pool = AsyncConnectionPool(path, pool_size, init_sql=SCHEMA)
+        self.memory_sessions = memory_sessions
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._memory: OrderedDict[str, _Cached] = OrderedDict()
+        self._opening: dict[str, asyncio.Future[_Cached]] = {}
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_opens = 0
+        self.turns_loaded = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def session(self, session_id: str) -> "StoredSession":
+        return StoredSession(self, session_id)
+
+    def _expired(self, updated_at: float) -> bool:
+        return self.ttl is not None and time.time() - updated_at > self.ttl
+
+    async def _open(self, session_id: str) -> _Cached:
+        cached = self._memory.get(session_id)
+        if cached is not None and not self._expired(cached.updated_at):
+            self.memory_hits += 1
+            self._memory.move_to_end(session_id)
+            return cached
+        # Concurrent first accesses share one disk read, so they all get the same entry and the same lock.
+        opening = self._opening.get(session_id)
+        if opening is None:
+            opening = self._opening[session_id] = asyncio.ensure_future(self._read_session(session_id))
+            opening.add_done_callback(lambda _: self._opening.pop(session_id, None))
+        return await asyncio.shield(opening)
+
+    async def _read_session(self, session_id: str) -> _Cached:
+        def read(conn: sqlite3.Connection) -> tuple[Any, list[int]]:
+            header = conn.execute("SELECT turns, updated_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            counts = conn.execute("SELECT item_count FROM turns WHERE session_id = ? ORDER BY turn", (session_id,)).fetchall()
+            return header, [count for (count,) in counts]
+
+        self.disk_opens += 1
+        header, counts = await self.pool.run(read)
+        if header is None or self._expired(header[1]):
+            if header is not None:
+                await self.clear(session_id)
+            cached = _Cached(0, [], time.time())
+        else:
+            cached = _Cached(header[0], counts, header[1])
+        self._memory[session_id] = cached
+        while len(self._memory) > self.memory_sessions:
+            self._memory.popitem(last=False)
+        return cached
+
+    async def _load(self, session_id: str, cached: _Cached, from_turn: int) -> None:
+        """Loads turns from `from_turn` up to the first one already in memory."""
+        stop = cached.first_loaded
+        if from_turn >= stop:
+            return
+        rows = await self.pool.run(lambda conn: conn.execute(
+            "SELECT turn, items FROM turns WHERE session_id = ? AND turn >= ? AND turn < ?", (session_id, from_turn, stop)).fetchall())
+        for turn, blob in rows:
+            cached.turns[turn] = decompress(blob)
+        self.turns_loaded += len(rows)
+
+    async def get_items(self, session_id: str, limit: int | None = None) -> list[TResponseInputItem]:
+        cached = await self._open(session_id)
+        first = 1
+        if limit is not None:
+            # Walk back from the newest turn until the turns hold `limit` items.
+            first, held = cached.turn_count + 1, 0
+            while first > 1 and held < limit:
+                first -= 1
+                held += cached.item_counts[first - 1]
+        await self._load(session_id, cached, first)
+        items = [item for turn in range(first, cached.turn_count + 1) for item in cached.turns[turn]]
+        return items[-limit:] if limit else items
+
+    async def add_turn(self, session_id: str, items: list[TResponseInputItem]) -> int:
+        """Appends one turn and returns its number."""
+        cached = await self._open(session_id)
+        async with cached.lock:
+            turn = cached.turn_count + 1
+            now = time.time()
+            raw = len(json.dumps(items, separators=(",", ":"), default=str))
+            blob = compress(items)
+
+            def write(conn: sqlite3.Connection) -> None:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("INSERT INTO turns (session_id, turn, item_count, items) VALUES (?, ?, ?, ?)", (session_id, turn, len(items), blob))
+                    conn.execute(UPSERT_SESSION, (session_id, turn, now))
+
+            await self.pool.run(write)
+            # The loaded turns always form a suffix of the session, so the new turn simply extends it.
+            cached.turns[turn] = list(items)
+            cached.turn_count, cached.updated_at = turn, now
+            cached.item_counts.append(len(items))
+            self.raw_bytes += raw
+            self.stored_bytes += len(blob)
+        self._writes += 1
+        if self.ttl is not None and self._writes % self.evict_every == 0:
+            await self.evict_expired()
+        return turn
+
+    async def record_result(self, session_id: str, result: RunResult, turn: int | None = None) -> None:
+        """Stores the RunResult metadata with the session's last turn, or `turn`."""
+        cached = await self._open(session_id)
+        turn = turn or cached.turn_count
+        blob = compress(result_metadata(result))
+        await self.pool.run(lambda conn: conn.execute("UPDATE turns SET result = ? WHERE session_id = ? AND turn = ?", (blob, session_id, turn)))
+
+    async def results(self, session_id: str, last: int = 10) -> list[dict[str, Any]]:
+        rows = await self.pool.run(lambda conn: conn.execute(
+            "SELECT turn, result FROM turns WHERE session_id = ? AND result IS NOT NULL ORDER BY turn DESC LIMIT ?", (session_id, last)).fetchall())
+        return [{"turn": turn, **decompress(blob)} for turn, blob in reversed(rows)]
+
+    async def pop_item(self, session_id: str) -> TResponseInputItem | None:
+        cached = await self._open(session_id)
+        async with cached.lock:
+            if cached.turn_count == 0:
+                return None
+            turn = cached.turn_count
+            await self._load(session_id, cached, turn)
+            # The cached turn only changes once the write has succeeded.
+            items = cached.turns[turn][:-1]
+            item = cached.turns[turn][-1]
+            now = time.time()
+
+            def write(conn: sqlite3.Connection) -> None:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    if items:
+                        conn.execute("UPDATE turns SET item_count = ?, items = ? WHERE session_id = ? AND turn = ?", (len(items), compress(items), session_id, turn))
+                    else:
+                        conn.execute("DELETE FROM turns WHERE session_id = ? AND turn = ?", (session_id, turn))
+                    conn.execute(UPSERT_SESSION, (session_id, turn if items else turn - 1, now))
+
+            await self.pool.run(write)
+            cached.updated_at = now
+            if items:
+                cached.turns[turn] = items
+                cached.item_counts[-1] = len(items)
+            else:
+                del cached.turns[turn]
+                cached.item_counts.pop()
+                cached.turn_count -= 1
+            return item
+
+    async def clear(self, session_id: str) -> None:
+        self._memory.pop(session_id, None)
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+        await self.pool.run(write)
+
+    async def evict_expired(self) -> int:
+        """Deletes sessions idle for longer than `ttl`, returns how many."""
+        if self.ttl is None:
+            return 0
+        cutoff = time.time() - self.ttl
+        for session_id in [sid for sid, cached in self._memory.items() if cached.updated_at < cutoff]:
+            del self._memory[session_id]
+
+        def write(conn: sqlite3.Connection) -> int:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)", (cutoff,))
+                return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+        return await self.pool.run(write)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class StoredSession:
+    """agents.memory.Session view of one conversation in a TieredSessionStore, pass it as `Runner.run(session=...)`."""
+
+    def __init__(self, store: TieredSessionStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+
+    async def get_items(self, limit: int | None = None) -> list[TResponseInputItem]:
+        return await self.store.get_items(self.session_id, limit)
+
+    async def add_items(self, items: list[TResponseInputItem]) -> None:
+        await self.store.add_turn(self.session_id, items)
+
+    async def pop_item(self) -> TResponseInputItem | None:
+        return await self.store.pop_item(self.session_id)
+
+    async def clear_session(self) -> None:
+        await self.store.clear(self.session_id)
+
+    async def record_result(self, result: RunResult) -> None:
+        await self.store.record_result(self.session_id, result)
+
+
+@function_tool
+def get_statement(month: int) -> str:
+    """Returns the card transactions of account 123456789 for a month of 2025."""
+    return "; ".join(f"2025-{month:02d}-{day:02d} card payment {day * 137 % 9000} PKR" for day in range(1, 29, 3))
+
+
+def banking_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return f"Here are your transactions: {input[-1]['output'][:60]}..."
+    month = int(text.rsplit(" ", 1)[-1].rstrip("?")) % 12 + 1
+    return FakeToolCall("get_statement", {"month": month})
+
+
+async def main_async():
+    path = os.path.join(tempfile.mkdtemp(prefix="agentic-banking-sessions-"), "sessions.db")
+    agent = Agent(
+        name="Banking Assistant",
+        instructions="You are a helpfull assistant, who help in customer service and banking.",
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=banking_reply),
+        tools=[get_statement],
+    )
+    store = TieredSessionStore(path)
+    session = store.session("customer-123456789")
+    start = time.perf_counter()
+    for turn in range(1, 201):
+        result = await Runner.run(agent, f"Show my card payments for month {turn}?", session=session)
+        await session.record_result(result)
+    print(f"200 turns run and stored in {time.perf_counter() - start:.2f}s, "
+          f"{store.raw_bytes / 1024:.0f} KiB of JSON stored as {store.stored_bytes / 1024:.0f} KiB")
+    store.close()
+
+    # A new worker: nothing in memory, nothing re-run.
+    store = TieredSessionStore(path)
+    session = store.session("customer-123456789")
+    start = time.perf_counter()
+    recent = await session.get_items(limit=20)
+    lazy = time.perf_counter() - start
+    print(f"Last 20 items after a restart: {lazy * 1e3:.2f} ms, {store.turns_loaded} turns read from disk")
+    start = time.perf_counter()
+    items = await session.get_items()
+    full = time.perf_counter() - start
+    print(f"Full 200-turn history ({len(items)} items): {full * 1e3:.2f} ms, {store.turns_loaded} turns read from disk in total")
+    start = time.perf_counter()
+    await session.get_items()
+    print(f"Again from the memory tier: {(time.perf_counter() - start) * 1e3:.3f} ms")
+    assert recent == items[-20:]
+
+    result = await Runner.run(agent, "Show my card payments for month 201?", session=session)
+    await session.record_result(result)
+    print(f"Turn 201 answered with the stored history: {result.final_output}")
+    print(f"Last results: {[(r['turn'], r['last_agent'], r['input_tokens']) for r in await store.results(session.session_id, last=3)]}")
+
+    store.ttl = 0.0
+    print(f"TTL eviction removed {await store.evict_expired()} idle sessions")
+    store.close()
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
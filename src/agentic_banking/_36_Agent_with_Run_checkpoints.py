@@ -0,0 +1,475 @@
+import asyncio
+import contextvars
+import dataclasses
+import importlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Protocol
+
+from agents import Agent, FunctionTool, ItemHelpers, Model, ModelResponse, RunResult, Runner, Usage, function_tool, set_tracing_disabled
+from agents.exceptions import MaxTurnsExceeded, UserError
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.items import TResponseInputItem, TResponseOutputItem
+from pydantic import BaseModel, TypeAdapter
+
+from agentic_banking._24_Agent_with_SQLite_profile_store import AsyncConnectionPool
+from agentic_banking._28_Agent_with_Agent_tool_executor import _resolve_model
+from agentic_banking._32_Agent_with_Slotted_context import FrozenContext
+from agentic_banking._35_Agent_with_Tiered_session_store import compress, decompress
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+_output_items = TypeAdapter(list[TResponseOutputItem])
+_usage = TypeAdapter(Usage)
+
+INTERRUPTED_NOTE = (
+    "The previous attempt of this tool call was interrupted and its outcome is unknown. "
+    "Do not retry it blindly, check its effect first or ask the customer."
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    checkpoint_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    body BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS checkpoints_by_run ON checkpoints (run_id, step);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    run_id TEXT NOT NULL,
+    call_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    output BLOB,
+    PRIMARY KEY (run_id, call_id)
+) WITHOUT ROWID;
+"""
+
+
+class CheckpointStore(Protocol):
+    """Where CheckpointRunner keeps checkpoints (JSON-ready dicts) and per tool call records."""
+
+    async def save(self, checkpoint: dict[str, Any]) -> None: ...
+
+    async def load(self, checkpoint_id: str) -> dict[str, Any] | None: ...
+
+    async def latest(self, run_id: str) -> dict[str, Any] | None: ...
+
+    async def record_tool(self, run_id: str, call_id: str, status: str, output: Any = None,
+                          checkpoint: dict[str, Any] | None = None) -> None:
+        """Records a tool call; `checkpoint`, if given, is saved together with the record, atomically."""
+
+    async def tool_record(self, run_id: str, call_id: str) -> tuple[str, Any] | None: ...
+
+
+class MemoryCheckpointStore:
+    """In-process store, for tests and for runs that only need to survive exceptions, not restarts."""
+
+    def __init__(self):
+        self._checkpoints: dict[str, dict[str, Any]] = {}
+        self._latest: dict[str, str] = {}
+        self._tools: dict[tuple[str, str], tuple[str, Any]] = {}
+
+    async def save(self, checkpoint: dict[str, Any]) -> None:
+        self._checkpoints[checkpoint["checkpoint_id"]] = json.loads(json.dumps(checkpoint, default=str))
+        self._latest[checkpoint["run_id"]] = checkpoint["checkpoint_id"]
+
+    async def load(self, checkpoint_id: str) -> dict[str, Any] | None:
+        return self._checkpoints.get(checkpoint_id)
+
+    async def latest(self, run_id: str) -> dict[str, Any] | None:
+        checkpoint_id = self._latest.get(run_id)
+        return self._checkpoints.get(checkpoint_id) if checkpoint_id else None
+
+    async def record_tool(self, run_id: str, call_id: str, status: str, output: Any = None,
+                          checkpoint: dict[str, Any] | None = None) -> None:
+        if checkpoint is not None:
+            await self.save(checkpoint)
+        self._tools[(run_id, call_id)] = (status, output)
+
+    async def tool_record(self, run_id: str, call_id: str) -> tuple[str, Any] | None:
+        return self._tools.get((run_id, call_id))
+
+
+class SQLiteCheckpointStore:
+    """Checkpoints as compressed rows in SQLite (WAL), readable by any worker that opens the same file."""
+
+    def __init__(self, path: str, pool_size: int = 2):
+        self.pool = AsyncConnectionPool(path, pool_size, init_sql=SCHEMA)
+
+    async def save(self, checkpoint: dict[str, Any]) -> None:
+        row = (checkpoint["checkpoint_id"], checkpoint["run_id"], checkpoint["step"], compress(checkpoint))
+        await self.pool.run(lambda conn: conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", row))
+
+    async def load(self, checkpoint_id: str) -> dict[str, Any] | None:
+        row = await self.pool.run(lambda conn: conn.execute("SELECT body FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)).fetchone())
+        return decompress(row[0]) if row else None
+
+    async def latest(self, run_id: str) -> dict[str, Any] | None:
+        row = await self.pool.run(lambda conn: conn.execute(
+            "SELECT body FROM checkpoints WHERE run_id = ? ORDER BY step DESC LIMIT 1", (run_id,)).fetchone())
+        return decompress(row[0]) if row else None
+
+    async def record_tool(self, run_id: str, call_id: str, status: str, output: Any = None,
+                          checkpoint: dict[str, Any] | None = None) -> None:
+        blob = compress(output) if status == "done" else None
+        row = None if checkpoint is None else (checkpoint["checkpoint_id"], checkpoint["run_id"], checkpoint["step"], compress(checkpoint))
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if row is not None:
+                    conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", row)
+                conn.execute("INSERT OR REPLACE INTO tool_calls VALUES (?, ?, ?, ?)", (run_id, call_id, status, blob))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+        await self.pool.run(write)
+
+    async def tool_record(self, run_id: str, call_id: str) -> tuple[str, Any] | None:
+        row = await self.pool.run(lambda conn: conn.execute(
+            "SELECT status, output FROM tool_calls WHERE run_id = ? AND call_id = ?", (run_id, call_id)).fetchone())
+        if row is None:
+            return None
+        return row[0], decompress(row[1]) if row[1] is not None else None
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def idempotent(tool: FunctionTool) -> FunctionTool:
+    """Marks a tool as safe to run again when a resumed run finds it was interrupted mid-call."""
+    tool.idempotent = True
+    return tool
+
+
+def dump_context(context: Any) -> dict[str, Any] | None:
+    if context is None:
+        return None
+    kind = type(context)
+    if isinstance(context, FrozenContext):
+        data = context.to_dict()
+    elif isinstance(context, BaseModel):
+        data = context.model_dump(mode="json")
+    else:
+        raise UserError(f"Cannot checkpoint a {kind.__name__} context, use a FrozenContext or pydantic model.")
+    return {"type": f"{kind.__module__}:{kind.__qualname__}", "data": data}
+
+
+def load_context(snapshot: dict[str, Any] | None) -> Any:
+    if snapshot is None:
+        return None
+    module, _, qualname = snapshot["type"].partition(":")
+    kind: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        kind = getattr(kind, part)
+    return kind.from_dict(snapshot["data"]) if issubclass(kind, FrozenContext) else kind.model_validate(snapshot["data"])
+
+
+@dataclasses.dataclass
+class _RunState:
+    """The checkpoint being built for the running step, shared with the model and tool wrappers."""
+    store: CheckpointStore
+    checkpoint: dict[str, Any]
+    replay: ModelResponse | None = None
+    model_calls: int = 0
+    replayed_model_calls: int = 0
+    tools_run: int = 0
+    tools_reused: int = 0
+
+
+_state: contextvars.ContextVar[_RunState | None] = contextvars.ContextVar("checkpoint_run", default=None)
+
+
+class CheckpointingModel(Model):
+    """Saves each model response before its tool calls run, and serves a saved one instead of calling the model on resume."""
+
+    def __init__(self, model: Model):
+        self.model = model
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, prompt=None, **kwargs) -> ModelResponse:
+        state = _state.get()
+        if state is not None and state.replay is not None:
+            response, state.replay = state.replay, None
+            state.replayed_model_calls += 1
+            return response
+        response = await self.model.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                                                 previous_response_id=previous_response_id, prompt=prompt, **kwargs)
+        if state is not None:
+            state.model_calls += 1
+            if any(item.type == "function_call" for item in response.output):
+                state.checkpoint["pending_response"] = {
+                    "output": [item.model_dump(mode="json", exclude_none=True) for item in response.output],
+                    "usage": _usage.dump_python(response.usage, mode="json"),
+                    "response_id": response.response_id,
+                }
+                await state.store.save(state.checkpoint)
+        return response
+
+    def stream_response(self, *args, **kwargs) -> AsyncIterator[Any]:
+        return self.model.stream_response(*args, **kwargs)
+
+
+def _checkpointed_tool(tool: FunctionTool) -> FunctionTool:
+    invoke = tool.on_invoke_tool
+    repeatable = getattr(tool, "idempotent", False)
+
+    async def on_invoke_tool(ctx, input: str) -> Any:
+        state = _state.get()
+        call_id = getattr(ctx, "tool_call_id", None)
+        if state is None or call_id is None:
+            return await invoke(ctx, input)
+        run_id = state.checkpoint["run_id"]
+        record = await state.store.tool_record(run_id, call_id)
+        if record is not None:
+            status, output = record
+            if status == "done":
+                state.tools_reused += 1
+                return output
+            if not repeatable:
+                return INTERRUPTED_NOTE
+        await state.store.record_tool(run_id, call_id, "started")
+        output = await invoke(ctx, input)
+        state.tools_run += 1
+        # A finished call is never run again on resume, so whatever it did to the context is saved with its record.
+        snapshot = dump_context(ctx.context)
+        if snapshot != state.checkpoint["context"]:
+            state.checkpoint["context"] = snapshot
+            await state.store.record_tool(run_id, call_id, "done", output, checkpoint=state.checkpoint)
+        else:
+            await state.store.record_tool(run_id, call_id, "done", output)
+        return output
+
+    return dataclasses.replace(tool, on_invoke_tool=on_invoke_tool)
+
+
+def _agents_in(agent: Agent[Any], found: dict[str, Agent[Any]]) -> dict[str, Agent[Any]]:
+    if agent.name in found:
+        return found
+    found[agent.name] = agent
+    for target in agent.handoffs:
+        if isinstance(target, Agent):
+            _agents_in(target, found)
+    return found
+
+
+class CheckpointRunner:
+    """
+    Runs an agent one turn at a time (Runner.run with max_turns=1, continued from the MaxTurnsExceeded run data) and
+    writes a checkpoint to `store` after every turn: the current agent, the input items so far, a snapshot of the
+    context (FrozenContext or pydantic model) and the usage. A model response with tool calls is saved before its
+    tools run, and every tool call is recorded by call id when it starts and when it finishes.
+
+    `resume(checkpoint_id)` (or `resume_run(run_id)` for the latest checkpoint) continues on any worker with the same
+    agents: a saved response is replayed instead of calling the model again, finished tool calls return their
+    recorded output, and calls that were interrupted run again only if marked `idempotent`, otherwise the model is
+    told their outcome is unknown. When a tool changes the context, the snapshot is saved with its "done" record, so
+    a resume starts from the context as the finished calls left it. Handoff targets are found through `agent.handoffs`; targets given as Handoff
+    objects must be passed in `agents`.
+    Agent hooks see one agent start per turn, and input guardrails only run on the first turn of a run.
+    """
+
+    def __init__(self, store: CheckpointStore, agents: list[Agent[Any]] | None = None):
+        self.store = store
+        self._agents: dict[str, Agent[Any]] = {}
+        for agent in agents or []:
+            _agents_in(agent, self._agents)
+        self._instrumented: dict[int, Agent[Any]] = {}
+
+    def _agent(self, name: str) -> Agent[Any]:
+        try:
+            return self._agents[name]
+        except KeyError:
+            raise UserError(f"Agent {name!r} from the checkpoint is not known to this runner, pass it in `agents`.") from None
+
+    def _instrument(self, agent: Agent[Any], first_step: bool) -> Agent[Any]:
+        key = id(agent) * 2 + first_step
+        instrumented = self._instrumented.get(key)
+        if instrumented is None:
+            tools = [_checkpointed_tool(tool) if isinstance(tool, FunctionTool) else tool for tool in agent.tools]
+            guardrails = agent.input_guardrails if first_step else []
+            instrumented = agent.clone(model=CheckpointingModel(_resolve_model(agent)), tools=tools, input_guardrails=guardrails)
+            self._instrumented[key] = instrumented
+        return instrumented
+
+    async def run(self, agent: Agent[Any], input: str | list[TResponseInputItem], context: Any = None, max_turns: int = 10,
+                  run_id: str | None = None, **kwargs: Any) -> RunResult:
+        _agents_in(agent, self._agents)
+        checkpoint = {
+            "run_id": run_id or uuid.uuid4().hex, "step": 0, "agent": agent.name, "input": ItemHelpers.input_to_new_input_list(input),
+            "context": dump_context(context), "usage": _usage.dump_python(Usage(), mode="json"), "max_turns": max_turns,
+            "pending_response": None, "final_output": None, "status": "running",
+        }
+        checkpoint["checkpoint_id"] = f"{checkpoint['run_id']}-0"
+        await self.store.save(checkpoint)
+        return await self._continue(checkpoint, context, **kwargs)
+
+    async def resume(self, checkpoint_id: str, context: Any = None, **kwargs: Any) -> RunResult:
+        """Continues a run from a checkpoint. `context` overrides the snapshot stored with it."""
+        checkpoint = await self.store.load(checkpoint_id)
+        if checkpoint is None:
+            raise UserError(f"No checkpoint {checkpoint_id!r}")
+        if checkpoint["status"] == "done":
+            raise UserError(f"Run {checkpoint['run_id']} already finished: {checkpoint['final_output']}")
+        return await self._continue(checkpoint, context if context is not None else load_context(checkpoint["context"]), **kwargs)
+
+    async def resume_run(self, run_id: str, context: Any = None, **kwargs: Any) -> RunResult:
+        checkpoint = await self.store.latest(run_id)
+        if checkpoint is None:
+            raise UserError(f"No checkpoints for run {run_id!r}")
+        return await self.resume(checkpoint["checkpoint_id"], context, **kwargs)
+
+    async def _continue(self, checkpoint: dict[str, Any], context: Any, **kwargs: Any) -> RunResult:
+        state = _RunState(self.store, checkpoint)
+        pending = checkpoint.get("pending_response")
+        if pending:
+            state.replay = ModelResponse(output=_output_items.validate_python(pending["output"]), usage=_usage.validate_python(pending["usage"]),
+                                         response_id=pending["response_id"])
+        usage = _usage.validate_python(checkpoint["usage"])
+        token = _state.set(state)
+        try:
+            while True:
+                if checkpoint["step"] >= checkpoint["max_turns"]:
+                    raise MaxTurnsExceeded(f"Max turns ({checkpoint['max_turns']}) exceeded")
+                agent = self._agent(checkpoint["agent"])
+                try:
+                    result = await Runner.run(self._instrument(agent, checkpoint["step"] == 0), checkpoint["input"],
+                                              context=context, max_turns=1, **kwargs)
+                except MaxTurnsExceeded as e:
+                    data = e.run_data
+                    usage.add(data.context_wrapper.usage)
+                    checkpoint.update(
+                        agent=data.last_agent.name,
+                        input=ItemHelpers.input_to_new_input_list(data.input) + [item.to_input_item() for item in data.new_items],
+                    )
+                    status, final_output = "running", None
+                else:
+                    usage.add(result.context_wrapper.usage)
+                    result.context_wrapper.usage = usage
+                    status, final_output = "done", result.final_output
+                checkpoint.update(
+                    step=checkpoint["step"] + 1, context=dump_context(context), usage=_usage.dump_python(usage, mode="json"),
+                    pending_response=None, status=status, final_output=json.loads(json.dumps(final_output, default=str)),
+                )
+                checkpoint["checkpoint_id"] = f"{checkpoint['run_id']}-{checkpoint['step']}"
+                await self.store.save(checkpoint)
+                if status == "done":
+                    result.checkpoint_id = checkpoint["checkpoint_id"]
+                    result.checkpoint_stats = {
+                        "model_calls": state.model_calls, "replayed_model_calls": state.replayed_model_calls,
+                        "tools_run": state.tools_run, "tools_reused": state.tools_reused,
+                    }
+                    return result
+        finally:
+            _state.reset(token)
+
+
+class WorkerDied(BaseException):
+    """Stands in for the process being killed: not an Exception, so neither tools nor the SDK catch it."""
+
+
+crash_next_user_info = True
+executions = {"get_weather_updates_website": 0, "user_info_tool": 0, "write_story": 0}
+
+
+@idempotent
+@function_tool
+async def get_weather_updates_website(city: str) -> str:
+    """
+    Fetches weather updates for a given city from a website.
+    """
+    executions["get_weather_updates_website"] += 1
+    await asyncio.sleep(0.01)
+    return f"Weather updates for {city}: Sunny, 25°C"
+
+
+@idempotent
+@function_tool(name_override="user_info_tool")
+async def process_user_info(name: str, age: int, email: str) -> str:
+    """Process user information from the input string."""
+    global crash_next_user_info
+    executions["user_info_tool"] += 1
+    await asyncio.sleep(0.05)
+    if crash_next_user_info:
+        crash_next_user_info = False
+        raise WorkerDied("worker killed while processing user info")
+    return f"Tool Processed data: Username: {name}, Age: {age}, Email: {email}"
+
+
+@function_tool
+def write_story(topic: str) -> str:
+    """Writes a short story on a topic."""
+    executions["write_story"] += 1
+    return f"A short story on {topic}: Safdar packed a bag, saw the world, and came home kinder."
+
+
+def assistant_reply(text: str, input: Any) -> Any:
+    outputs = [item for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"] if isinstance(input, list) else []
+    if not outputs:
+        return [FakeToolCall("get_weather_updates_website", {"city": "peshawar"}),
+                FakeToolCall("user_info_tool", {"name": "John Doe", "age": 30, "email": "programmersafdar@live.com"})]
+    return FakeToolCall("transfer_to_homework_assistant")
+
+
+def homework_reply(text: str, input: Any) -> Any:
+    if input[-1].get("type") == "function_call_output" and "short story" in str(input[-1].get("output")):
+        return f"Done. {input[-1]['output']}"
+    return FakeToolCall("write_story", {"topic": "why to travel around the world"})
+
+
+async def main_async():
+    model = (lambda reply: LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key)) if api_key else (lambda reply: FakeModel(reply=reply))
+    home_work_agent = Agent(
+        name="Homework Assistant",
+        instructions="You are a helpful assistant for homework tasks.",
+        model=model(homework_reply),
+        tools=[write_story],
+        handoff_description="You can Special Agent for Homework.",
+    )
+    agent = Agent(
+        name="Assistant",
+        instructions="You are a helpfull assistant",
+        model=model(assistant_reply),
+        handoffs=[home_work_agent],
+        tools=[process_user_info, get_weather_updates_website],
+    )
+    path = os.path.join(tempfile.mkdtemp(prefix="agentic-banking-checkpoints-"), "checkpoints.db")
+    question = ("process this user info: name John Doe, age 30, email programmersafdar@live.com, and get weather updates for "
+                "city = peshawar, homework = write a short story on -why to travel around the world-")
+
+    store = SQLiteCheckpointStore(path)
+    runner = CheckpointRunner(store)
+    try:
+        await runner.run(agent, question, max_turns=6, run_id="run-1")
+    except WorkerDied as e:
+        print(f"Worker 1 died: {e}")
+    store.close()
+
+    # A new worker opens the same store and picks the run up where it stopped.
+    store = SQLiteCheckpointStore(path)
+    runner = CheckpointRunner(store, agents=[agent])
+    checkpoint = await store.latest("run-1")
+    print(f"Resuming {checkpoint['checkpoint_id']} (agent {checkpoint['agent']}, saved response pending: {checkpoint['pending_response'] is not None})")
+    start = time.perf_counter()
+    result = await runner.resume(checkpoint["checkpoint_id"])
+    print(f"Resumed in {(time.perf_counter() - start) * 1e3:.1f} ms: {result.final_output}")
+    print(f"Last agent: {result.last_agent.name}, final checkpoint {result.checkpoint_id}, {result.checkpoint_stats}")
+    print(f"Tool executions over both workers: {executions}")
+    store.close()
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import dataclasses
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, TypeVar
+
+from agents import Agent, FunctionTool, ModelSettings, Runner, function_tool, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+A = TypeVar("A", bound=Agent)
+
+AGENT_FIELDS = frozenset(f.name for f in dataclasses.fields(Agent))
+# Text fields that repeat across tenants. Names are unique per tenant, interning them would only grow the registry.
+INTERNED_TEXT = frozenset({"instructions", "handoff_description"})
+
+
+class SharedList(list):
+    """A list shared by many agent variants. Mutating it in place would change every tenant, so it refuses to."""
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("This list is shared between agent variants, clone the agent with a new list instead.")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _frozen
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+
+
+class AgentRegistry:
+    """
+    Interning registry for cheap per-tenant agent variants.
+
+    `clone(base, **overrides)` returns an instance of a subclass of Agent made once per base agent, whose class
+    attributes hold the base's field values. The variant's own __dict__ holds only the overrides, every other field
+    is read through the class, so a variant costs a small object plus its overrides and cloning is O(overrides).
+    Overrides are interned first: equal strings (rendered static instructions), equal ModelSettings, tool lists with
+    the same tools, and identical tool JSON schemas collapse to one shared object, so a thousand tenants built from
+    a few tiers share a few copies. Shared lists are SharedList and refuse in-place changes.
+    Variants are ordinary Agents for Runner, clone() and handoffs.
+    Attributes:
+        hits (int): Overrides replaced by an already interned object.
+        misses (int): Overrides interned for the first time.
+    """
+
+    def __init__(self):
+        self._variant_classes: dict[int, tuple[Agent[Any], type]] = {}
+        self._strings: dict[str, str] = {}
+        self._settings: dict[str, ModelSettings] = {}
+        self._schemas: dict[str, dict[str, Any]] = {}
+        self._tools: dict[tuple, FunctionTool] = {}
+        # Tenant lists reuse the same tool objects, so most lookups stop here without hashing a schema.
+        self._tool_ids: dict[int, tuple[Any, Any]] = {}
+        self._lists: dict[tuple[int, ...], SharedList] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, table: dict, key: Any, value: Any) -> Any:
+        found = table.get(key)
+        if found is None:
+            self.misses += 1
+            table[key] = found = value
+        else:
+            self.hits += 1
+        return found
+
+    def intern_tool(self, tool: Any) -> Any:
+        if not isinstance(tool, FunctionTool):
+            return tool
+        seen = self._tool_ids.get(id(tool))
+        if seen is not None and seen[0] is tool:
+            return seen[1]
+        schema_key = json.dumps(tool.params_json_schema, sort_keys=True)
+        schema = self._remember(self._schemas, schema_key, tool.params_json_schema)
+        key = (tool.name, tool.description, schema_key, tool.strict_json_schema, id(tool.on_invoke_tool), id(tool.is_enabled))
+        interned = self._tools.get(key)
+        if interned is None:
+            # Keep the function alive while its id is part of a key.
+            interned = tool if tool.params_json_schema is schema else dataclasses.replace(tool, params_json_schema=schema)
+            self._tools[key] = interned
+        self._tool_ids[id(tool)] = (tool, interned)
+        return interned
+
+    def intern(self, field: str, value: Any) -> Any:
+        """The shared object equal to `value`, for the agent fields worth sharing."""
+        if isinstance(value, str) and field in INTERNED_TEXT:
+            return self._remember(self._strings, value, value)
+        if isinstance(value, ModelSettings):
+            # The dataclass repr lists every field and is several times cheaper than to_json_dict().
+            return self._remember(self._settings, repr(value), value)
+        if isinstance(value, list):
+            items = [self.intern_tool(item) for item in value]
+            return self._remember(self._lists, tuple(id(item) for item in items), SharedList(items))
+        return value
+
+    def _variant_class(self, base: Agent[Any]) -> type:
+        entry = self._variant_classes.get(id(base))
+        if entry is not None and entry[0] is base:
+            return entry[1]
+        # For a variant of a variant, its overrides become class attributes of the new variant class.
+        parent = type(base)
+        shared = {name: self.intern(name, getattr(base, name)) for name in AGENT_FIELDS}
+        cls = type(parent.__name__, (parent,), {**shared, "__variant_of__": base, "__module__": parent.__module__, "__qualname__": parent.__qualname__})
+        self._variant_classes[id(base)] = (base, cls)
+        return cls
+
+    def clone(self, base: A, **overrides: Any) -> A:
+        unknown = overrides.keys() - AGENT_FIELDS
+        if unknown:
+            raise TypeError(f"Agent has no fields {sorted(unknown)}")
+        cls = self._variant_class(base)
+        variant = object.__new__(cls)
+        for name, value in overrides.items():
+            value = self.intern(name, value)
+            if value is not getattr(cls, name):
+                variant.__dict__[name] = value
+        Agent.__post_init__(variant)
+        return variant
+
+    @staticmethod
+    def overrides(agent: Agent[Any]) -> dict[str, Any]:
+        """The fields a variant stores itself, everything else comes from its base."""
+        return dict(agent.__dict__)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "bases": len(self._variant_classes), "strings": len(self._strings), "settings": len(self._settings),
+            "tool_lists": len(self._lists), "tools": len(self._tools), "schemas": len(self._schemas),
+            "hits": self.hits, "misses": self.misses,
+        }
+
+
+def make_tool(name: str) -> FunctionTool:
+    def lookup(account_no: str, month: int) -> str:
+        return f"{name} for account {account_no}, month {month}: nothing unusual."
+
+    lookup.__name__ = name
+    lookup.__doc__ = f"Returns the {name.replace('_', ' ')} of a customer account for a month."
+    return function_tool(lookup)
+
+
+BASE_TOOLS = [make_tool(f"{kind}_report") for kind in (
+    "balance", "statement", "interest", "fee", "card", "loan", "deposit", "transfer", "limit", "tax",
+    "fraud", "cheque", "standing_order", "direct_debit", "fx", "branch", "atm", "kyc", "dispute", "rewards",
+)]
+TIERS = {
+    "retail": ("You serve retail customers. Keep answers short and friendly.", 0.2),
+    "premier": ("You serve premier customers. Offer the relationship manager for anything above 1,000,000 PKR.", 0.3),
+    "business": ("You serve business customers. Mention payroll and bulk transfer options when relevant.", 0.2),
+    "islamic": ("You serve Islamic banking customers. Use profit rate instead of interest.", 0.1),
+    "student": ("You serve student accounts. Explain fees in plain words.", 0.4),
+}
+TIER_TOOLS = {tier: make_tool(f"{tier}_offers") for tier in TIERS}
+BASE_INSTRUCTIONS = "You are a helpfull assistant, who help in customer service and banking. " * 30
+
+
+def tenant_overrides(i: int) -> dict[str, Any]:
+    """What a tenant changes, built the way tenant setup code builds it: new strings, settings and lists each time."""
+    tier = list(TIERS)[i % len(TIERS)]
+    note, temperature = TIERS[tier]
+    return {
+        "name": f"Banking Assistant for tenant {i}",
+        "instructions": f"{BASE_INSTRUCTIONS}{note}",
+        "model_settings": ModelSettings(temperature=temperature),
+        "tools": [*BASE_TOOLS, TIER_TOOLS[tier]],
+    }
+
+
+def measure(label: str, clone, tenants: int) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    variants = [clone(i) for i in range(tenants)]
+    elapsed = time.perf_counter() - start
+    del variants
+    gc.collect()
+    tracemalloc.start()
+    variants = [clone(i) for i in range(tenants)]
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Kept alive until here, the traced memory is what the clones hold.
+    del variants
+    print(f"{label:<24} {elapsed / tenants * 1e6:7.2f} us/clone {used / tenants:8.0f} bytes/tenant")
+    return used
+
+
+def weather_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return input[-1]["output"]
+    return FakeToolCall("premier_offers", {"account_no": "123456789", "month": 7})
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    base = Agent(
+        name="Banking Assistant",
+        instructions=BASE_INSTRUCTIONS,
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=weather_reply),
+        tools=BASE_TOOLS,
+        model_settings=ModelSettings(temperature=0.8),
+    )
+    registry = AgentRegistry()
+    tenants = 10_000
+    stock = measure("Agent.clone", lambda i: base.clone(**tenant_overrides(i)), tenants)
+    interned = measure("AgentRegistry.clone", lambda i: registry.clone(base, **tenant_overrides(i)), tenants)
+    print(f"{stock / interned:.1f}x less memory per tenant, registry: {registry.stats()}")
+    # Interning walks override lists, a clone that only renames skips all of it.
+    for label, clone in (("Agent.clone", base.clone), ("AgentRegistry.clone", lambda **kw: registry.clone(base, **kw))):
+        start = time.perf_counter()
+        for i in range(tenants):
+            clone(name=f"tenant {i}")
+        print(f"{label:<24} {(time.perf_counter() - start) / tenants * 1e6:7.2f} us/clone with only a new name")
+
+    # Four overrides are stored, but only the name is a new object, the others are the interned values tenant 6 uses.
+    tenant = registry.clone(base, **tenant_overrides(1))
+    print(f"Stored overrides: {sorted(registry.overrides(tenant))}, tools shared with tenant 6: "
+          f"{tenant.tools is registry.clone(base, **tenant_overrides(6)).tools}")
+    try:
+        tenant.tools.append(TIER_TOOLS["retail"])
+    except TypeError as e:
+        print(f"In-place change refused: {e}")
+    result = Runner.run_sync(tenant, "Any offers for my account 123456789 this month?")
+    print(f"{result.last_agent.name}: {result.final_output}")
+    robot = tenant.clone(name="Robot Assistant", tool_use_behavior="stop_on_first_tool")
+    print(f"Agent.clone of a variant still works: {robot.name}, {len(robot.tools)} tools")
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import asyncio
+import dataclasses
+import hashlib
+import importlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import tomllib
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+
+from agents import Agent, FunctionTool, Handoff, Model, ModelSettings, Runner, function_tool, handoff, set_tracing_disabled
+from agents.extensions.models.litellm_model import LitellmModel
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+logger = logging.getLogger(__name__)
+
+SPEC_PATH = Path(__file__).parent / "data" / "agent_graph.toml"
+AGENT_KEYS = frozenset({
+    "name", "instructions", "instructions_ref", "handoff_description", "model", "model_settings", "tools", "handoffs",
+    "tool_use_behavior",
+})
+HANDOFF_KEYS = frozenset({"agent", "tool_name", "tool_description", "input_filter", "on_handoff"})
+TOOL_USE_BEHAVIORS = ("run_llm_again", "stop_on_first_tool")
+
+ModelFactory = Callable[[str, str], Model | str]
+
+
+class AgentGraphError(ValueError):
+    """A graph spec that does not validate. `problems` lists everything wrong with it, not only the first thing."""
+
+    def __init__(self, problems: list[str]):
+        super().__init__("Invalid agent graph: " + "; ".join(problems))
+        self.problems = problems
+
+
+@lru_cache(maxsize=None)
+def default_model_factory(model_name: str, agent_key: str = "") -> Model:
+    """One LitellmModel per model name, shared by every agent and every reload that uses it."""
+    del agent_key
+    return LitellmModel(model=model_name, api_key=api_key)
+
+
+def resolve(ref: str) -> Any:
+    """The object a "package.module:attribute" reference points to."""
+    module_name, _, attr = ref.partition(":")
+    if not module_name or not attr:
+        raise AgentGraphError([f"{ref!r} is not a 'module:attribute' reference"])
+    try:
+        target = importlib.import_module(module_name)
+        for part in attr.split("."):
+            target = getattr(target, part)
+    except (ImportError, AttributeError) as e:
+        raise AgentGraphError([f"cannot resolve {ref!r}: {e}"]) from e
+    return target
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AgentGraph:
+    """
+    A built, validated agent graph. Never changed after it is built: a reload makes a new one.
+    Attributes:
+        version (str): sha1 of the spec it was built from.
+        entry (str): Key of the agent requests start at.
+        agents (Mapping[str, Agent]): Agents by spec key.
+        by_name (Mapping[str, Agent]): The same agents by agent name.
+        tools (Mapping[str, FunctionTool]): Tools by spec key, schemas already built.
+        build_seconds (float): Time spent validating and building.
+    """
+    version: str
+    entry: str
+    agents: Mapping[str, Agent[Any]]
+    by_name: Mapping[str, Agent[Any]]
+    tools: Mapping[str, FunctionTool]
+    build_seconds: float
+
+    def agent(self, key: str | None = None) -> Agent[Any]:
+        try:
+            return self.agents[key or self.entry]
+        except KeyError:
+            raise KeyError(f"No agent {key!r} in graph {self.version[:12]}, known: {sorted(self.agents)}") from None
+
+
+def _ref(problems: list[str], where: str, ref: Any) -> Any:
+    if not isinstance(ref, str):
+        problems.append(f"{where}: expected a 'module:attribute' string, got {ref!r}")
+        return None
+    try:
+        return resolve(ref)
+    except AgentGraphError as e:
+        problems.extend(f"{where}: {problem}" for problem in e.problems)
+        return None
+
+
+def _build_tools(spec: dict[str, Any], problems: list[str]) -> dict[str, FunctionTool]:
+    tools = {}
+    for key, table in spec.get("tools", {}).items():
+        target = _ref(problems, f"tools.{key}", table.get("ref"))
+        if target is None:
+            continue
+        if isinstance(target, FunctionTool):
+            tools[key] = target
+        elif callable(target):
+            # Plain functions get their schema built here, once per load, not per request.
+            tools[key] = function_tool(target)
+        else:
+            problems.append(f"tools.{key}: {table['ref']!r} is neither a FunctionTool nor a function")
+    return tools
+
+
+def _check_agent(key: str, table: dict[str, Any], spec: dict[str, Any], problems: list[str]) -> None:
+    where = f"agents.{key}"
+    unknown = table.keys() - AGENT_KEYS
+    if unknown:
+        problems.append(f"{where}: unknown keys {sorted(unknown)}")
+    if not isinstance(table.get("name"), str) or not table.get("name"):
+        problems.append(f"{where}: needs a name")
+    if "instructions" in table and "instructions_ref" in table:
+        problems.append(f"{where}: give instructions or instructions_ref, not both")
+    for tool in table.get("tools", []):
+        if tool not in spec.get("tools", {}):
+            problems.append(f"{where}: unknown tool {tool!r}")
+    for target in table.get("handoffs", []):
+        if target not in spec.get("agents", {}) and target not in spec.get("handoffs", {}):
+            problems.append(f"{where}: unknown handoff {target!r}")
+    if not isinstance(table.get("model", spec.get("defaults", {}).get("model")), str):
+        problems.append(f"{where}: no model and no defaults.model")
+    behavior = table.get("tool_use_behavior", "run_llm_again")
+    if isinstance(behavior, dict):
+        names = behavior.get("stop_at_tool_names")
+        if set(behavior) != {"stop_at_tool_names"} or not isinstance(names, list):
+            problems.append(f"{where}: tool_use_behavior table must only hold a stop_at_tool_names list")
+    elif behavior not in TOOL_USE_BEHAVIORS:
+        problems.append(f"{where}: tool_use_behavior must be one of {TOOL_USE_BEHAVIORS} or a stop_at_tool_names table")
+
+
+def build_graph(spec: dict[str, Any], model_factory: ModelFactory = default_model_factory, version: str = "") -> AgentGraph:
+    """
+    Validates `spec` as a whole and builds every agent, tool and handoff it declares.
+    Raises AgentGraphError listing all problems; nothing is built from a spec that has any.
+    """
+    start = time.perf_counter()
+    problems: list[str] = []
+    agent_specs: dict[str, dict[str, Any]] = spec.get("agents", {})
+    handoff_specs: dict[str, dict[str, Any]] = spec.get("handoffs", {})
+    entry = spec.get("entry")
+    if entry not in agent_specs:
+        problems.append(f"entry {entry!r} is not an agent")
+    overlap = agent_specs.keys() & handoff_specs.keys()
+    if overlap:
+        problems.append(f"keys used for both an agent and a handoff: {sorted(overlap)}")
+    seen_names: dict[str, str] = {}
+    for key, table in agent_specs.items():
+        _check_agent(key, table, spec, problems)
+        name = table.get("name")
+        if name in seen_names:
+            problems.append(f"agents.{key}: name {name!r} already used by agents.{seen_names[name]}")
+        seen_names.setdefault(name, key)
+    for key, table in handoff_specs.items():
+        unknown = table.keys() - HANDOFF_KEYS
+        if unknown:
+            problems.append(f"handoffs.{key}: unknown keys {sorted(unknown)}")
+        if table.get("agent") not in agent_specs:
+            problems.append(f"handoffs.{key}: unknown agent {table.get('agent')!r}")
+
+    tools = _build_tools(spec, problems)
+    settings: dict[str, ModelSettings] = {}
+    instructions: dict[str, Any] = {}
+    for key, table in agent_specs.items():
+        try:
+            settings[key] = ModelSettings(**table.get("model_settings", {}))
+        except TypeError as e:
+            problems.append(f"agents.{key}.model_settings: {e}")
+        if "instructions_ref" in table:
+            instructions[key] = _ref(problems, f"agents.{key}.instructions_ref", table["instructions_ref"])
+        else:
+            instructions[key] = table.get("instructions")
+    hooks = {
+        (key, field): _ref(problems, f"handoffs.{key}.{field}", table[field])
+        for key, table in handoff_specs.items() for field in ("input_filter", "on_handoff") if field in table
+    }
+    if problems:
+        raise AgentGraphError(problems)
+
+    # Two passes, so agents can hand off to each other in cycles: every agent exists before any handoff is made.
+    agents: dict[str, Agent[Any]] = {}
+    for key, table in agent_specs.items():
+        model_name = table.get("model", spec.get("defaults", {}).get("model"))
+        behavior = table.get("tool_use_behavior", "run_llm_again")
+        agents[key] = Agent(
+            name=table["name"],
+            instructions=instructions[key],
+            handoff_description=table.get("handoff_description"),
+            model=model_factory(model_name, key),
+            model_settings=settings[key],
+            tools=[tools[tool] for tool in table.get("tools", [])],
+            tool_use_behavior=dict(behavior) if isinstance(behavior, dict) else behavior,
+        )
+    handoffs: dict[str, Handoff] = {}
+    for key, table in handoff_specs.items():
+        handoffs[key] = handoff(
+            agents[table["agent"]],
+            tool_name_override=table.get("tool_name"),
+            tool_description_override=table.get("tool_description"),
+            input_filter=hooks.get((key, "input_filter")),
+            on_handoff=hooks.get((key, "on_handoff")),
+        )
+    for key, table in agent_specs.items():
+        # Handoff objects instead of bare agents, so the runner does not rebuild them on every turn.
+        targets = [handoffs.get(target) or handoffs.setdefault(target, handoff(agents[target])) for target in table.get("handoffs", [])]
+        agents[key].handoffs = targets
+        tool_names = [tool.name for tool in agents[key].tools] + [target.tool_name for target in targets]
+        clashes = sorted({name for name in tool_names if tool_names.count(name) > 1})
+        if clashes:
+            problems.append(f"agents.{key}: tool names used twice {clashes}")
+        behavior = agents[key].tool_use_behavior
+        if isinstance(behavior, dict):
+            missing = set(behavior["stop_at_tool_names"]) - {tool.name for tool in agents[key].tools}
+            if missing:
+                problems.append(f"agents.{key}: stop_at_tool_names not among its tools {sorted(missing)}")
+    if problems:
+        raise AgentGraphError(problems)
+    return AgentGraph(
+        version=version,
+        entry=entry,
+        agents=MappingProxyType(agents),
+        by_name=MappingProxyType({agent.name: agent for agent in agents.values()}),
+        tools=MappingProxyType(tools),
+        build_seconds=time.perf_counter() - start,
+    )
+
+
+class AgentGraphRegistry:
+    """
+    Agents, tools and handoffs declared in a TOML spec, validated and built once at load.
+    Request paths call `agent(key)` and get an already built Agent; they never construct agents or tool schemas.
+
+    `reload_if_changed()` (or the `start_watching()` task) rebuilds the graph when the file changes and swaps it in
+    with one assignment, so a request sees either the old graph or the new one, never a mix. A request that already
+    holds `graph` keeps that snapshot to the end. A spec that fails validation is logged and the old graph stays.
+    Attributes:
+        reloads (int): Graphs swapped in after the first load.
+        failed_reloads (int): Changed specs rejected, the old graph kept.
+        last_error (AgentGraphError | None): Why the last reload was rejected.
+    """
+
+    def __init__(self, path: str | Path = SPEC_PATH, model_factory: ModelFactory = default_model_factory, watch_interval: float = 1.0):
+        self.path = Path(path)
+        self.model_factory = model_factory
+        self.watch_interval = watch_interval
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: AgentGraphError | None = None
+        self._task: asyncio.Task | None = None
+        self._stamp = self._file_stamp()
+        # The first load raises: a service should not start without a valid graph.
+        self._graph = self._build(self.path.read_bytes())
+
+    @property
+    def graph(self) -> AgentGraph:
+        return self._graph
+
+    def agent(self, key: str | None = None) -> Agent[Any]:
+        return self._graph.agent(key)
+
+    def _file_stamp(self) -> tuple[int, int]:
+        stat = self.path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build(self, raw: bytes) -> AgentGraph:
+        try:
+            spec = tomllib.loads(raw.decode())
+        except (tomllib.TOMLDecodeError, UnicodeDecodeError) as e:
+            raise AgentGraphError([f"{self.path}: {e}"]) from e
+        return build_graph(spec, self.model_factory, version=hashlib.sha1(raw).hexdigest())
+
+    def reload_if_changed(self) -> bool:
+        """Rebuilds the graph if the spec file changed. Returns True when a new graph was swapped in."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        raw = self.path.read_bytes()
+        if hashlib.sha1(raw).hexdigest() == self._graph.version:
+            # Touched or rewritten with the same content.
+            return False
+        try:
+            graph = self._build(raw)
+        except AgentGraphError as e:
+            self.failed_reloads += 1
+            self.last_error = e
+            logger.error("Keeping agent graph %s, %s", self._graph.version[:12], e)
+            return False
+        self._graph = graph
+        self.reloads += 1
+        self.last_error = None
+        logger.info("Agent graph %s loaded from %s in %.1f ms", graph.version[:12], self.path, graph.build_seconds * 1e3)
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            try:
+                # Building imports modules and makes tool schemas, keep that off the event loop.
+                await asyncio.to_thread(self.reload_if_changed)
+            except OSError:
+                logger.exception("Cannot read agent graph %s", self.path)
+
+    def start_watching(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+@function_tool
+def historytools(input: str) -> str:
+    """
+    This function is used to print answers related to history for the user.
+    """
+    return "History is the study of past events, particularly in human affairs."
+
+
+def triage_reply(text: str, input: Any) -> Any:
+    if "interest" in text.lower() or "apri" in text.lower():
+        return FakeToolCall("transfer_to_banking_interest_finder_assistant")
+    return FakeToolCall("transfer_to_math_assistant")
+
+
+def interest_reply(text: str, input: Any) -> Any:
+    outputs = [item["output"] for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"]
+    if len(outputs) < 2:
+        return FakeToolCall("get_user_info")
+    return f"THAT I'M Intreset Finding AGENT. Interest at 3.2 percent on your savings: {outputs[-1][:80]}..."
+
+
+def demo_model_factory(model_name: str, agent_key: str) -> Model:
+    if api_key:
+        return default_model_factory(model_name)
+    replies = {"triage": triage_reply, "interest": interest_reply}
+    return FakeModel(reply=replies.get(agent_key, lambda text, input: f"{agent_key} agent answering: {text}"))
+
+
+async def watch_demo(registry: AgentGraphRegistry) -> None:
+    registry.start_watching()
+    text = registry.path.read_text()
+    held = registry.graph
+    registry.path.write_text(text.replace("You are a helpful Math assistant", "You are a patient Math tutor, show every step"))
+    await asyncio.sleep(registry.watch_interval * 4)
+    print(f"Hot reload: graph {held.version[:12]} -> {registry.graph.version[:12]}, math instructions now "
+          f"{registry.agent('math').instructions!r}, a request holding the old graph still sees {held.agent('math').instructions!r}")
+    registry.path.write_text(text.replace('handoffs = ["interest"', 'handoffs = ["loans", "interest"'))
+    await asyncio.sleep(registry.watch_interval * 4)
+    print(f"Invalid spec rejected, still serving {registry.graph.version[:12]}: {registry.last_error}")
+    await registry.stop_watching()
+    print(f"reloads={registry.reloads}, failed_reloads={registry.failed_reloads}")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    registry = AgentGraphRegistry(model_factory=demo_model_factory)
+    graph = registry.graph
+    print(f"Loaded {len(graph.agents)} agents and {len(graph.tools)} tools from {registry.path.name} in "
+          f"{graph.build_seconds * 1e3:.2f} ms, version {graph.version[:12]}")
+
+    spec = tomllib.loads(registry.path.read_text())
+    rounds = 2_000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        build_graph(spec, demo_model_factory)
+    per_request = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        registry.agent("triage")
+    cached = (time.perf_counter() - start) / rounds * 1e6
+    print(f"Agent graph per request: built {per_request:.1f} us, from the registry {cached:.2f} us")
+
+    userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+    result = Runner.run_sync(registry.agent(), "Calculate the APRI on my savings, if the Interest rate is 3.2 percent?", context=userinfo)
+    print(f"{result.last_agent.name}: {result.final_output}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "agent_graph.toml"
+        shutil.copy(registry.path, copy)
+        asyncio.run(watch_demo(AgentGraphRegistry(copy, model_factory=demo_model_factory, watch_interval=0.05)))
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import dataclasses
+import operator
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Sequence
+
+from agents import Agent, FunctionTool, RunContextWrapper, Runner, function_tool, set_tracing_disabled
+from agents.agent import TContext
+from agents.extensions.models.litellm_model import LitellmModel
+from agents.tool import Tool
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking._31_Agent_with_Compiled_instructions import UNIQUE_VERSIONS
+from agentic_banking._32_Agent_with_Slotted_context import BankingSession, CustomerInfo, LoginState
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+
+def depends_on(*paths: str) -> Callable[[Callable], Callable]:
+    """
+    Declares the context attributes ("customer.userAccountType") an is_enabled predicate or instructions function
+    reads, so ManifestCache can cache its result for contexts without a context_version.
+    """
+    def mark(fn: Callable) -> Callable:
+        fn.__manifest_inputs__ = tuple(operator.attrgetter(path) for path in paths)
+        return fn
+    return mark
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def _same(a: tuple, b: tuple) -> bool:
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
+class ManifestCache:
+    """
+    Per-agent cache of what the runner recomputes on every turn: the system prompt (`get_system_prompt`) and the
+    enabled tool list (`get_all_tools`, which calls every is_enabled predicate). Used through ManifestAgent.
+
+    An entry is keyed by the agent and its context: the values the functions declared with @depends_on when they all
+    declare them, otherwise the context_version of contexts whose versions are process-unique and new on every
+    derived snapshot (_32's FrozenContext, see UNIQUE_VERSIONS). Functions that declare nothing, on a context
+    without such versions, are evaluated every time, as without the cache. An entry is recomputed when the
+    agent's instructions, tools list, tools or is_enabled values are no longer the same objects, so
+    `tool.is_enabled = False` or `agent.tools = [...]` take effect on the next turn. After changing anything else an
+    instructions function reads from the agent, call `invalidate(agent)`.
+    Agents with MCP servers always fetch their tools, the server decides what they are.
+    Attributes:
+        prompt_hits (int): System prompts served from the cache.
+        prompt_misses (int): System prompts rendered.
+        tools_hits (int): Tool lists served from the cache.
+        tools_misses (int): Tool lists computed.
+        predicates_skipped (int): is_enabled and instructions calls the hits saved.
+        invalidations (int): Entries recomputed because the agent or its tools changed.
+        uncacheable (int): Lookups that had no context_version or declared inputs to key on.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[tuple, Any]] = OrderedDict()
+        self.prompt_hits = 0
+        self.prompt_misses = 0
+        self.tools_hits = 0
+        self.tools_misses = 0
+        self.predicates_skipped = 0
+        self.invalidations = 0
+        self.uncacheable = 0
+
+    @staticmethod
+    def context_key(context: Any, functions: Sequence[Callable]) -> tuple | None:
+        """What the functions' results depend on, or None if that is unknown."""
+        if not functions:
+            return ()
+        inputs = [getattr(fn, "__manifest_inputs__", None) for fn in functions]
+        if all(getters is not None for getters in inputs):
+            # The declared inputs decide the result, whichever object they were read from.
+            return ("inputs", *(_hashable(getter(context)) for getters in inputs for getter in getters))
+        version = getattr(context, "context_version", None)
+        if isinstance(version, int) and getattr(type(context), UNIQUE_VERSIONS, False):
+            return ("version", version)
+        return None
+
+    async def _lookup(self, kind: str, agent: Agent[Any], context_key: tuple, fingerprint: tuple, calls: int,
+                      compute: Callable[[], Awaitable[Any]]) -> Any:
+        key = (kind, id(agent), context_key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if _same(entry[0], fingerprint):
+                self._entries.move_to_end(key)
+                setattr(self, f"{kind}_hits", getattr(self, f"{kind}_hits") + 1)
+                self.predicates_skipped += calls
+                return entry[1]
+            self.invalidations += 1
+        value = await compute()
+        setattr(self, f"{kind}_misses", getattr(self, f"{kind}_misses") + 1)
+        # The fingerprint holds the agent and its tools, so their ids in the key cannot be reused while cached.
+        self._entries[key] = (fingerprint, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    async def system_prompt(self, agent: Agent[Any], run_context: RunContextWrapper[Any],
+                            compute: Callable[[], Awaitable[str | None]]) -> str | None:
+        instructions = agent.instructions
+        if not callable(instructions):
+            return await compute()
+        context_key = self.context_key(run_context.context, (instructions,))
+        if context_key is None:
+            self.uncacheable += 1
+            return await compute()
+        return await self._lookup("prompt", agent, context_key, (agent, instructions), 1, compute)
+
+    async def tools(self, agent: Agent[Any], run_context: RunContextWrapper[Any],
+                    compute: Callable[[], Awaitable[list[Tool]]]) -> list[Tool]:
+        if agent.mcp_servers:
+            self.uncacheable += 1
+            return await compute()
+        predicates = [tool.is_enabled for tool in agent.tools if isinstance(tool, FunctionTool) and callable(tool.is_enabled)]
+        context_key = self.context_key(run_context.context, predicates)
+        if context_key is None:
+            self.uncacheable += 1
+            return await compute()
+        fingerprint = (agent, agent.tools, *agent.tools, *(getattr(tool, "is_enabled", None) for tool in agent.tools))
+        # A copy, so a caller changing the list does not change the cached manifest.
+        return list(await self._lookup("tools", agent, context_key, fingerprint, len(predicates), compute))
+
+    def invalidate(self, agent: Agent[Any] | None = None) -> None:
+        if agent is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[1] == id(agent)]:
+            del self._entries[key]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.prompt_hits + self.prompt_misses + self.tools_hits + self.tools_misses
+        return {
+            "prompt_hits": self.prompt_hits, "prompt_misses": self.prompt_misses,
+            "tools_hits": self.tools_hits, "tools_misses": self.tools_misses,
+            "predicates_skipped": self.predicates_skipped, "invalidations": self.invalidations,
+            "uncacheable": self.uncacheable,
+            "hit_rate": round((self.prompt_hits + self.tools_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+@dataclass
+class ManifestAgent(Agent[TContext]):
+    """An Agent whose system prompt and enabled tools come from a ManifestCache, a plain Agent without one."""
+
+    manifest: ManifestCache | None = None
+
+    async def get_system_prompt(self, run_context: RunContextWrapper[TContext]) -> str | None:
+        if self.manifest is None:
+            return await super().get_system_prompt(run_context)
+        return await self.manifest.system_prompt(self, run_context, lambda: Agent.get_system_prompt(self, run_context))
+
+    async def get_all_tools(self, run_context: RunContextWrapper[TContext]) -> list[Tool]:
+        if self.manifest is None:
+            return await super().get_all_tools(run_context)
+        return await self.manifest.tools(self, run_context, lambda: Agent.get_all_tools(self, run_context))
+
+
+def banking_instructions(context: RunContextWrapper[BankingSession], agent: Agent[BankingSession]) -> str:
+    customer = context.context.customer
+    return (
+        f"You are {agent.name}, a helpfull assistant, who help in customer service and banking. You serve "
+        f"{customer.userName}, account No. {customer.userAccountNo}, a {customer.userAccountType} account with "
+        f"{customer.userAccountBalance} {customer.userAccountCurrency}."
+    )
+
+
+def make_tool(name: str, is_enabled: Any) -> FunctionTool:
+    def lookup(month: int) -> str:
+        return f"{name} for month {month}: nothing unusual."
+
+    lookup.__name__ = name
+    lookup.__doc__ = f"Returns the {name.replace('_', ' ')} of the customer's account for a month."
+    return function_tool(lookup, is_enabled=is_enabled)
+
+
+def logged_in(context: RunContextWrapper[Any], agent: Agent[Any]) -> bool:
+    return context.context.login.isUserLoggedin
+
+
+def premier_only(context: RunContextWrapper[Any], agent: Agent[Any]) -> bool:
+    return context.context.login.isUserLoggedin and context.context.customer.userAccountType == "Premier"
+
+
+async def feature_flag(context: RunContextWrapper[Any], agent: Agent[Any]) -> bool:
+    # Stands in for a flag service lookup.
+    await asyncio.sleep(0)
+    return context.context.customer.userAccountCurrency == "PKR"
+
+
+TOOLS = [
+    *(make_tool(f"{kind}_report", logged_in) for kind in ("balance", "statement", "card", "loan", "deposit", "transfer", "limit", "tax")),
+    *(make_tool(f"{kind}_offers", premier_only) for kind in ("fx", "wealth", "lounge", "priority")),
+    *(make_tool(f"{kind}_info", feature_flag) for kind in ("branch", "atm", "rewards")),
+    make_tool("fee_schedule", True),
+]
+
+
+@depends_on("userAccountType")
+def account_type_is_saving(context: RunContextWrapper[UserInfo], agent: Agent[UserInfo]) -> bool:
+    return context.context.userAccountType == "Saving"
+
+
+def fake_reply(text: str, input: Any) -> Any:
+    if isinstance(input, list) and input[-1].get("type") == "function_call_output":
+        return input[-1]["output"]
+    return FakeToolCall("statement_report", {"month": 7})
+
+
+async def turns(agent: Agent[Any], context: Any, rounds: int) -> float:
+    """Microseconds per turn the runner spends on the system prompt and tool list."""
+    wrapper = RunContextWrapper(context=context)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await agent.get_system_prompt(wrapper)
+        await agent.get_all_tools(wrapper)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+async def main_async():
+    manifest = ManifestCache()
+    agent = ManifestAgent[BankingSession](
+        name="Banking Assistant",
+        instructions=banking_instructions,
+        model=LitellmModel(model="gemini/gemini-2.0-flash", api_key=api_key) if api_key else FakeModel(reply=fake_reply),
+        tools=TOOLS,
+        manifest=manifest,
+    )
+    plain = Agent[BankingSession](name=agent.name, instructions=agent.instructions, model=agent.model, tools=agent.tools)
+    customer = CustomerInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Premier", userAccountBalance=10765490.0)
+    session = BankingSession(session_id="s-1", customer=customer, login=LoginState())
+
+    rounds = 20_000
+    print(f"Prompt + tools per turn: Agent {await turns(plain, session, rounds):.1f} us, "
+          f"ManifestAgent {await turns(agent, session, rounds):.2f} us")
+
+    wrapper = RunContextWrapper(context=session)
+    print(f"Logged out: {len(await agent.get_all_tools(wrapper))} tools enabled")
+    session = session.evolve(login=LoginState(isUserLoggedin=True))
+    wrapper = RunContextWrapper(context=session)
+    print(f"Logged in, new context version: {len(await agent.get_all_tools(wrapper))} tools enabled")
+    # dataclasses.replace() derives a snapshot too, it must get its own entry in both directions.
+    logged_out = dataclasses.replace(session, login=LoginState(isUserLoggedin=False))
+    assert len(await agent.get_all_tools(RunContextWrapper(context=logged_out))) == 4
+    assert len(await agent.get_all_tools(RunContextWrapper(context=dataclasses.replace(logged_out, login=LoginState(isUserLoggedin=True))))) == 16
+    TOOLS[-1].is_enabled = False
+    print(f"fee_schedule disabled in place: {len(await agent.get_all_tools(wrapper))} tools enabled")
+    TOOLS[-1].is_enabled = True
+
+    result = await Runner.run(agent, "Show my statement for July.", context=session)
+    print(f"{result.last_agent.name}: {result.final_output}")
+
+    # A pydantic context has no context_version, the predicate names what it reads instead.
+    saver = ManifestAgent[UserInfo](name="Savings Assistant", instructions="You help savings customers.",
+                                    tools=[make_tool("profit_rates", account_type_is_saving)], manifest=manifest)
+    userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+    await turns(saver, userinfo, 3)
+    userinfo.userAccountType = "Current"
+    print(f"Pydantic context switched to Current: {len(await saver.get_all_tools(RunContextWrapper(context=userinfo)))} tools enabled")
+    print(manifest.stats())
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
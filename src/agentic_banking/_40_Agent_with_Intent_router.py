@@ -0,0 +1,317 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from agents import (
+    Agent,
+    Handoff,
+    InputGuardrailTripwireTriggered,
+    RunContextWrapper,
+    RunHooks,
+    RunResult,
+    Runner,
+    handoff,
+    set_tracing_disabled,
+)
+from agents.tool import Tool
+
+from agentic_banking._02_Agent_handoff_with_Triage_agent import UserInfo
+from agentic_banking._29_Agent_with_Local_file_search import tokenize
+from agentic_banking._38_Agent_with_Agent_graph_registry import AgentGraphRegistry, default_model_factory
+from agentic_banking.fake_model import FakeModel, FakeToolCall
+
+api_key = os.getenv("GEMINI_API_KEY")
+set_tracing_disabled(disabled=True)
+
+logger = logging.getLogger(__name__)
+
+INTENTS_PATH = Path(__file__).parent / "data" / "intent_examples.jsonl"
+# The intent of inputs only the triage agent should decide on.
+TRIAGE = ""
+
+
+@dataclass
+class LabeledIntent:
+    text: str
+    intent: str
+
+
+class _RoutedRunHooks(RunHooks[Any]):
+    """Does what the skipped triage turn would have: its input guardrails, then the handoff's on_handoff."""
+
+    def __init__(self, router: "IntentRouter", target: Handoff, input: str, hooks: RunHooks[Any] | None):
+        self.router = router
+        self.target = target
+        self.input = input
+        self.hooks = hooks or RunHooks()
+        self.started = False
+
+    async def on_agent_start(self, context: RunContextWrapper[Any], agent: Agent[Any]) -> None:
+        if not self.started:
+            self.started = True
+            triage = self.router.triage
+            results = await asyncio.gather(*(guardrail.run(triage, self.input, context) for guardrail in triage.input_guardrails))
+            for result in results:
+                if result.output.tripwire_triggered:
+                    raise InputGuardrailTripwireTriggered(result)
+            await self.target.on_invoke_handoff(context, "")
+        await self.hooks.on_agent_start(context, agent)
+
+    async def on_agent_end(self, context: RunContextWrapper[Any], agent: Agent[Any], output: Any) -> None:
+        await self.hooks.on_agent_end(context, agent, output)
+
+    async def on_handoff(self, context: RunContextWrapper[Any], from_agent: Agent[Any], to_agent: Agent[Any]) -> None:
+        await self.hooks.on_handoff(context, from_agent, to_agent)
+
+    async def on_tool_start(self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool) -> None:
+        await self.hooks.on_tool_start(context, agent, tool)
+
+    async def on_tool_end(self, context: RunContextWrapper[Any], agent: Agent[Any], tool: Tool, result: str) -> None:
+        await self.hooks.on_tool_end(context, agent, tool, result)
+
+
+def load_intents(path: str | Path = INTENTS_PATH) -> list[LabeledIntent]:
+    """Loads a JSONL file with one {"text": ..., "intent": <agent name or "">} object per line."""
+    with open(path, encoding="utf-8") as f:
+        return [LabeledIntent(**json.loads(line)) for line in f if line.strip()]
+
+
+def features(text: str) -> list[str]:
+    """Words, word pairs and 4-character pieces of words, so "notes" and "note" still share features."""
+    words = tokenize(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    grams += [f"#{word[i:i + 4]}" for word in words if len(word) > 4 for i in range(len(word) - 3)]
+    return grams
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """
+    Where the router sends an input.
+    Attributes:
+        intent (str): Name of the predicted agent, TRIAGE for the triage agent itself.
+        confidence (float): Probability of that intent.
+        handoff (Handoff | None): The handoff to take directly, None to fall back to the triage agent.
+    """
+    intent: str
+    confidence: float
+    handoff: Handoff | None
+
+
+class IntentRouter:
+    """
+    Local classifier in front of a triage agent. A triage turn is a full LLM call spent on choosing among handoffs
+    whose descriptions are already known, so the router learns that choice from the handoff descriptions plus
+    labeled examples: TF-IDF features and a softmax (multinomial logistic regression) model in NumPy.
+
+    `run()` sends inputs classified with at least `min_confidence` straight to the target agent and everything else
+    to the triage agent as before. A routed run still passes the triage agent's input guardrails, which run before
+    the target's first model call, and the handoff's is_enabled and on_handoff, with the run's own context wrapper.
+    Examples labeled TRIAGE teach it what to leave to the triage agent. Handoffs that take structured input are
+    never routed, the triage model has to produce that input, and neither are handoffs whose agent is unknown:
+    targets given to the triage agent as Handoff objects must be passed in `agents`.
+    Attributes:
+        routed (int): Inputs sent straight to a specialist, each one a triage turn saved.
+        fallbacks (int): Inputs the triage agent handled.
+    """
+
+    def __init__(self, triage: Agent[Any], examples: list[LabeledIntent], agents: list[Agent[Any]] | None = None,
+                 min_confidence: float = 0.7, description_weight: float = 3.0, epochs: int = 600, learning_rate: float = 8.0,
+                 l2: float = 1e-4):
+        self.triage = triage
+        self.min_confidence = min_confidence
+        self.agents = {agent.name: agent for agent in [*(agents or []), *(item for item in triage.handoffs if isinstance(item, Agent))]}
+        handoffs = [item if isinstance(item, Handoff) else handoff(item) for item in triage.handoffs]
+        self.handoffs = {h.agent_name: h for h in handoffs if not h.input_json_schema.get("properties") and h.agent_name in self.agents}
+        self.labels = [TRIAGE, *self.handoffs]
+        unknown = {example.intent for example in examples} - set(self.labels)
+        if unknown:
+            raise ValueError(f"Examples for intents {sorted(unknown)} that {triage.name} cannot hand off to.")
+        texts = [h.tool_description for h in self.handoffs.values()] + [example.text for example in examples]
+        targets = list(range(1, len(self.labels))) + [self.labels.index(example.intent) for example in examples]
+        weights = [description_weight] * len(self.handoffs) + [1.0] * len(examples)
+        self._fit(texts, np.array(targets), np.array(weights, np.float32), epochs, learning_rate, l2)
+        self.routed = 0
+        self.fallbacks = 0
+
+    def _fit(self, texts: list[str], targets: np.ndarray, weights: np.ndarray, epochs: int, learning_rate: float, l2: float) -> None:
+        self.vocabulary: dict[str, int] = {}
+        rows = [np.array([self.vocabulary.setdefault(gram, len(self.vocabulary)) for gram in features(text)], np.int64) for text in texts]
+        df = np.zeros(len(self.vocabulary), np.float32)
+        for row in rows:
+            df[np.unique(row)] += 1
+        self.idf = (np.log((1 + len(rows)) / (1 + df)) + 1).astype(np.float32)
+        x = np.zeros((len(rows), len(self.vocabulary)), np.float32)
+        for i, row in enumerate(rows):
+            if len(row):
+                columns, values = self._weights(row)
+                x[i, columns] = values
+        y = np.eye(len(self.labels), dtype=np.float32)[targets]
+        sample = (weights / weights.sum())[:, None]
+        self.w = np.zeros((len(self.vocabulary), len(self.labels)), np.float32)
+        self.b = np.zeros(len(self.labels), np.float32)
+        # Full batch gradient descent, the training set is a few hundred rows.
+        for _ in range(epochs):
+            gradient = (self._softmax(x @ self.w + self.b) - y) * sample
+            self.w -= learning_rate * (x.T @ gradient + l2 * self.w)
+            self.b -= learning_rate * gradient.sum(axis=0)
+
+    def _weights(self, row: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Sublinear TF-IDF of the known features in a text, L2 normalized."""
+        columns, counts = np.unique(row, return_counts=True)
+        values = (1 + np.log(counts)) * self.idf[columns]
+        return columns, values / np.linalg.norm(values)
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        exp = np.exp(scores - scores.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def probabilities(self, text: str) -> np.ndarray:
+        row = np.array([self.vocabulary[gram] for gram in features(text) if gram in self.vocabulary], np.int64)
+        if not len(row):
+            return self._softmax(self.b)
+        columns, values = self._weights(row)
+        return self._softmax(values @ self.w[columns] + self.b)
+
+    def route(self, text: str) -> Route:
+        probabilities = self.probabilities(text)
+        best = int(probabilities.argmax())
+        intent, confidence = self.labels[best], float(probabilities[best])
+        target = self.handoffs.get(intent) if confidence >= self.min_confidence else None
+        return Route(intent, confidence, target)
+
+    async def _enabled(self, target: Handoff, wrapper: RunContextWrapper[Any]) -> bool:
+        if isinstance(target.is_enabled, bool):
+            return target.is_enabled
+        enabled = target.is_enabled(wrapper, self.triage)
+        return bool(await enabled if inspect.isawaitable(enabled) else enabled)
+
+    async def run(self, input: str | list[Any], context: Any = None, hooks: RunHooks[Any] | None = None, **kwargs: Any) -> RunResult:
+        """Runner.run on the routed agent, or on the triage agent. Only a new text message is routed."""
+        if isinstance(input, str):
+            route = self.route(input)
+            target = self.agents.get(route.intent) if route.handoff is not None else None
+            if target is not None and await self._enabled(route.handoff, RunContextWrapper(context=context)):
+                self.routed += 1
+                logger.debug("Routed to %s (%.2f): %s", target.name, route.confidence, input)
+                return await Runner.run(target, input, context=context, hooks=_RoutedRunHooks(self, route.handoff, input, hooks), **kwargs)
+        self.fallbacks += 1
+        return await Runner.run(self.triage, input, context=context, hooks=hooks, **kwargs)
+
+    def evaluate(self, examples: list[LabeledIntent]) -> dict[str, Any]:
+        """Precision of the inputs it would route, and the share of inputs that would skip the triage turn."""
+        routes = [self.route(example.text) for example in examples]
+        routed = [(route, example) for route, example in zip(routes, examples) if route.handoff is not None]
+        correct = sum(1 for route, example in routed if route.intent == example.intent)
+        return {
+            "precision": round(correct / len(routed), 4) if routed else 1.0,
+            "skip_rate": round(len(routed) / len(examples), 4) if examples else 0.0,
+            "misrouted": len(routed) - correct,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        total = self.routed + self.fallbacks
+        return {"routed": self.routed, "fallbacks": self.fallbacks, "skip_rate": round(self.routed / total, 4) if total else 0.0}
+
+
+TRIAGE_KEYWORDS = {
+    "transfer_to_banking_interest_finder_assistant": ("interest", "apri", "savings", "return"),
+    "transfer_to_math_assistant": ("solve", "calculate", "equation", "square", "percent", "area"),
+    "transfer_to_english_grammar_assistant": ("grammar", "tense", "sentence", "plural", "verb"),
+    "transfer_to_biology_assistant": ("cell", "dna", "photosynthesis", "blood", "gene"),
+    "custom_handoff_note_tool": ("note", "notes"),
+}
+
+
+def triage_reply(text: str, input: Any) -> Any:
+    lowered = text.lower()
+    for tool, words in TRIAGE_KEYWORDS.items():
+        if any(word in lowered for word in words):
+            return FakeToolCall(tool)
+    return "I'm the Triage Agent, could you tell me a bit more about what you need?"
+
+
+def demo_model_factory(model_name: str, agent_key: str) -> Any:
+    if api_key:
+        return default_model_factory(model_name)
+    if agent_key == "triage":
+        # A triage turn is a full LLM round trip.
+        return FakeModel(reply=triage_reply, latency=0.05)
+    return FakeModel(reply=lambda text, input: f"{agent_key} agent answering: {text}", latency=0.05)
+
+
+def cross_validate(triage: Agent[Any], examples: list[LabeledIntent], thresholds: tuple[float, ...], folds: int = 4,
+                   agents: list[Agent[Any]] | None = None) -> dict[float, dict[str, float]]:
+    """Precision and skip rate per min_confidence, every example scored by a router that did not train on it."""
+    counts = {threshold: [0, 0] for threshold in thresholds}
+    for fold in range(folds):
+        router = IntentRouter(triage, [example for i, example in enumerate(examples) if i % folds != fold], agents)
+        for example in (example for i, example in enumerate(examples) if i % folds == fold):
+            route = router.route(example.text)
+            for threshold in thresholds:
+                if route.intent and route.confidence >= threshold:
+                    counts[threshold][0] += route.intent == example.intent
+                    counts[threshold][1] += 1
+    return {
+        threshold: {"precision": round(correct / routed, 4) if routed else 1.0, "skip_rate": round(routed / len(examples), 4)}
+        for threshold, (correct, routed) in counts.items()
+    }
+
+
+async def serve(traffic: list[LabeledIntent], run) -> tuple[float, int]:
+    """Mean seconds per request, one request after another, and the model calls the traffic took."""
+    start = time.perf_counter()
+    userinfo = UserInfo(userName="Safdar Ali Shah", userAccountNo="123456789", userAccountType="Saving", userAccountBalance=10765490.0)
+    results = [await run(example.text, context=userinfo) for example in traffic]
+    return (time.perf_counter() - start) / len(traffic), sum(len(result.raw_responses) for result in results)
+
+
+async def main_async():
+    registry = AgentGraphRegistry(model_factory=demo_model_factory)
+    triage = registry.agent("triage")
+    # The registry builds every handoff as a Handoff object, the router needs their agents.
+    agents = list(registry.graph.agents.values())
+    examples = load_intents()
+    # Every fourth example is held out to measure routing on inputs the router has not seen.
+    train = [example for i, example in enumerate(examples) if i % 4 != 3]
+    held_out = [example for i, example in enumerate(examples) if i % 4 == 3]
+    start = time.perf_counter()
+    router = IntentRouter(triage, train, agents)
+    print(f"Router for {len(router.handoffs)} handoffs, {len(router.vocabulary)} features, trained in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    print("min_confidence  precision  skip_rate   (4-fold cross-validation)")
+    for threshold, report in cross_validate(triage, examples, (0.4, 0.5, 0.6, 0.7, 0.8), agents=agents).items():
+        print(f"{threshold:>14} {report['precision']:>10} {report['skip_rate']:>10}")
+    print(f"Held out, min_confidence {router.min_confidence}: {router.evaluate(held_out)}")
+    rounds = 10_000
+    start = time.perf_counter()
+    for i in range(rounds):
+        router.route(held_out[i % len(held_out)].text)
+    print(f"Routing decision: {(time.perf_counter() - start) / rounds * 1e6:.1f} us, a triage LLM turn is a full model round trip")
+
+    for example in held_out[:2] + held_out[-2:]:
+        route = router.route(example.text)
+        print(f"{example.text!r} -> {route.intent or 'Triage Agent'} ({route.confidence:.2f}{', routed' if route.handoff else ''})")
+
+    seconds, calls = await serve(held_out, lambda text, context: Runner.run(triage, text, context=context))
+    print(f"Triage agent only: {len(held_out)} requests, {calls} model calls, {seconds * 1e3:.0f} ms per request")
+    seconds, calls = await serve(held_out, router.run)
+    print(f"With the router:   {len(held_out)} requests, {calls} model calls, {seconds * 1e3:.0f} ms per request, {router.stats()}")
+
+
+def main():
+    print("Welcome to agentic-banking!")
+    asyncio.run(main_async())
+    print("Goodbye from agentic-banking!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from agents import Model, ModelResponse, Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseUsage,
+)
+
+_call_ids = itertools.count(1)
+
+
+@dataclass
+class FakeToolCall:
+    """A tool call the FakeModel should emit instead of a text answer."""
+    name: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+
+def _input_text(input: str | list[Any]) -> str:
+    """Returns the text of the last user message in the model input."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            if isinstance(content, str):
+                return content
+            return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _count_tokens(text: str) -> int:
+    # Roughly 4 characters per token, good enough for cost estimates offline.
+    return max(1, len(text) // 4)
+
+
+class FakeModel(Model):
+    """
+    Offline stand-in for LitellmModel so examples and benchmarks run without GEMINI_API_KEY.
+    The `reply` callable receives the last user message and the model input and returns either
+    a string (final text, or JSON for structured outputs) or a FakeToolCall / list of them.
+    Attributes:
+        reply (Callable): Produces the fake answer for each model call.
+        latency (float): Seconds to sleep per call, to simulate network time.
+        calls (int): Number of model calls served so far.
+    """
+    def __init__(self, reply: Callable[[str, Any], Any] | None = None, latency: float = 0.0):
+        self.reply = reply or (lambda text, input: f"Echo: {text}")
+        self.latency = latency
+        self.calls = 0
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, prompt=None, **kwargs) -> ModelResponse:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        answer = self.reply(_input_text(input), input)
+        if isinstance(answer, FakeToolCall):
+            answer = [answer]
+        if isinstance(answer, list) and not {call.name for call in answer} <= {tool.name for tool in tools} | {h.tool_name for h in handoffs}:
+            # A model cannot call tools it was not given, it answers from the last tool result instead.
+            outputs = [item["output"] for item in input if isinstance(item, dict) and item.get("type") == "function_call_output"] if isinstance(input, list) else []
+            answer = str(outputs[-1]) if outputs else f"Echo: {_input_text(input)}"
+        if isinstance(answer, list):
+            output = [
+                ResponseFunctionToolCall(
+                    id=f"fake_{next(_call_ids)}",
+                    call_id=f"call_{next(_call_ids)}",
+                    name=call.name,
+                    arguments=json.dumps(call.arguments),
+                    type="function_call",
+                )
+                for call in answer
+            ]
+            output_text = json.dumps([call.arguments for call in answer])
+        else:
+            output_text = answer if isinstance(answer, str) else json.dumps(answer)
+            output = [
+                ResponseOutputMessage(
+                    id=f"fake_{next(_call_ids)}",
+                    content=[ResponseOutputText(text=output_text, type="output_text", annotations=[])],
+                    role="assistant",
+                    type="message",
+                    status="completed",
+                )
+            ]
+        # Tool schemas are part of every real request, so they count towards input tokens too.
+        tool_schemas = json.dumps([getattr(tool, "params_json_schema", tool.name) for tool in tools])
+        input_tokens = _count_tokens((system_instructions or "") + json.dumps(input, default=str) + tool_schemas)
+        output_tokens = _count_tokens(output_text)
+        usage = Usage(requests=1, input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=input_tokens + output_tokens)
+        return ModelResponse(output=output, usage=usage, response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, *, previous_response_id=None, prompt=None, **kwargs) -> AsyncIterator[Any]:
+        """The get_response answer as a single `response.completed` event, enough for Runner.run_streamed."""
+        response = await self.get_response(system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                                           previous_response_id=previous_response_id, prompt=prompt, **kwargs)
+        usage = response.usage
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=0,
+            response=Response(
+                id=f"fake_{next(_call_ids)}",
+                created_at=time.time(),
+                model="fake",
+                object="response",
+                output=response.output,
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+                usage=ResponseUsage(
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                    total_tokens=usage.total_tokens,
+                    input_tokens_details=usage.input_tokens_details,
+                    output_tokens_details=usage.output_tokens_details,
+                ),
+            ),
+        )